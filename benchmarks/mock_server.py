@@ -0,0 +1,454 @@
+# title: Local mock of the Meraki Dashboard API
+# description: Emulates the endpoints the scripts use (organizations, networks, devices,
+#              per-device and network clients, switch ports, clone and action batches) with
+#              Link-header pagination, per-organization 429 rate limiting with Retry-After,
+#              configurable latency and generated organizations of any size.
+#              Run it on its own and point the scripts at it with MERAKI_BASE_URL:
+#                  python -m benchmarks.mock_server --devices 1000 --port 8080
+#                  MERAKI_BASE_URL=http://127.0.0.1:8080/api/v1 python getWifiConnected.py --org all --network all
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+from urllib.request import Request, urlopen
+
+# Default and largest page sizes the API uses, per endpoint
+DEVICES_PER_PAGE_DEFAULT = 1000
+DEVICES_PER_PAGE_MAX = 1000
+CLIENTS_PER_PAGE_DEFAULT = 10
+CLIENTS_PER_PAGE_MAX = 5000
+
+# Class generating a deterministic organization layout of any size without storing per-client records
+class MockData:
+    def __init__(self, orgs=1, networks=1, devices=10, clients_per_ap=20, ports_per_switch=24):
+        self.clients_per_ap = clients_per_ap
+        self.ports_per_switch = ports_per_switch
+        self.organizations = [{'id': str(100000 + o), 'name': f'Mock Org {o + 1}'} for o in range(orgs)]
+        self.networks = {}
+        self.devices = {}
+        self.network_org = {}
+        self.device_org = {}
+        self.devices_by_serial = {}
+        self.aps_by_network = {}
+
+        for org_index, org in enumerate(self.organizations):
+            org_networks = [{'id': f'N_{org_index}_{n}', 'organizationId': org['id'], 'name': f'Site {n + 1}',
+                             'productTypes': ['wireless', 'switch']} for n in range(networks)]
+            self.networks[org['id']] = org_networks
+            for network in org_networks:
+                self.network_org[network['id']] = org['id']
+                self.aps_by_network[network['id']] = []
+
+            org_devices = []
+            for i in range(devices):
+                network = org_networks[i % networks]
+                is_ap = i % 2 == 0
+                serial = f'Q2{org_index:02d}-{i // 10000:04d}-{i % 10000:04d}'
+                device = {
+                    'serial': serial,
+                    'name': f'{"ap" if is_ap else "sw"}-{i:05d}',
+                    'model': 'MR46' if is_ap else 'MS225-48LP',
+                    'productType': 'wireless' if is_ap else 'switch',
+                    'networkId': network['id'],
+                    'mac': _mac('d', org_index, i),
+                    'lanIp': f'10.{org_index % 256}.{i // 256 % 256}.{i % 256}',
+                    'firmware': 'wireless-29-7' if is_ap else 'switch-16-7',
+                    'tags': ['mock', 'ap' if is_ap else 'switch'],
+                }
+                org_devices.append(device)
+                self.device_org[serial] = org['id']
+                self.devices_by_serial[serial] = device
+                if is_ap:
+                    self.aps_by_network[network['id']].append(device)
+            self.devices[org['id']] = org_devices
+
+        self.port_overrides = {}
+        self.action_batches = {}
+        self.lock = threading.Lock()
+
+    # Function to generate the idx-th client of an AP
+    def client(self, ap, idx):
+        seed = int(hashlib.md5(f'{ap["serial"]}/{idx}'.encode()).hexdigest()[:8], 16)
+        return {
+            'id': f'k{seed:08x}',
+            'mac': _mac('c', seed >> 16, seed & 0xffff),
+            'description': f'client-{seed % 100000}',
+            'ip': f'172.16.{seed % 256}.{(seed >> 8) % 256}',
+            'vlan': 10 + seed % 4,
+            'ssid': ('Corp', 'Guest', 'IoT')[seed % 3],
+            'os': ('iOS', 'Android', 'Windows 11', 'macOS')[seed % 4],
+            'userAgent': None,
+            'recentDeviceSerial': ap['serial'],
+            'recentDeviceName': ap['name'],
+            'lastSeen': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(1700000000 + seed % 86400)),
+            'usage': {'sent': seed % 5000, 'recv': seed % 9000},
+            'status': 'Online',
+        }
+
+    # Function to count the clients of a network
+    def network_client_count(self, network_id):
+        return len(self.aps_by_network.get(network_id, [])) * self.clients_per_ap
+
+    # Function to get the idx-th client of a network
+    def network_client(self, network_id, idx):
+        ap = self.aps_by_network[network_id][idx // self.clients_per_ap]
+        return self.client(ap, idx % self.clients_per_ap)
+
+    # Function to generate the port configs of a switch (with any updates applied)
+    def ports(self, serial):
+        ports = []
+        for p in range(1, self.ports_per_switch + 1):
+            port = {'portId': str(p), 'name': None, 'tags': [], 'enabled': True, 'poeEnabled': True,
+                    'type': 'access', 'vlan': 10 + p % 4, 'voiceVlan': None, 'allowedVlans': 'all',
+                    'isolationEnabled': False, 'rstpEnabled': True, 'stpGuard': 'disabled',
+                    'linkNegotiation': 'Auto negotiate', 'accessPolicyType': 'Open'}
+            port.update(self.port_overrides.get((serial, str(p)), {}))
+            ports.append(port)
+        return ports
+
+    # Function to generate the live statuses of a switch's ports
+    def port_statuses(self, serial):
+        seed = int(hashlib.md5(serial.encode()).hexdigest()[:8], 16)
+        statuses = []
+        for p in range(1, self.ports_per_switch + 1):
+            value = (seed >> (p % 24)) + p * 7919
+            connected = value % 5 != 0
+            statuses.append({
+                'portId': str(p), 'enabled': True, 'status': 'Connected' if connected else 'Disconnected',
+                'speed': '1 Gbps' if connected else '', 'duplex': 'full' if connected else '',
+                'errors': ['CRC errors'] if value % 97 == 0 else [], 'warnings': [],
+                'usageInKb': {'total': value % 900000, 'sent': value % 400000, 'recv': value % 500000},
+                'trafficInKbps': {'total': value % 9000 / 10, 'sent': value % 4000 / 10, 'recv': value % 5000 / 10},
+                'powerUsageInWh': (value % 300) / 10 if connected else 0,
+            })
+        return statuses
+
+# Function to build a MAC address from a kind prefix and two numbers
+def _mac(kind, a, b):
+    value = (a << 24) | b
+    octets = [(value >> shift) & 0xff for shift in (32, 24, 16, 8, 0)]
+    return ('0c' if kind == 'd' else '7a') + ''.join(f':{octet:02x}' for octet in octets)
+
+# Class implementing the per-organization request quota of the mock (token bucket)
+class MockRateLimit:
+    def __init__(self, rate):
+        self.rate = rate
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    # Function to take a token for an organization; returns seconds to wait when the quota is exhausted
+    def take(self, org_id):
+        if not self.rate:
+            return 0
+        with self.lock:
+            now = time.monotonic()
+            tokens, updated = self.buckets.get(org_id, (self.rate, now))
+            tokens = min(self.rate, tokens + (now - updated) * self.rate)
+            if tokens >= 1:
+                self.buckets[org_id] = (tokens - 1, now)
+                return 0
+            self.buckets[org_id] = (tokens, now)
+            return (1 - tokens) / self.rate
+
+# Class holding the request statistics of a mock server run
+class MockStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.requests = 0
+        self.throttled = 0
+        self.not_modified = 0
+        self.bytes_sent = 0
+
+    def as_dict(self):
+        return {'requests': self.requests, 'throttled': self.throttled,
+                'not_modified': self.not_modified, 'bytes_sent': self.bytes_sent}
+
+    def add(self, status, size):
+        with self.lock:
+            self.requests += 1
+            self.bytes_sent += size
+            if status == 429:
+                self.throttled += 1
+            elif status == 304:
+                self.not_modified += 1
+
+# Request handler of the mock API
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode() if body is not None else b''
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+        self.server.stats.add(status, len(data))
+
+    # Function to answer with one page of a list and the Link header pointing at the next one
+    def send_page(self, path, query, total, item_at, per_page_default, per_page_max):
+        per_page = min(int(query.get('perPage', [per_page_default])[0]), per_page_max)
+        start = int(query.get('startingAfter', ['0'])[0])
+        items = [item_at(i) for i in range(start, min(start + per_page, total))]
+
+        base = f'http://{self.server.server_address[0]}:{self.server.server_address[1]}{path}'
+        keep = {name: values for name, values in query.items() if name not in ('perPage', 'startingAfter')}
+        links = [f'<{base}?{urlencode(dict(keep, perPage=per_page), doseq=True)}>; rel=first']
+        if start + per_page < total:
+            links.append(f'<{base}?{urlencode(dict(keep, perPage=per_page, startingAfter=start + per_page), doseq=True)}>; rel=next')
+        self.send_json(200, items, {'Link': ', '.join(links)})
+
+    # Function to send a list with an ETag, answering 304 when the client already has it
+    def send_tagged(self, body):
+        etag = '"' + hashlib.md5(json.dumps(body).encode()).hexdigest() + '"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_json(304, None, {'ETag': etag})
+        else:
+            self.send_json(200, body, {'ETag': etag})
+
+    # Function to find the organization a request counts against
+    def org_for(self, parts):
+        data = self.server.data
+        if len(parts) > 1 and parts[0] == 'organizations':
+            return parts[1]
+        if len(parts) > 1 and parts[0] == 'networks':
+            return data.network_org.get(parts[1])
+        if len(parts) > 1 and parts[0] == 'devices':
+            return data.device_org.get(parts[1])
+        return None
+
+    # Function to apply latency and the rate limit; returns True when the request was throttled
+    def throttle(self, parts):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        wait = self.server.rate_limit.take(self.org_for(parts) or 'global')
+        if wait:
+            self.send_json(429, {'errors': ['API rate limit exceeded for organization']},
+                           {'Retry-After': str(max(1, round(wait)))})
+            return True
+        return False
+
+    def read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'null')
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        path = url.path
+        query = parse_qs(url.query)
+        parts = path.replace('/api/v1', '', 1).strip('/').split('/')
+        data = self.server.data
+
+        # Control endpoint used by the benchmark harness (not part of the Meraki API)
+        if path == '/_mock/stats':
+            body = json.dumps(self.server.stats.as_dict()).encode()
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            if query.get('reset'):
+                self.server.stats.reset()
+            return
+
+        if self.throttle(parts):
+            return
+
+        if parts == ['organizations']:
+            return self.send_tagged(data.organizations)
+        if len(parts) == 3 and parts[0] == 'organizations' and parts[2] == 'networks':
+            return self.send_tagged(data.networks.get(parts[1], []))
+        if len(parts) == 3 and parts[0] == 'organizations' and parts[2] == 'devices':
+            devices = data.devices.get(parts[1], [])
+            product_types = query.get('productTypes[]')
+            if product_types:
+                devices = [device for device in devices if device['productType'] in product_types]
+            network_ids = query.get('networkIds[]')
+            if network_ids:
+                devices = [device for device in devices if device['networkId'] in network_ids]
+            models = query.get('models[]')
+            if models:
+                devices = [device for device in devices if device['model'] in models]
+            tags = query.get('tags[]')
+            if tags:
+                devices = [device for device in devices if set(tags) & set(device['tags'])]
+            return self.send_page(path, query, len(devices), devices.__getitem__, DEVICES_PER_PAGE_DEFAULT, DEVICES_PER_PAGE_MAX)
+        if len(parts) == 4 and parts[0] == 'organizations' and parts[2] == 'actionBatches':
+            batch = data.action_batches.get(parts[3])
+            return self.send_json(200, batch) if batch else self.send_json(404, {'errors': ['Not found']})
+        if len(parts) == 5 and parts[0] == 'organizations' and parts[2] == 'networks' and parts[4] == 'devices':
+            return self.send_json(200, [device for device in data.devices.get(parts[1], []) if device['networkId'] == parts[3]])
+        if len(parts) == 3 and parts[0] == 'networks' and parts[2] == 'devices':
+            org_id = data.network_org.get(parts[1])
+            devices = [device for device in data.devices.get(org_id, []) if device['networkId'] == parts[1]]
+            if query.get('type') == ['wireless']:
+                devices = [device for device in devices if device['productType'] == 'wireless']
+            return self.send_json(200, devices)
+        if len(parts) == 3 and parts[0] == 'networks' and parts[2] == 'clients':
+            network_id = parts[1]
+            return self.send_page(path, query, data.network_client_count(network_id),
+                                  lambda i: data.network_client(network_id, i),
+                                  CLIENTS_PER_PAGE_DEFAULT, CLIENTS_PER_PAGE_MAX)
+        if len(parts) == 5 and parts[0] == 'networks' and parts[2] == 'devices' and parts[4] == 'clients':
+            ap = data.devices_by_serial.get(parts[3])
+            if not ap:
+                return self.send_json(404, {'errors': ['Not found']})
+            return self.send_json(200, [data.client(ap, i) for i in range(data.clients_per_ap)])
+        if len(parts) == 4 and parts[0] == 'devices' and parts[2:] == ['switch', 'ports']:
+            return self.send_json(200, data.ports(parts[1]))
+        if len(parts) == 5 and parts[0] == 'devices' and parts[2:] == ['switch', 'ports', 'statuses']:
+            return self.send_json(200, data.port_statuses(parts[1]))
+
+        self.send_json(404, {'errors': [f'Not found: {path}']})
+
+    def do_POST(self):
+        parts = urlparse(self.path).path.replace('/api/v1', '', 1).strip('/').split('/')
+        data = self.server.data
+        if self.throttle(parts):
+            return
+        body = self.read_body()
+
+        if len(parts) == 3 and parts[0] == 'devices' and parts[2] == 'clone':
+            return self.send_json(200, {'serial': parts[1], 'cloneFromSerial': body.get('cloneFromSerial')})
+        if len(parts) == 3 and parts[0] == 'organizations' and parts[2] == 'actionBatches':
+            with data.lock:
+                batch_id = str(len(data.action_batches) + 1)
+                for action in body.get('actions', []):
+                    resource = action['resource'].strip('/').split('/')
+                    if len(resource) == 5 and resource[2:4] == ['switch', 'ports']:
+                        data.port_overrides.setdefault((resource[1], resource[4]), {}).update(action.get('body') or {})
+                data.action_batches[batch_id] = {'id': batch_id, 'confirmed': True, 'synchronous': False,
+                                                 'status': {'completed': True, 'failed': False, 'errors': []},
+                                                 'actions': body.get('actions', [])}
+            return self.send_json(201, dict(data.action_batches[batch_id],
+                                            status={'completed': False, 'failed': False, 'errors': []}))
+        self.send_json(404, {'errors': ['Not found']})
+
+    def do_PUT(self):
+        parts = urlparse(self.path).path.replace('/api/v1', '', 1).strip('/').split('/')
+        data = self.server.data
+        if self.throttle(parts):
+            return
+        body = self.read_body()
+
+        if len(parts) == 5 and parts[0] == 'devices' and parts[2:4] == ['switch', 'ports']:
+            with data.lock:
+                data.port_overrides.setdefault((parts[1], parts[4]), {}).update(body or {})
+            return self.send_json(200, next(port for port in data.ports(parts[1]) if port['portId'] == parts[4]))
+        self.send_json(404, {'errors': ['Not found']})
+
+# Class running the mock API in a background thread
+class MockMerakiServer:
+    def __init__(self, data, host='127.0.0.1', port=0, latency=0.0, rate=0):
+        self.httpd = ThreadingHTTPServer((host, port), MockHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.data = data
+        self.httpd.latency = latency
+        self.httpd.rate_limit = MockRateLimit(rate)
+        self.httpd.stats = MockStats()
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}/api/v1'
+
+    @property
+    def stats(self):
+        return self.httpd.stats
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+# Function to run a mock server until the process is stopped, reporting its URL through a queue
+def _serve(options, queue):
+    data = MockData(options['orgs'], options['networks'], options['devices'], options['clients_per_ap'])
+    server = MockMerakiServer(data, options['host'], options['port'], options['latency'], options['rate'])
+    queue.put(server.url)
+    server.httpd.serve_forever()
+
+# Class running the mock API in a separate process, so it does not compete with the
+# client under test for the interpreter lock; statistics are read over HTTP
+class MockServerProcess:
+    def __init__(self, orgs=1, networks=1, devices=10, clients_per_ap=20, latency=0.0, rate=0, host='127.0.0.1', port=0):
+        self.options = {'orgs': orgs, 'networks': networks, 'devices': devices, 'clients_per_ap': clients_per_ap,
+                        'latency': latency, 'rate': rate, 'host': host, 'port': port}
+        self.process = None
+        self.url = None
+
+    def start(self):
+        queue = multiprocessing.Queue()
+        self.process = multiprocessing.Process(target=_serve, args=(self.options, queue), daemon=True)
+        self.process.start()
+        self.url = queue.get(timeout=300)
+        return self
+
+    # Function to read the request statistics (and optionally reset them)
+    def stats(self, reset=False):
+        root = self.url.rsplit('/api/v1', 1)[0]
+        with urlopen(Request(f'{root}/_mock/stats{"?reset=1" if reset else ""}'), timeout=30) as response:
+            return json.loads(response.read())
+
+    def stop(self):
+        if self.process is not None:
+            self.process.terminate()
+            self.process.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+# Function to parse command-line options
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Local mock of the Meraki Dashboard API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--orgs', type=int, default=1, help='number of organizations (default: 1)')
+    parser.add_argument('--networks', type=int, default=1, help='networks per organization (default: 1)')
+    parser.add_argument('--devices', type=int, default=10, help='devices per organization, half APs and half switches (default: 10)')
+    parser.add_argument('--clients-per-ap', type=int, default=20, help='clients per AP (default: 20)')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every response (default: 0)')
+    parser.add_argument('--rate', type=float, default=10, help='requests per second per organization before 429 (0 = unlimited, default: 10)')
+    return parser.parse_args(argv)
+
+# Main function
+def main(argv=None):
+    args = parse_args(argv)
+    data = MockData(args.orgs, args.networks, args.devices, args.clients_per_ap)
+    server = MockMerakiServer(data, args.host, args.port, args.latency, args.rate)
+    print(f'Mock Meraki API listening on {server.url}')
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+# title: Throughput benchmarks for the Meraki scripts
+# description: Runs each script's data path against the local mock API (benchmarks/mock_server.py)
+#              at several organization sizes and reports wall time, requests per second and
+#              peak Python memory, so regressions show up before they reach a real organization.
+#                  python -m benchmarks.run_benchmarks --sizes 10,1000,50000
+#                  python -m benchmarks.run_benchmarks --scenarios ap-counts-network,clients-stream --json results.json
+
+import argparse
+import contextlib
+import json
+import os
+import time
+import tracemalloc
+
+import include.config as config
+from benchmarks.mock_server import MockData, MockServerProcess
+
+# Function to run the per-AP client count path of getWifiConnected.py
+def bench_ap_counts_per_ap(api_key, org_id, network_id):
+    import getWifiConnected
+    aps = getWifiConnected.get_wireless_aps(api_key, network_id, org_id)
+    return len(getWifiConnected.count_connected_clients(api_key, network_id, aps, org_id, config.CONCURRENCY))
+
+# Function to run the single-pass client count path of getWifiConnected.py
+def bench_ap_counts_network(api_key, org_id, network_id):
+    import getWifiConnected
+    aps = getWifiConnected.get_wireless_aps(api_key, network_id, org_id)
+    return len(getWifiConnected.count_clients_by_ap(api_key, network_id, aps, org_id))
+
+# Function to run the streaming client export of getWifiConnectedUsers.py
+def bench_clients_stream(api_key, org_id, network_id):
+    import getWifiConnectedUsers
+    from include.output import open_writer
+    network = {'id': network_id, 'name': network_id}
+    with open(os.devnull, 'w') as devnull:
+        with open_writer('ndjson', ['Network'] + getWifiConnectedUsers.client_headers(), stream=devnull) as writer:
+            return getWifiConnectedUsers.stream_connected_clients(writer, api_key, network, org_id)
+
+# Function to run the switch port inventory crawl of getPortsFromMS.py
+def bench_port_inventory(api_key, org_id, network_id):
+    import getPortsFromMS
+    organization = {'id': org_id, 'name': org_id}
+    getPortsFromMS.write_port_inventory(api_key, [organization], None, 'csv', os.devnull, config.CONCURRENCY)
+    return len(getPortsFromMS.get_org_switches(api_key, org_id))
+
+# Function to run the clone planning path of postCloneSwitch.py (reads only)
+def bench_clone_plan(api_key, org_id, network_id):
+    import postCloneSwitch
+    serials = [device['serial'] for device in postCloneSwitch.get_ms_devices(api_key, org_id)]
+    return len(postCloneSwitch.plan_clone(api_key, org_id, serials[0], serials[1:], config.CONCURRENCY))
+
+SCENARIOS = {
+    'ap-counts-per-ap': bench_ap_counts_per_ap,
+    'ap-counts-network': bench_ap_counts_network,
+    'clients-stream': bench_clients_stream,
+    'port-inventory': bench_port_inventory,
+    'clone-plan': bench_clone_plan,
+}
+
+# Function to run one scenario against a running mock server and measure it. Peak memory is
+# traced with tracemalloc, which slows Python down, so it can be turned off for pure timing runs.
+def run_scenario(name, server, org_id, network_id, size, trace_memory=True):
+    server.stats(reset=True)
+    # A fresh API key per run gives each scenario its own client, pool and rate limiter
+    api_key = f'bench-{name}-{size}-{time.monotonic_ns()}'
+
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        items = SCENARIOS[name](api_key, org_id, network_id)
+    elapsed = time.perf_counter() - started
+    peak = None
+    if trace_memory:
+        peak = round(tracemalloc.get_traced_memory()[1] / 1e6, 2)
+        tracemalloc.stop()
+
+    stats = server.stats()
+    return {
+        'scenario': name,
+        'devices': size,
+        'items': items,
+        'requests': stats['requests'],
+        'throttled': stats['throttled'],
+        'seconds': round(elapsed, 3),
+        'requests_per_second': round(stats['requests'] / elapsed, 1) if elapsed else None,
+        'peak_memory_mb': peak,
+    }
+
+# Function to print benchmark results as an aligned table
+def print_results(results):
+    columns = ['scenario', 'devices', 'items', 'requests', 'throttled', 'seconds', 'requests_per_second', 'peak_memory_mb']
+    widths = [max(len(column), *(len(str(result[column])) for result in results)) for column in columns]
+    print('  '.join(column.ljust(width) for column, width in zip(columns, widths)))
+    for result in results:
+        print('  '.join(str(result[column]).ljust(width) for column, width in zip(columns, widths)))
+
+# Function to parse command-line options
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Throughput benchmarks for the Meraki scripts')
+    parser.add_argument('--sizes', default='10,1000,50000', help='comma-separated device counts (default: 10,1000,50000)')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help=f'comma-separated scenarios (default: all of {", ".join(SCENARIOS)})')
+    parser.add_argument('--clients-per-ap', type=int, default=20, help='clients per AP in the mock (default: 20)')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds of mock latency per request (default: 0)')
+    parser.add_argument('--mock-rate', type=float, default=0, help='mock per-org requests per second before 429 (default: unlimited)')
+    parser.add_argument('--client-rate', type=float, default=1000, help='client-side rate limit per org (default: 1000)')
+    parser.add_argument('--concurrency', type=int, default=config.CONCURRENCY, help=f'concurrency of bulk paths (default: {config.CONCURRENCY})')
+    parser.add_argument('--no-memory', action='store_true', help='skip peak memory tracing (faster, more accurate timings)')
+    parser.add_argument('--json', metavar='PATH', help='also write the results as JSON to PATH')
+    return parser.parse_args(argv)
+
+# Main function
+def main(argv=None):
+    args = parse_args(argv)
+    scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        raise SystemExit(f'Unknown scenario(s): {", ".join(unknown)}')
+
+    # Benchmarks measure the fetch paths, so the response cache stays out of the way
+    config.CACHE_ENABLED = False
+    config.RATE_LIMIT_PER_SECOND = args.client_rate
+    config.RATE_LIMIT_BURST = args.client_rate
+    config.CONCURRENCY = args.concurrency
+
+    results = []
+    for size in (int(size) for size in args.sizes.split(',')):
+        # The mock generates the same IDs in its own process
+        layout = MockData(orgs=1, networks=1, devices=0)
+        org_id = layout.organizations[0]['id']
+        network_id = layout.networks[org_id][0]['id']
+        with MockServerProcess(devices=size, clients_per_ap=args.clients_per_ap, latency=args.latency, rate=args.mock_rate) as server:
+            config.BASE_URL = server.url
+            for name in scenarios:
+                result = run_scenario(name, server, org_id, network_id, size, not args.no_memory)
+                print(f'{name} @ {size} devices: {result["seconds"]}s, {result["requests"]} requests', flush=True)
+                results.append(result)
+
+    print()
+    print_results(results)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
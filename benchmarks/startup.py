@@ -0,0 +1,89 @@
+# title: Startup time benchmark for the Meraki tools
+# description: Measures how long "meraki_tools.py <command> --help" takes to start in a fresh Python
+#              process, and which of the heavier dependencies each command imports on the way,
+#              so wrappers that call the tools many times do not pay for unused imports.
+#                  python -m benchmarks.startup
+#                  python -m benchmarks.startup --runs 20 --json startup.json
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from meraki_tools import COMMANDS
+
+# Dependencies that take noticeably long to import
+HEAVY_MODULES = ('requests', 'tabulate', 'tqdm', 'pytz', 'numpy', 'orjson', 'pyarrow')
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENTRY_POINT = os.path.join(ROOT, 'meraki_tools.py')
+
+# Child process code that runs a command's --help and reports the heavy modules it imported
+_PROBE = '''
+import json, sys
+sys.argv[0] = 'meraki_tools.py'
+import meraki_tools
+try:
+    meraki_tools.main(json.loads(sys.argv[1]))
+except SystemExit:
+    pass
+sys.stderr.write(json.dumps(sorted(name for name in json.loads(sys.argv[2]) if name in sys.modules)))
+'''
+
+# Function to time one fresh-process run of the entry point with some arguments
+def time_run(arguments):
+    started = time.perf_counter()
+    subprocess.run([sys.executable, ENTRY_POINT] + arguments, cwd=ROOT, stdout=subprocess.DEVNULL,
+                   stderr=subprocess.DEVNULL, check=False)
+    return time.perf_counter() - started
+
+# Function to list the heavy modules imported by a run of the entry point with some arguments
+def imported_modules(arguments):
+    result = subprocess.run([sys.executable, '-c', _PROBE, json.dumps(arguments), json.dumps(HEAVY_MODULES)],
+                            cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=False)
+    try:
+        return json.loads(result.stderr.strip().splitlines()[-1])
+    except (IndexError, ValueError):
+        return []
+
+# Function to measure the startup of the entry point alone and of every command
+def measure_startup(runs=10):
+    cases = [('(entry point)', ['--help'])] + [(command, [command, '--help']) for command in COMMANDS]
+    results = []
+    for name, arguments in cases:
+        timings = [time_run(arguments) for _ in range(runs)]
+        results.append({
+            'command': name,
+            'median_ms': round(statistics.median(timings) * 1000, 1),
+            'min_ms': round(min(timings) * 1000, 1),
+            'imports': ','.join(imported_modules(arguments)) or '-',
+        })
+    return results
+
+# Function to parse command-line options
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Startup time benchmark for the Meraki tools')
+    parser.add_argument('--runs', type=int, default=10, help='fresh processes started per command (default: 10)')
+    parser.add_argument('--json', metavar='PATH', help='also write the results as JSON to PATH')
+    return parser.parse_args(argv)
+
+# Main function
+def main(argv=None):
+    args = parse_args(argv)
+    results = measure_startup(args.runs)
+
+    columns = ['command', 'median_ms', 'min_ms', 'imports']
+    widths = [max(len(column), *(len(str(result[column])) for result in results)) for column in columns]
+    print('  '.join(column.ljust(width) for column, width in zip(columns, widths)))
+    for result in results:
+        print('  '.join(str(result[column]).ljust(width) for column, width in zip(columns, widths)))
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -4,66 +4,43 @@
 #              let the user choose an organization, network, and Meraki MS device.
 #              The script will then retrieve the switch ports information from the selected
 #              Meraki MS device and print the information in JSON format.
+#              Pass --org/--network/--device (ID or serial, name glob or "all") to run without prompts,
+#              or --inventory PATH to crawl every switch of the selected organizations into one port table.
+#              --telemetry fetches the live port statuses of those switches instead and reports the busiest
+#              ports, the PoE headroom of each switch and the switches with unusually many port errors.
 
-import requests
+import argparse
 import json
+
+import requests
 import include.config as config
+from include.api import get_client
+from include.concurrency import iter_concurrently
+from include.devices import get_switches
+from include.discovery import get_networks, get_organizations
+from include.fanout import iter_orgs_in_processes
+from include.metrics import report_metrics
+from include.output import STREAMING_FORMATS, missing_dependency, open_writer
+from include.port_telemetry import ERROR_COLUMNS, POE_COLUMNS, TOP_PORT_COLUMNS, PortTelemetry, fetch_port_telemetry
+from include.selection import add_common_arguments, apply_common_arguments, child_selectors, match_items, prompt_choice, resolve_api_key, select
 
 # Default API key (you can replace this with your default key)
 DEFAULT_API_KEY = config.DEFAULT_API_KEY
 
-# Function to retrieve a list of organizations
-def get_organizations(api_key):
-    BASE_URL = config.BASE_URL
-    url = f'{BASE_URL}/organizations'
-    headers = {'X-Cisco-Meraki-API-Key': api_key}
-
-    try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        print(f'Error: {e}')
-        return None
-
-# Function to retrieve a list of networks within an organization
-def get_networks(api_key, organization_id):
-    BASE_URL = 'https://api.meraki.com/api/v1'
-    url = f'{BASE_URL}/organizations/{organization_id}/networks'
-    headers = {'X-Cisco-Meraki-API-Key': api_key}
-
-    try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        print(f'Error: {e}')
-        return None
-
 # Function to retrieve a list of Meraki MS devices within a network
 def get_ms_devices(api_key, organization_id, network_id):
-    BASE_URL = 'https://api.meraki.com/api/v1'
-    url = f'{BASE_URL}/organizations/{organization_id}/networks/{network_id}/devices'
-    headers = {'X-Cisco-Meraki-API-Key': api_key}
-
     try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        return response.json()
+        return get_switches(api_key, organization_id, [network_id])
     except requests.exceptions.RequestException as e:
         print(f'Error: {e}')
         return None
 
 # Function to retrieve switch ports information
 def get_switch_ports(api_key, organization_id, network_id, device_serial):
-    BASE_URL = 'https://api.meraki.com/api/v1'
-    url = f'{BASE_URL}/devices/{device_serial}/switch/ports'
-    headers = {'X-Cisco-Meraki-API-Key': api_key}
+    url = f'/devices/{device_serial}/switch/ports'
 
     try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        return response.json()
+        return get_client(api_key).get(url, org_id=organization_id)
     except requests.exceptions.RequestException as e:
         print(f'Error: {e}')
         return None
@@ -77,87 +54,217 @@ def print_switch_ports(ports_info):
     else:
         print('No switch ports information available.')
 
+# Columns of the flat switch port inventory
+PORT_COLUMNS = ['organizationId', 'networkId', 'serial', 'switchName', 'model', 'portId', 'name', 'enabled',
+                'type', 'vlan', 'voiceVlan', 'allowedVlans', 'poeEnabled', 'isolationEnabled', 'rstpEnabled',
+                'stpGuard', 'linkNegotiation', 'accessPolicyType', 'tags']
+
+# Function to list every Meraki MS device in an organization, across all of its networks
+def get_org_switches(api_key, organization_id):
+    return get_switches(api_key, organization_id)
+
+# Function to flatten one switch port into an inventory row
+def flatten_port(organization_id, device, port):
+    row = {
+        'organizationId': organization_id,
+        'networkId': device.get('networkId'),
+        'serial': device['serial'],
+        'switchName': device.get('name'),
+        'model': device.get('model'),
+    }
+    for column in PORT_COLUMNS[5:]:
+        value = port.get(column)
+        row[column] = ','.join(value) if isinstance(value, list) else value
+    return [row[column] for column in PORT_COLUMNS]
+
+# Function to fetch the ports of many switches concurrently (within the rate limit) and
+# yield flat inventory rows in switch order; switches that fail are reported and skipped
+def crawl_switch_ports(api_key, organization_id, switches, concurrency=None):
+    client = get_client(api_key)
+
+    def fetch_ports(device):
+        return client.get(f'/devices/{device["serial"]}/switch/ports', org_id=organization_id)
+
+    for device, ports, error in iter_concurrently(fetch_ports, switches, concurrency):
+        if error is None:
+            for port in ports:
+                yield flatten_port(organization_id, device, port)
+        elif isinstance(error, requests.exceptions.RequestException):
+            print(f'Error fetching switch ports for {device.get("name")} ({device["serial"]}): {error}')
+        else:
+            raise error
+
+# Function to list the switches of one organization in the networks matching network_selectors (None on error)
+def select_org_switches(api_key, organization, network_selectors):
+    organization_id = organization['id']
+    try:
+        switches = get_org_switches(api_key, organization_id)
+        if network_selectors:
+            networks = get_networks(api_key, organization_id) or []
+            network_ids = {network['id'] for network in match_items(networks, network_selectors)}
+            switches = [device for device in switches if device.get('networkId') in network_ids]
+        return switches
+    except requests.exceptions.RequestException as e:
+        print(f'Error fetching switches for organization {organization["name"]}: {e}')
+        return None
+
+# Function to yield the inventory rows of one organization, limited to the networks matching network_selectors
+def iter_org_port_rows(api_key, organization, network_selectors, concurrency=None):
+    switches = select_org_switches(api_key, organization, network_selectors)
+    if switches is None:
+        return
+
+    print(f'Organization {organization["name"]}: crawling {len(switches)} switch(es)')
+    yield from crawl_switch_ports(api_key, organization['id'], switches, concurrency)
+
+# Function to collect the inventory rows of one organization (runs in a worker process with --processes)
+def collect_org_port_rows(api_key, organization, network_selectors, concurrency=None):
+    return list(iter_org_port_rows(api_key, organization, network_selectors, concurrency))
+
+# Function to write the switch port inventory of the selected organizations to one file. With more than
+# one process, organizations are crawled in parallel worker processes and written as each one finishes.
+def write_port_inventory(api_key, organizations, network_selectors, output_format, output_path, concurrency=None, processes=1):
+    with open_writer(output_format, PORT_COLUMNS, output_path) as writer:
+        if processes > 1:
+            for organization, rows, error in iter_orgs_in_processes(collect_org_port_rows, api_key, organizations,
+                                                                    (network_selectors, concurrency), processes):
+                if error:
+                    print(f'Error crawling organization {organization["name"]}: {error}')
+                else:
+                    writer.write_rows(rows)
+        else:
+            for organization in organizations:
+                writer.write_rows(iter_org_port_rows(api_key, organization, network_selectors, concurrency))
+
+    print(f'Wrote {writer.rows_written} port(s) to {output_path}')
+
+# Function to fetch the live port statuses of every selected switch and print the busiest ports,
+# the PoE headroom per switch and the switches whose port error rate stands out from the fleet
+def report_port_telemetry(api_key, organizations, network_selectors, timespan=None, top=None, sort_by='traffic', concurrency=None):
+    telemetry = PortTelemetry(timespan)
+    for organization in organizations:
+        switches = select_org_switches(api_key, organization, network_selectors)
+        if switches:
+            print(f'Organization {organization["name"]}: fetching port statuses of {len(switches)} switch(es)')
+            fetch_port_telemetry(api_key, organization['id'], switches, concurrency=concurrency, telemetry=telemetry)
+
+    if not len(telemetry):
+        print('No switch port statuses found.')
+        return
+
+    from tabulate import tabulate
+    print(f'{len(telemetry)} port(s) on {len(telemetry.switches)} switch(es), averaged over {telemetry.timespan}s')
+    print(f'Busiest ports by {sort_by}:')
+    print(tabulate(telemetry.top_ports(top, sort_by), headers=TOP_PORT_COLUMNS, tablefmt="grid"))
+    print('PoE headroom per switch:')
+    print(tabulate(telemetry.poe_headroom(), headers=POE_COLUMNS, tablefmt="grid"))
+    outliers = telemetry.error_outliers()
+    if outliers:
+        print('Switches with an unusual share of ports reporting errors:')
+        print(tabulate(outliers, headers=ERROR_COLUMNS, tablefmt="grid"))
+    else:
+        print('No switch stands out by port error rate.')
+
 # Function to print a list of items with numbered options and get user choice
 def get_user_choice(items, item_type, id_field):
-    while True:
-        print(f'{item_type}:')
-        for i, item in enumerate(items, start=1):
-            print(f'{i}. {item["name"]} ({id_field}: {item[id_field]})')
-        choice = input(f'Enter the number of the {item_type} you want to select (or enter 0 to exit): ')
-
-        if choice.isdigit():
-            choice = int(choice)
-            if 1 <= choice <= len(items):
-                return items[choice - 1]
-            elif choice == 0:
-                return None
-            else:
-                print('Invalid choice. Please select a valid number.')
-        else:
-            print('Invalid input. Please enter a number.')
+    return prompt_choice(items, item_type, id_field)
+
+# Function to retrieve and print the switch ports of one Meraki MS device
+def report_switch_ports(api_key, organization_id, network_id, ms_device):
+    device_serial = ms_device['serial']
+    print(f'Selected Meraki MS Device: {ms_device["name"]} | Model : {ms_device["model"]} | Firmware : {ms_device.get("firmware")} | Serial Number: {device_serial}')
+
+    # Get switch ports information
+    ports_info = get_switch_ports(api_key, organization_id, network_id, device_serial)
+
+    if ports_info:
+        print_switch_ports(ports_info)
+    else:
+        print('Failed to retrieve switch ports information.')
+
+# Function to parse command-line options
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Cisco Meraki Switch Ports Information Retrieval')
+    add_common_arguments(parser)
+    parser.add_argument('--device', action='append', metavar='SERIAL|GLOB|all',
+                        help='switch to use, by serial, name glob or "all" (repeatable; prompts when omitted)')
+    parser.add_argument('--inventory', metavar='PATH',
+                        help='crawl every switch of the selected organizations and write one flat port table to PATH')
+    parser.add_argument('--telemetry', action='store_true',
+                        help='report live port statuses of the selected switches: busiest ports, PoE headroom, error outliers')
+    parser.add_argument('--timespan', type=int, default=config.PORT_STATUS_TIMESPAN,
+                        help=f'seconds of history the port statuses cover with --telemetry (default: {config.PORT_STATUS_TIMESPAN})')
+    parser.add_argument('--top', type=int, default=config.PORT_TOP_N,
+                        help=f'busiest ports listed with --telemetry (default: {config.PORT_TOP_N})')
+    parser.add_argument('--sort-by', choices=('traffic', 'utilization'), default='traffic',
+                        help='rank the busiest ports by traffic or by share of link speed used (default: traffic)')
+    parser.add_argument('--format', choices=STREAMING_FORMATS, default='csv', help='inventory file format (default: csv)')
+    parser.add_argument('--concurrency', type=int, default=config.CONCURRENCY,
+                        help=f'number of switches fetched at the same time (default: {config.CONCURRENCY})')
+    parser.add_argument('--processes', type=int, default=config.PROCESSES,
+                        help=f'worker processes crawling organizations in parallel with --inventory (default: {config.PROCESSES})')
+    args = parser.parse_args(argv)
+    if args.inventory and missing_dependency(args.format):
+        parser.error(missing_dependency(args.format))
+    return args
 
 # Main function
-def main():
+def main(argv=None):
+    args = parse_args(argv)
+    apply_common_arguments(args)
+
     # Banner message
     print('Cisco Meraki Switch Ports Information Retrieval')
     print('Developer: Mohd NeoTech <mohdneotech@gmail.com>')
     print('-----------------------------------------------')   
 
-    # Prompt for API key choice
-    use_default_api_key = input('Do you want to use the default API key? (y/n): ').strip().lower()
-    if use_default_api_key == 'y':
-        api_key = DEFAULT_API_KEY
-    else:
-        api_key = input('Enter your Meraki API key: ')
+    api_key = resolve_api_key(args)
 
     # Get a list of organizations
     organizations = get_organizations(api_key)
 
-    if organizations:
-        # Let the user choose an organization by its ID
-        organization = get_user_choice(organizations, 'Organization', 'id')
+    if not organizations:
+        print('Failed to retrieve organizations.')
+        return
 
-        if organization:
-            organization_id = organization['id']
+    selected_orgs = select(organizations, args.org, 'Organization')
 
-            # Get a list of networks within the selected organization
-            networks = get_networks(api_key, organization_id)
+    if args.telemetry:
+        report_port_telemetry(api_key, selected_orgs, args.network, args.timespan, args.top, args.sort_by, args.concurrency)
+        report_metrics(get_client(api_key), args.metrics, args.metrics_file)
+        return
 
-            if networks:
-                # Let the user choose a network by its ID
-                network = get_user_choice(networks, 'Network', 'id')
+    if args.inventory:
+        write_port_inventory(api_key, selected_orgs, args.network, args.format, args.inventory, args.concurrency, args.processes)
+        report_metrics(get_client(api_key), args.metrics, args.metrics_file)
+        return
 
-                if network:
-                    network_id = network['id']
+    # Select networks and switches (all matching ones with flags, otherwise prompt)
+    for organization in selected_orgs:
+        organization_id = organization['id']
 
-                    # Get a list of Meraki MS devices within the selected network
-                    ms_devices = get_ms_devices(api_key, organization_id, network_id)
+        # Get a list of networks within the selected organization
+        networks = get_networks(api_key, organization_id)
 
-                    if ms_devices:
-                        # Let the user choose a Meraki MS device by its serial number
-                        ms_device = get_user_choice(ms_devices, 'Meraki MS Device', 'serial')
+        if not networks:
+            print(f'No networks found in organization {organization["name"]}.')
+            continue
 
-                        if ms_device:
-                            device_serial = ms_device['serial']
-                            print(f'Selected Meraki MS Device: {ms_device["name"]} | Model : {ms_device["model"]} | Firmware : {ms_device["firmware"]} | Serial Number: {device_serial}')
+        network_selectors = child_selectors(args.network, args.org)
+        for network in select(networks, network_selectors, 'Network'):
+            network_id = network['id']
 
-                            # Get switch ports information
-                            ports_info = get_switch_ports(api_key, organization_id, network_id, device_serial)
+            # Get a list of Meraki MS devices within the selected network
+            ms_devices = get_ms_devices(api_key, organization_id, network_id)
 
-                            if ports_info:
-                                print_switch_ports(ports_info)
-                            else:
-                                print('Failed to retrieve switch ports information.')
-                    else:
-                        print('No Meraki MS devices found in the selected network.')
-                else:
-                    print('Exiting.')
-            else:
-                print('No networks found in the selected organization.')
-        else:
-            print('Exiting.')
-    else:
-        print('Failed to retrieve organizations.')
+            if not ms_devices:
+                print(f'No Meraki MS devices found in network {network["name"]}.')
+                continue
+
+            for ms_device in select(ms_devices, child_selectors(args.device, network_selectors), 'Meraki MS Device', 'serial'):
+                report_switch_ports(api_key, organization_id, network_id, ms_device)
+
+    report_metrics(get_client(api_key), args.metrics, args.metrics_file)
 
 if __name__ == '__main__':
     main()
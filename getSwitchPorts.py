@@ -1,21 +1,27 @@
 # title: Cisco Meraki Switch Ports Information Retrieval
 # description: This script will retrieve switch ports information from Meraki MS devices
 
+import argparse
+
 import requests
 import include.config as config
+from include.api import get_client
+from include.jsonutil import response_json
+from include.metrics import report_metrics
+from include.selection import add_common_arguments, apply_common_arguments, match_items, resolve_api_key
 
 # Default API key (you can replace this with your default key)
 DEFAULT_API_KEY = config.DEFAULT_API_KEY
 
 # Function to get the organization ID using a specified API key
 def get_organization_id(api_key):
-    url = 'https://api.meraki.com/api/v1/organizations'
-    headers = {
-        'X-Cisco-Meraki-API-Key': api_key,
-    }
-    response = requests.get(url, headers=headers)
+    url = '/organizations'
+    try:
+        response = get_client(api_key).request('GET', url)
+    except requests.exceptions.HTTPError as e:
+        response = e.response
     if response.status_code == 200:
-        organizations = response.json()
+        organizations = response_json(response)
         for org in organizations:
             print(f"Org ID: {org['id']}, Org Name: {org['name']}")
         return organizations[0]['id']  # Return the first organization ID
@@ -25,46 +31,66 @@ def get_organization_id(api_key):
 
 # Function to get switch port information for a specific network and switch
 def get_switch_port_info(api_key, org_id, network_id, switch_serial):
-    url = f'https://api.meraki.com/api/v1/organizations/{org_id}/networks/{network_id}/devices/{switch_serial}/switchPorts'
-    headers = {
-        'X-Cisco-Meraki-API-Key': api_key,
-    }
-    response = requests.get(url, headers=headers)
+    url = f'/organizations/{org_id}/networks/{network_id}/devices/{switch_serial}/switchPorts'
+    try:
+        response = get_client(api_key).request('GET', url)
+    except requests.exceptions.HTTPError as e:
+        response = e.response
     if response.status_code == 200:
-        switch_ports = response.json()
+        switch_ports = response_json(response)
         return switch_ports
     else:
         print(f"Failed to fetch switch port information. Status code: {response.status_code}")
         return None
 
+# Function to parse command-line options
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Cisco Meraki Switch Ports Information Retrieval Script')
+    add_common_arguments(parser, networks=False)
+    parser.add_argument('--network', action='append', metavar='ID', help='network ID (repeatable; prompts when omitted)')
+    parser.add_argument('--device', action='append', metavar='SERIAL', help='switch serial (repeatable; prompts when omitted)')
+    return parser.parse_args(argv)
+
 # Main function
-def main():
+def main(argv=None):
+    args = parse_args(argv)
+    apply_common_arguments(args)
+
     # Banner message
     print('Cisco Meraki Switch Ports Information Retrieval Script')
     print('Developer: Mohd NeoTech <mohdneotech@gmail.com>')
     print('-----------------------------------------------')
 
-    # You can choose to use a default API key or input a custom one
-    use_default_api_key = input("Use default API key? (y/n): ").lower() == 'y'
+    api_key = resolve_api_key(args)
 
-    if use_default_api_key:
-        # Use your default API key here
-        api_key = 'DEFAULT_API_KEY'
+    if args.org:
+        try:
+            organizations = get_client(api_key).get('/organizations')
+        except requests.exceptions.RequestException as e:
+            print(f"Failed to fetch organizations: {e}")
+            return
+        org_ids = [org['id'] for org in match_items(organizations, args.org)]
     else:
-        # Input a custom API key
-        api_key = input("Enter your custom API key: ")
+        org_id = get_organization_id(api_key)
+        org_ids = [org_id] if org_id else []
+
+    if not org_ids:
+        return
+
+    # Network and switch information from the command line, or entered at the prompt
+    network_ids = args.network or [input("Enter the network ID: ").strip()]
+    switch_serials = args.device or [input("Enter the switch serial: ").strip()]
 
-    org_id = get_organization_id(api_key)
-    if org_id:
-        # Replace with your desired organization, network, and switch information
-        network_id = 'YOUR_NETWORK_ID'
-        switch_serial = 'YOUR_SWITCH_SERIAL'
+    for org_id in org_ids:
+        for network_id in network_ids:
+            for switch_serial in switch_serials:
+                switch_ports = get_switch_port_info(api_key, org_id, network_id, switch_serial)
+                if switch_ports:
+                    # Print or process switch port data as needed
+                    for switch_port in switch_ports:
+                        print(switch_port)
 
-        switch_ports = get_switch_port_info(api_key, org_id, network_id, switch_serial)
-        if switch_ports:
-            # Print or process switch port data as needed
-            for switch_port in switch_ports:
-                print(switch_port)
+    report_metrics(get_client(api_key), args.metrics, args.metrics_file)
 
 if __name__ == "__main__":
     main()
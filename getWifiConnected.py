@@ -3,145 +3,335 @@
 #               for each AP. The script will prompt for the Meraki API key and then let the user
 #               choose an organization and network. The script will then retrieve the wireless APs
 #               in the selected network and count the number of connected clients for each AP.
+#               Pass --org/--network (ID, name glob or "all") to run without prompts, e.g. from cron.
+#               With --watch the script keeps running and streams client counts as CSV or NDJSON,
+#               polling changing APs often and steady ones less often.
+#               --record keeps every count in a local history, and --history-report 7d shows the
+#               peak and average clients per AP over that span from the history, without API calls.
+
+import argparse
+import io
+import sys
+import time
+from collections import Counter
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
 
 import requests
 import include.config as config
+from include.api import get_client
+from include.concurrency import run_concurrently
+from include.devices import device_matches, get_access_points
+from include.discovery import get_networks, get_organizations, select_networks
+from include.fanout import iter_orgs_in_processes
+from include.history import PEAK_COLUMNS, TREND_COLUMNS, ClientCountHistory, parse_span
+from include.metrics import report_metrics
+from include.output import open_writer
+from include.selection import add_common_arguments, apply_common_arguments, match_items, resolve_api_key, select
+from include.timeutil import convert_timestamp
+from include.watch import AdaptivePoller
 
 # Default API key (you can replace this with your default key)
 DEFAULT_API_KEY = config.DEFAULT_API_KEY
 
-# Meraki base URL
-BASE_URL = config.BASE_URL
-
-# Function to retrieve a list of organizations
-def get_organizations(api_key):
-    headers = {'X-Cisco-Meraki-API-Key': api_key}
-    url = f'{BASE_URL}/organizations'
-
+# Function to fetch wireless APs in a network (filtered by the API when the organization is known)
+def get_wireless_aps(api_key, network_id, org_id=None):
     try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        return response.json()
+        if org_id:
+            return get_access_points(api_key, org_id, [network_id])
+        devices = get_client(api_key).get(f'/networks/{network_id}/devices', org_id=org_id)
+        return [device for device in devices if device_matches(device, ['wireless'], model_prefixes=('MR',))]
     except requests.exceptions.RequestException as e:
-        print(f'Error fetching organizations: {e}')
+        print(f'Error fetching wireless APs: {e}')
         return None
 
-# Function to retrieve a list of networks within an organization
-def get_networks(api_key, org_id):
-    headers = {'X-Cisco-Meraki-API-Key': api_key}
-    url = f'{BASE_URL}/organizations/{org_id}/networks'
+# Function to count connected clients to each AP, fetching up to `concurrency` APs at a time.
+# Results keep the order of `aps`; APs that fail are reported and left out.
+def count_connected_clients(api_key, network_id, aps, org_id=None, concurrency=None):
+    client = get_client(api_key)
+    ap_client_counts = []
 
-    try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        print(f'Error fetching networks: {e}')
-        return None
+    def fetch_clients(ap):
+        return client.get(f'/networks/{network_id}/devices/{ap["serial"]}/clients', org_id=org_id)
+
+    for ap, clients, error in run_concurrently(fetch_clients, aps, concurrency):
+        ap_name = ap['name']
+
+        if error is None:
+            connected_client_count = len(clients)
+            ap_client_counts.append({'AP Name': ap_name, 'Serial': ap['serial'], 'Connected Clients': connected_client_count})
+        elif isinstance(error, requests.exceptions.RequestException):
+            print(f'Error fetching connected clients for AP {ap_name}: {error}')
+        else:
+            raise error
+
+    return ap_client_counts
 
-# Function to fetch wireless APs in a network
-def get_wireless_aps(api_key, network_id):
-    headers = {'X-Cisco-Meraki-API-Key': api_key}
-    url = f'{BASE_URL}/networks/{network_id}/devices?type=wireless'
+# Function to count connected clients to each AP in a single pass over the network-wide
+# clients endpoint, grouping clients by the serial of the AP they were last seen on.
+# Returns the same table as count_connected_clients using O(pages) requests instead of O(APs).
+def count_clients_by_ap(api_key, network_id, aps, org_id=None):
+    client = get_client(api_key)
+    url = f'/networks/{network_id}/clients'
+    counts = Counter()
 
     try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        devices = response.json()
-        return [device for device in devices if device['model'].startswith('MR')]
+        for page in client.get_pages(url, org_id=org_id, per_page=config.NETWORK_CLIENTS_PER_PAGE):
+            counts.update(record.get('recentDeviceSerial') for record in page)
     except requests.exceptions.RequestException as e:
-        print(f'Error fetching wireless APs: {e}')
+        print(f'Error fetching connected clients for network {network_id}: {e}')
         return None
 
-# Function to count connected clients to each AP
-def count_connected_clients(api_key, network_id, aps):
-    headers = {'X-Cisco-Meraki-API-Key': api_key}
-    ap_client_counts = []
+    return [{'AP Name': ap['name'], 'Serial': ap['serial'], 'Connected Clients': counts[ap['serial']]} for ap in aps]
 
-    for ap in aps:
-        ap_name = ap['name']
-        ap_serial = ap['serial']
+# Function to record the client counts of one network's APs in the history
+def record_counts(history, org_id, network, ap_client_counts, polled_at=None):
+    history.record([(count['Serial'], count['Connected Clients']) for count in ap_client_counts], polled_at,
+                   [(count['Serial'], count['AP Name'], network['id'], network['name'], org_id) for count in ap_client_counts])
 
-        url = f'{BASE_URL}/networks/{network_id}/devices/{ap_serial}/clients'
+# Function to count connected clients per AP in one network and print the results (and record them
+# in the history when one is given)
+def report_network(api_key, org_id, network, mode, concurrency, history=None):
+    network_id = network['id']
+    print(f'Network: {network["name"]} ({network_id})')
 
-        try:
-            response = requests.get(url, headers=headers)
-            response.raise_for_status()
-            clients = response.json()
-            connected_client_count = len(clients)
-            ap_client_counts.append({'AP Name': ap_name, 'Connected Clients': connected_client_count})
-        except requests.exceptions.RequestException as e:
-            print(f'Error fetching connected clients for AP {ap_name}: {e}')
+    # Fetch wireless APs in the selected network
+    aps = get_wireless_aps(api_key, network_id, org_id)
 
-    return ap_client_counts
+    if aps:
+        # Display APs and connected client counts
+        print('Wireless Access Points (APs) and Connected Clients:')
+        if mode == 'per-ap':
+            ap_client_counts = count_connected_clients(api_key, network_id, aps, org_id, concurrency)
+        else:
+            ap_client_counts = count_clients_by_ap(api_key, network_id, aps, org_id)
+
+        if ap_client_counts:
+            for ap_count in ap_client_counts:
+                print(f'AP Name: {ap_count["AP Name"]}, Connected Clients: {ap_count["Connected Clients"]}')
+            if history is not None:
+                record_counts(history, org_id, network, ap_client_counts)
+        else:
+            print('No APs found in the network or failed to count connected clients.')
+    else:
+        print('No wireless APs found in the network.')
+
+# Function to report every matching network of one organization and return the report as text
+# (runs in a worker process with --processes; networks default to all of them as there is no prompt)
+def collect_org_report(api_key, organization, network_selectors, mode, concurrency, history_path=None):
+    report = io.StringIO()
+    history = ClientCountHistory(history_path) if history_path else None
+    with redirect_stdout(report):
+        networks = get_networks(api_key, organization['id'])
+        if not networks:
+            print(f'No networks found in organization {organization["name"]}.')
+        for network in match_items(networks or [], network_selectors or ['all']):
+            report_network(api_key, organization['id'], network, mode, concurrency, history)
+    if history is not None:
+        history.close()
+    return report.getvalue()
+
+# Columns of the watch mode stream
+WATCH_HEADERS = ['Time', 'Organization ID', 'Network', 'Network ID', 'AP Name', 'Serial', 'Connected Clients', 'Next Poll (s)']
+
+# Function to fetch the wireless APs of the watched networks; networks whose APs cannot be fetched are skipped
+def discover_aps(api_key, selection):
+    topology = []
+    for org_id, network in selection:
+        aps = get_wireless_aps(api_key, network['id'], org_id)
+        if aps:
+            topology.append((org_id, network, aps))
+    return topology
+
+# Function to poll some APs of one network and return their counts keyed by serial
+def poll_network(api_key, org_id, network, aps, mode, concurrency):
+    if mode == 'per-ap':
+        counts = count_connected_clients(api_key, network['id'], aps, org_id, concurrency)
+    else:
+        counts = count_clients_by_ap(api_key, network['id'], aps, org_id)
+    return {count['Serial']: count for count in counts or []}
+
+# Function to keep polling client counts of the selected networks and stream one row per polled AP.
+# In 'per-ap' mode each AP has its own adaptive schedule. In 'network' mode one request counts every
+# AP of a network, so the schedule is per network: it polls again soon when any AP's count changed
+# and backs off while all of them stay the same. Connections and the AP list stay cached between
+# cycles; the APs are rediscovered every config.WATCH_TOPOLOGY_REFRESH seconds. Runs until
+# interrupted or for `cycles` polling rounds. Polled counts are also recorded in the history when
+# one is given.
+def watch_networks(api_key, selection, args, writer, history=None):
+    poller = AdaptivePoller(args.interval, args.max_interval)
+    per_ap = args.mode == 'per-ap'
+    topology = []
+    discovered_at = None
+    cycle = 0
+
+    while args.cycles is None or cycle < args.cycles:
+        now = time.monotonic()
+        if discovered_at is None or now - discovered_at >= config.WATCH_TOPOLOGY_REFRESH:
+            topology = discover_aps(api_key, selection)
+            if per_ap:
+                poller.sync((ap['serial'] for _, _, aps in topology for ap in aps), now)
+            else:
+                poller.sync((network['id'] for _, network, _ in topology), now)
+            discovered_at = now
+
+        due = set(poller.due(now))
+        if due:
+            polled_epoch = time.time()
+            polled_at = datetime.fromtimestamp(polled_epoch, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+            for org_id, network, aps in topology:
+                due_aps = [ap for ap in aps if ap['serial'] in due] if per_ap else (aps if network['id'] in due else [])
+                if not due_aps:
+                    continue
+                counts = poll_network(api_key, org_id, network, due_aps, args.mode, args.concurrency)
+                if not per_ap:
+                    if counts:
+                        values = tuple(counts[ap['serial']]['Connected Clients'] for ap in aps if ap['serial'] in counts)
+                        interval = poller.record(network['id'], values, load=max(values))
+                    else:
+                        poller.failed(network['id'])
+                polled = []
+                for ap in due_aps:
+                    count = counts.get(ap['serial'])
+                    if count is None:
+                        if per_ap:
+                            poller.failed(ap['serial'])
+                        continue
+                    if per_ap:
+                        interval = poller.record(ap['serial'], count['Connected Clients'])
+                    writer.write_row([polled_at, org_id, network['name'], network['id'], ap['name'], ap['serial'],
+                                      count['Connected Clients'], interval])
+                    polled.append(count)
+                if history is not None and polled:
+                    record_counts(history, org_id, network, polled, polled_epoch)
+            writer.flush()
+            cycle += 1
+            continue
+
+        # Sleep until the next AP or network is due (or the next rediscovery when nothing is watched)
+        next_due = poller.next_due()
+        wake = discovered_at + config.WATCH_TOPOLOGY_REFRESH if next_due is None else min(next_due, discovered_at + config.WATCH_TOPOLOGY_REFRESH)
+        time.sleep(max(wake - time.monotonic(), 0.1))
+
+# Function to parse command-line options
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Cisco Meraki Wireless APs and Connected Clients')
+    add_common_arguments(parser)
+    parser.add_argument('--mode', choices=('network', 'per-ap'), default=config.CLIENT_COUNT_MODE,
+                        help=f'count clients in one network-wide pass or with one request per AP (default: {config.CLIENT_COUNT_MODE})')
+    parser.add_argument('--concurrency', type=int, default=config.CONCURRENCY,
+                        help=f'number of per-AP requests in flight (default: {config.CONCURRENCY})')
+    parser.add_argument('--processes', type=int, default=config.PROCESSES,
+                        help=f'worker processes reporting organizations in parallel, without prompts (default: {config.PROCESSES})')
+    parser.add_argument('--watch', action='store_true',
+                        help='keep running and stream client counts, polling each AP (or network) on an adaptive schedule')
+    parser.add_argument('--format', choices=('csv', 'ndjson'), default='ndjson', help='watch mode output format (default: ndjson)')
+    parser.add_argument('--output', metavar='PATH', help='write the watch mode stream to a file instead of stdout')
+    parser.add_argument('--interval', type=float, default=config.WATCH_MIN_INTERVAL,
+                        help=f'shortest seconds between polls of an AP (default: {config.WATCH_MIN_INTERVAL})')
+    parser.add_argument('--max-interval', type=float, default=config.WATCH_MAX_INTERVAL,
+                        help=f'longest seconds between polls of an idle AP (default: {config.WATCH_MAX_INTERVAL})')
+    parser.add_argument('--cycles', type=int, help='stop watching after this many polling rounds (default: run until interrupted)')
+    parser.add_argument('--record', action='store_true', help='also record every client count in the local history')
+    parser.add_argument('--history', metavar='PATH', default=config.HISTORY_PATH,
+                        help=f'client count history database (default: {config.HISTORY_PATH})')
+    parser.add_argument('--history-report', metavar='SPAN',
+                        help='show peak and average clients per AP over the last SPAN (e.g. 24h, 7d) from the history and exit')
+    parser.add_argument('--trend', metavar='SERIAL', help='with --history-report, show the client counts of one AP over time instead')
+    return parser.parse_args(argv)
 
 # Main function
-def main():
+def main(argv=None):
+    args = parse_args(argv)
+    apply_common_arguments(args)
+
+    if args.watch and not args.output:
+        # Keep stdout for the data stream; banner, prompts and messages go to stderr
+        data_stream = sys.stdout
+        with redirect_stdout(sys.stderr):
+            run(args, data_stream)
+    else:
+        run(args)
+
+# Function to print peak and average clients per AP, or one AP's trend, over the last span from the history
+def report_history(args):
+    try:
+        span = parse_span(args.history_report)
+    except ValueError as e:
+        print(e)
+        return
+
+    from tabulate import tabulate
+    end = time.time()
+    history = ClientCountHistory(args.history)
+    try:
+        if args.trend:
+            rows = [[convert_timestamp(time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(at)))] + list(values)
+                    for at, *values in history.series(args.trend, end - span, end)]
+            headers = TREND_COLUMNS
+        else:
+            rows = [row[:4] + [convert_timestamp(time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(row[4])))] + row[5:]
+                    for row in history.peaks(end - span, end)]
+            headers = PEAK_COLUMNS
+    finally:
+        history.close()
+
+    if rows:
+        print(tabulate(rows, headers=headers, tablefmt="grid"))
+    else:
+        print(f'No client counts recorded in the last {args.history_report}.')
+
+# Function to select organizations and networks and report (or watch) their AP client counts
+def run(args, data_stream=None):
     # Banner message
     print('Cisco Meraki Wireless APs and Connected Clients')
     print('Developer: Mohd NeoTech <mohdneotech@gmail.com>')
     print('-----------------------------------------------')    
-    
-    # Prompt for API key choice, press Enter to use default API key
-    use_default_api_key = input('Do you want to use the default API key? (y/n): ').strip().lower()
-    if use_default_api_key == 'y':
-        api_key = DEFAULT_API_KEY
-    else:
-        api_key = input('Enter your Meraki API key: ')
+
+    if args.history_report:
+        report_history(args)
+        return
+
+    api_key = resolve_api_key(args)
 
     # Fetch organizations
     organizations = get_organizations(api_key)
 
-    if organizations:
-        # Display a list of organizations for the user to choose from
-        print('Select an organization:')
-        for i, org in enumerate(organizations, start=1):
-            print(f'{i}. {org["name"]} ({org["id"]})')
-
-        org_choice = int(input('Enter the number of the organization: '))
-        if org_choice < 1 or org_choice > len(organizations):
-            print('Invalid organization choice.')
-            return
-
-        selected_org = organizations[org_choice - 1]
-        org_id = selected_org['id']
-
-        # Fetch networks within the selected organization
-        networks = get_networks(api_key, org_id)
-
-        if networks:
-            # Display a list of networks for the user to choose from
-            print('Select a network:')
-            for i, network in enumerate(networks, start=1):
-                print(f'{i}. {network["name"]} ({network["id"]})')
-
-            network_choice = int(input('Enter the number of the network: '))
-            if network_choice < 1 or network_choice > len(networks):
-                print('Invalid network choice.')
-                return
-
-            selected_network = networks[network_choice - 1]
-            network_id = selected_network['id']
-
-            # Fetch wireless APs in the selected network
-            aps = get_wireless_aps(api_key, network_id)
-
-            if aps:
-                # Display APs and connected client counts
-                print('Wireless Access Points (APs) and Connected Clients:')
-                ap_client_counts = count_connected_clients(api_key, network_id, aps)
-
-                if ap_client_counts:
-                    for ap_count in ap_client_counts:
-                        print(f'AP Name: {ap_count["AP Name"]}, Connected Clients: {ap_count["Connected Clients"]}')
-                else:
-                    print('No APs found in the network or failed to count connected clients.')
+    if not organizations:
+        print('No organizations found.')
+        return
+
+    if args.processes > 1 and not args.watch:
+        # Each organization's report is printed whole as soon as its worker finishes
+        for organization, report, error in iter_orgs_in_processes(collect_org_report, api_key,
+                                                                  select(organizations, args.org, 'Organization'),
+                                                                  (args.network, args.mode, args.concurrency,
+                                                                   args.history if args.record else None), args.processes):
+            print(f'Organization: {organization["name"]} ({organization["id"]})')
+            if error:
+                print(f'Error reporting organization {organization["name"]}: {error}')
             else:
-                print('No wireless APs found in the network.')
-        else:
-            print('No networks found in the selected organization.')
+                print(report, end='')
+        report_metrics(get_client(api_key), args.metrics, args.metrics_file)
+        return
+
+    # Select organizations and networks (all matching ones with --org/--network, otherwise prompt)
+    selection = select_networks(api_key, organizations, args.org, args.network)
+
+    history = ClientCountHistory(args.history) if args.record else None
+    if not args.watch:
+        for org_id, network in selection:
+            report_network(api_key, org_id, network, args.mode, args.concurrency, history)
     else:
-        print('No organizations found.')
+        with open_writer(args.format, WATCH_HEADERS, args.output, data_stream) as writer:
+            try:
+                watch_networks(api_key, selection, args, writer, history)
+            except KeyboardInterrupt:
+                print('Watch stopped.')
+    if history is not None:
+        history.close()
+
+    report_metrics(get_client(api_key), args.metrics, args.metrics_file)
 
 if __name__ == '__main__':
     main()
@@ -4,159 +4,299 @@
 #              let the user choose an organization and network.
 #              The script will then retrieve the connected clients information from the selected
 #              Meraki wireless network and print the information in a table format.
+#              Pass --org/--network (ID, name glob or "all") to run without prompts, e.g. from cron.
+#              With --incremental only clients seen since the previous run are fetched and the
+#              clients that joined, left or changed are reported. With --group-by the clients are
+#              summarized as counts per SSID, VLAN, AP, OS, ... instead of listed one by one.
+
+import argparse
+import sys
+import time
+from contextlib import redirect_stdout
+from itertools import islice
 
 import requests
-from tabulate import tabulate
-import pytz
-from datetime import datetime  # Import the datetime module from the datetime library
 import include.config as config
+from include.api import get_client
+from include.client_store import CATEGORY_COLUMNS, ClientStore
+from include.client_sync import ClientStateStore, format_t0, merge_clients
+from include.discovery import get_organizations, select_networks
+from include.metrics import report_metrics
+from include.output import STREAMING_FORMATS, missing_dependency, open_writer
+from include.selection import add_common_arguments, apply_common_arguments, resolve_api_key
+from include.timeutil import convert_timestamp, convert_timestamps, get_timezone, timezone_label
+# tabulate is imported where a grid table is printed, so streaming and summary runs start faster
 
 # Default API key (you can replace this with your default key)
 DEFAULT_API_KEY = config.DEFAULT_API_KEY
 
-# Meraki base URL
-BASE_URL = config.BASE_URL
+# Function to stream connected clients in a network (without timespan unless given in params), decoding
+# each page as it arrives
+def iter_connected_clients(api_key, network_id, org_id=None, params=None):
+    client = get_client(api_key)
+    url = f'/networks/{network_id}/clients'
 
-# Function to fetch organizations
-def get_organizations(api_key):
-    headers = {'X-Cisco-Meraki-API-Key': api_key}
-    url = f'{BASE_URL}/organizations'
-    
     try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        return response.json()
+        yield from client.paginate(url, params, org_id=org_id, per_page=config.NETWORK_CLIENTS_PER_PAGE, stream=True)
     except requests.exceptions.RequestException as e:
-        print(f'Error fetching organizations: {e}')
-        return None
+        print(f'Error fetching connected clients: {e}')
+
+# Function to fetch connected clients in a network (without timespan)
+def get_all_connected_clients(api_key, network_id, org_id=None):
+    return list(iter_connected_clients(api_key, network_id, org_id))
+
+# Function to convert UTC time to GMT+8 (Singapore Time); kept for existing callers
+def convert_to_gmt_plus_8(utc_time_str):
+    return convert_timestamp(utc_time_str, 'Asia/Singapore')
+
+# Function to get the column headers of the connected clients report for a display time zone
+def client_headers(tz_name=None):
+    return ["Client Name", "MAC Address", "IP Address", "User Agent", "VLAN", "Access Point", f"Last Seen ({timezone_label(tz_name)})"]
+
+# Function to build report rows from a batch of client records, converting the
+# last seen times of the whole batch in one call
+def client_rows(clients, tz_name=None):
+    last_seen = convert_timestamps((client.get("lastSeen") for client in clients), tz_name)
+    return [
+        [
+            client.get("description", "N/A"),
+            client.get("mac", "N/A"),
+            client.get("ip", "N/A"),
+            client.get("userAgent", "N/A"),
+            client.get("vlan", "N/A"),
+            client.get("ssid", "N/A"),
+            seen  # Display last seen time in the display time zone
+        ]
+        for client, seen in zip(clients, last_seen)
+    ]
+
+# Function to write a network's connected clients to an open row writer in batches as they
+# arrive from pagination; each row starts with the network name so multi-network runs stay readable
+def stream_connected_clients(writer, api_key, network, org_id, tz_name=None):
+    clients = iter_connected_clients(api_key, network['id'], org_id)
+    count = 0
+    while True:
+        batch = list(islice(clients, config.PER_PAGE_MAX))
+        if not batch:
+            break
+        writer.write_rows([network['name']] + row for row in client_rows(batch, tz_name))
+        count += len(batch)
+    return count
+
+# Function to print a network's connected clients as a grid table
+def print_connected_clients(api_key, network, org_id, tz_name=None, output_file=None):
+    # Fetch all connected clients without specifying a timespan
+    connected_clients = get_all_connected_clients(api_key, network['id'], org_id)
+
+    if connected_clients:
+        print(f'Total connected clients: {len(connected_clients)}')
+        print('Connected Clients Details:')
+        table = client_rows(connected_clients, tz_name)
+        from tabulate import tabulate
+        output = tabulate(table, headers=client_headers(tz_name), tablefmt="grid")
+
+        if output_file:
+            output_file.write(f'Network: {network["name"]} ({network["id"]})\n{output}\n')
+        else:
+            print(output)
+    else:
+        print('No connected clients found in the selected network.')
+
+# Function to sync a network's clients against the local state. The first sync (or one after more than
+# config.CLIENT_SYNC_WINDOW seconds) fetches the full window; later ones fetch only clients seen since the
+# previous sync, so the cost follows client churn rather than network size. Returns (clients, changes,
+# records fetched), or None when the fetch failed, in which case the stored state is left untouched.
+def sync_connected_clients(store, api_key, network_id, org_id=None):
+    started = time.time()
+    last_sync = store.last_sync(network_id)
+    if last_sync is None or started - last_sync >= config.CLIENT_SYNC_WINDOW:
+        params = {'timespan': config.CLIENT_SYNC_WINDOW}
+    else:
+        params = {'t0': format_t0(last_sync - config.CLIENT_SYNC_OVERLAP)}
 
-# Function to fetch networks within an organization
-def get_networks(api_key, org_id):
-    headers = {'X-Cisco-Meraki-API-Key': api_key}
-    url = f'{BASE_URL}/organizations/{org_id}/networks'
-    
     try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        return response.json()
+        fetched = list(get_client(api_key).paginate(f'/networks/{network_id}/clients', params, org_id=org_id,
+                                                    per_page=config.NETWORK_CLIENTS_PER_PAGE))
     except requests.exceptions.RequestException as e:
-        print(f'Error fetching networks: {e}')
+        print(f'Error syncing connected clients: {e}')
         return None
 
-# Function to fetch connected clients in a network (without timespan)
-def get_all_connected_clients(api_key, network_id):
-    headers = {'X-Cisco-Meraki-API-Key': api_key}
-    url = f'{BASE_URL}/networks/{network_id}/clients'
+    clients, changes = merge_clients(store.snapshot(network_id), fetched, started - config.CLIENT_SYNC_WINDOW)
+    store.save(network_id, changes, started, fetched)
+    return list(clients.values()), changes, len(fetched)
 
-    all_clients = []
+# Function to build report rows from the changes of a sync, each starting with what happened to the client
+def change_rows(changes, tz_name=None):
+    labelled = [('joined', client) for client in changes['joined']]
+    labelled += [('left', client) for client in changes['left']]
+    labelled += [(f'changed: {", ".join(fields)}', client) for client, fields in changes['changed']]
+    rows = client_rows([client for _, client in labelled], tz_name)
+    return [[change] + row for (change, _), row in zip(labelled, rows)]
 
-    while True:
-        try:
-            response = requests.get(url, headers=headers)
-            response.raise_for_status()
-            clients = response.json()
-            all_clients.extend(clients)
-            
-            if 'Link' in response.headers:
-                links = response.headers['Link'].split(',')
-                for link in links:
-                    if 'rel="next"' in link:
-                        url = link.split(';')[0][1:-1]
-                    else:
-                        url = None
-            else:
-                url = None
-            
-            if not url:
-                break
-        except requests.exceptions.RequestException as e:
-            print(f'Error fetching connected clients: {e}')
-            break
-    
-    return all_clients
+# Function to sync the selected networks and report the clients that joined, left or changed
+def report_client_changes(args, api_key, selection, data_stream=None):
+    store = ClientStateStore(args.state)
+    output_file = None
+    writer = None
+    try:
+        if args.format in STREAMING_FORMATS:
+            writer = open_writer(args.format, ['Network', 'Change'] + client_headers(args.timezone), args.output, data_stream)
+        elif args.output:
+            output_file = open(args.output, 'w', encoding='utf-8')
 
-# Function to convert UTC time to GMT+8 (Singapore Time)
-def convert_to_gmt_plus_8(utc_time_str):
-    utc_time = datetime.strptime(utc_time_str, '%Y-%m-%dT%H:%M:%SZ')
-    utc_time = pytz.utc.localize(utc_time)
-    gmt_plus_8 = utc_time.astimezone(pytz.timezone('Asia/Singapore'))
-    return gmt_plus_8.strftime('%Y-%m-%d %H:%M:%S GMT+8')
+        for org_id, network in selection:
+            synced = sync_connected_clients(store, api_key, network['id'], org_id)
+            if synced is None:
+                continue
+            clients, changes, fetched = synced
+            print(f'Network: {network["name"]} ({network["id"]}) - {len(changes["joined"])} joined, '
+                  f'{len(changes["left"])} left, {len(changes["changed"])} changed, '
+                  f'{len(clients)} connected ({fetched} record(s) fetched)')
+
+            rows = change_rows(changes, args.timezone)
+            if writer:
+                writer.write_rows([network['name']] + row for row in rows)
+            elif rows:
+                from tabulate import tabulate
+                output = tabulate(rows, headers=['Change'] + client_headers(args.timezone), tablefmt="grid")
+                if output_file:
+                    output_file.write(f'Network: {network["name"]} ({network["id"]})\n{output}\n')
+                else:
+                    print(output)
+    finally:
+        if writer:
+            writer.close()
+        if output_file:
+            output_file.close()
+        store.close()
+
+# Function to load the clients of the selected networks into a compact ClientStore
+def load_client_store(api_key, selection):
+    store = ClientStore()
+    for org_id, network in selection:
+        store.extend(iter_connected_clients(api_key, network['id'], org_id), network['name'])
+    return store
+
+# Function to report client counts grouped by each --group-by column, within the clients matching --where
+def summarize_clients(args, api_key, selection, data_stream=None):
+    store = load_client_store(api_key, selection)
+    conditions = {}
+    for condition in args.where or []:
+        name, value = condition.split('=', 1)
+        conditions.setdefault(name.strip(), []).append(value.strip())
+    rows = store.where(**conditions) if conditions else None
+    print(f'Total connected clients: {len(store) if rows is None else len(rows)}')
+
+    if args.format in STREAMING_FORMATS:
+        with open_writer(args.format, ['Group', 'Value', 'Clients'], args.output, data_stream) as writer:
+            for name in args.group_by:
+                writer.write_rows([name, value, count] for value, count in store.count_by(name, rows))
+        return
+
+    from tabulate import tabulate
+    tables = [tabulate(store.count_by(name, rows), headers=[name.upper(), 'Clients'], tablefmt="grid")
+              for name in args.group_by]
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            output_file.write('\n'.join(tables) + '\n')
+    else:
+        print('\n'.join(tables))
+
+# Function to parse command-line options
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Cisco Meraki Wireless Connected Clients Information Retrieval')
+    add_common_arguments(parser)
+    parser.add_argument('--format', choices=('grid',) + STREAMING_FORMATS, default='grid',
+                        help='output format; csv, ndjson and parquet stream rows as they arrive (default: grid)')
+    parser.add_argument('--output', metavar='PATH', help='write the report to a file instead of stdout')
+    parser.add_argument('--timezone', default=config.DISPLAY_TIMEZONE,
+                        help=f'time zone for the Last Seen column (default: {config.DISPLAY_TIMEZONE})')
+    parser.add_argument('--incremental', action='store_true',
+                        help='fetch only clients seen since the previous run and report who joined, left or changed')
+    parser.add_argument('--state', metavar='PATH', default=config.CLIENT_STATE_PATH,
+                        help=f'client state file of --incremental (default: {config.CLIENT_STATE_PATH})')
+    parser.add_argument('--group-by', action='append', choices=list(CATEGORY_COLUMNS), metavar='COLUMN',
+                        help=f'report client counts per value of a column instead of the clients (repeatable; one of {", ".join(CATEGORY_COLUMNS)})')
+    parser.add_argument('--where', action='append', metavar='COLUMN=VALUE',
+                        help='only count clients whose column has this value, e.g. ssid=corp (repeatable; needs --group-by)')
+    args = parser.parse_args(argv)
+    if args.where and not args.group_by:
+        parser.error('--where needs --group-by')
+    for condition in args.where or []:
+        if condition.split('=', 1)[0].strip() not in CATEGORY_COLUMNS or '=' not in condition:
+            parser.error(f'--where {condition}: expected COLUMN=VALUE with COLUMN one of {", ".join(CATEGORY_COLUMNS)}')
+    if args.format == 'parquet' and not args.output:
+        parser.error('--format parquet needs --output')
+    if missing_dependency(args.format):
+        parser.error(missing_dependency(args.format))
+    try:
+        get_timezone(args.timezone)
+    except KeyError:  # pytz.UnknownTimeZoneError
+        parser.error(f'--timezone {args.timezone}: unknown time zone (use a name such as Asia/Kuala_Lumpur)')
+    return args
 
 # Main function
-def main():
+def main(argv=None):
+    args = parse_args(argv)
+    apply_common_arguments(args)
+
+    if args.format in STREAMING_FORMATS and not args.output:
+        # Keep stdout for the data stream; banner, prompts and messages go to stderr
+        data_stream = sys.stdout
+        with redirect_stdout(sys.stderr):
+            run(args, data_stream)
+    else:
+        run(args)
+
+# Function to select organizations and networks and report their connected clients
+def run(args, data_stream=None):
     # Banner message
     print('Cisco Meraki Wireless Connected Clients Information Retrieval')
     print('Developer: Mohd NeoTech <mohdneotech@gmail.com>')
     print('-----------------------------------------------')    
     
-    # Prompt for API key choice
-    use_default_api_key = input('Do you want to use the default API key? (y/n): ').strip().lower()
-    if use_default_api_key == 'y':
-        api_key = DEFAULT_API_KEY
-    else:
-        api_key = input('Enter your Meraki API key: ')
+    api_key = resolve_api_key(args)
 
     # Fetch organizations
     organizations = get_organizations(api_key)
 
-    if organizations:
-        # Display a list of organizations for the user to choose from
-        print('Select an organization:')
-        for i, org in enumerate(organizations, start=1):
-            print(f'{i}. {org["name"]} ({org["id"]})')
-        
-        org_choice = int(input('Enter the number of the organization: '))
-        if org_choice < 1 or org_choice > len(organizations):
-            print('Invalid organization choice.')
-            return
-        
-        selected_org = organizations[org_choice - 1]
-        org_id = selected_org['id']
-
-        # Fetch networks within the selected organization
-        networks = get_networks(api_key, org_id)
-
-        if networks:
-            # Display a list of networks for the user to choose from
-            print('Select a network:')
-            for i, network in enumerate(networks, start=1):
-                print(f'{i}. {network["name"]} ({network["id"]})')
-            
-            network_choice = int(input('Enter the number of the network: '))
-            if network_choice < 1 or network_choice > len(networks):
-                print('Invalid network choice.')
-                return
-            
-            selected_network = networks[network_choice - 1]
-            network_id = selected_network['id']
-
-            # Fetch all connected clients without specifying a timespan
-            connected_clients = get_all_connected_clients(api_key, network_id)
-
-            if connected_clients:
-                print(f'Total connected clients: {len(connected_clients)}')
-                print('Connected Clients Details:')
-                table = []
-                for client in connected_clients:
-                    last_seen_gmt_plus_8 = convert_to_gmt_plus_8(client.get("lastSeen", "N/A"))
-                    table.append([
-                        client.get("description", "N/A"),
-                        client.get("mac", "N/A"),
-                        client.get("ip", "N/A"),
-                        client.get("userAgent", "N/A"),
-                        client.get("vlan", "N/A"),
-                        client.get("ssid", "N/A"),
-                        last_seen_gmt_plus_8  # Display last seen time in GMT+8
-                    ])
-                
-                headers = ["Client Name", "MAC Address", "IP Address", "User Agent", "VLAN", "Access Point", "Last Seen (GMT+8)"]
-                print(tabulate(table, headers=headers, tablefmt="grid"))
-            else:
-                print('No connected clients found in the selected network.')
-        else:
-            print('No networks found in the selected organization.')
-    else:
+    if not organizations:
         print('No organizations found.')
+        return
+
+    # Select organizations and networks (all matching ones with --org/--network, otherwise prompt)
+    selection = select_networks(api_key, organizations, args.org, args.network)
+
+    if args.group_by:
+        summarize_clients(args, api_key, selection, data_stream)
+        report_metrics(get_client(api_key), args.metrics, args.metrics_file)
+        return
+
+    if args.incremental:
+        report_client_changes(args, api_key, selection, data_stream)
+        report_metrics(get_client(api_key), args.metrics, args.metrics_file)
+        return
+
+    if args.format in STREAMING_FORMATS:
+        # Stream every selected network into one output
+        headers = ['Network'] + client_headers(args.timezone)
+        with open_writer(args.format, headers, args.output, data_stream) as writer:
+            for org_id, network in selection:
+                count = stream_connected_clients(writer, api_key, network, org_id, args.timezone)
+                print(f'Network: {network["name"]} ({network["id"]}) - total connected clients: {count}')
+        report_metrics(get_client(api_key), args.metrics, args.metrics_file)
+        return
+
+    output_file = open(args.output, 'w', encoding='utf-8') if args.output else None
+    try:
+        for org_id, network in selection:
+            print(f'Network: {network["name"]} ({network["id"]})')
+            print_connected_clients(api_key, network, org_id, args.timezone, output_file)
+    finally:
+        if output_file:
+            output_file.close()
+
+    report_metrics(get_client(api_key), args.metrics, args.metrics_file)
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,117 @@
+# Desc: Submit bulk writes as Meraki action batches and map failures back to their targets
+# Author: Mohd NeoTech <mohdneotech@gmail.com>
+
+import re
+import time
+
+import requests
+
+import include.config as config
+
+# Function to build an action that updates one switch port
+def port_update_action(serial, port_id, body):
+    return {'resource': f'/devices/{serial}/switch/ports/{port_id}', 'operation': 'update', 'body': body}
+
+# Function to describe the target of an action as (serial, portId); portId is None for device actions
+def action_target(action):
+    parts = action['resource'].strip('/').split('/')
+    serial = parts[1] if len(parts) > 1 and parts[0] == 'devices' else None
+    port_id = parts[4] if len(parts) > 4 and parts[2:4] == ['switch', 'ports'] else None
+    return serial, port_id
+
+# Function to split actions into batches no larger than the API's per-batch limit
+def chunk_actions(actions, size=None):
+    size = size or config.ACTION_BATCH_SIZE
+    return [actions[i:i + size] for i in range(0, len(actions), size)]
+
+# Function to work out which actions an action batch error message refers to
+def _actions_for_error(message, actions):
+    match = re.search(r'\baction\s*(?:#|index\s*)?(\d+)', message, re.IGNORECASE)
+    if match and int(match.group(1)) < len(actions):
+        return [int(match.group(1))]
+    return [index for index, action in enumerate(actions)
+            if re.search(re.escape(action['resource']) + r'(?![\w-])', message)]
+
+# Function to turn a finished batch into one result per action
+def _batch_results(batch_id, actions, status):
+    errors = status.get('errors') or []
+    failed = status.get('failed') or bool(errors)
+    results = []
+    for action in actions:
+        serial, port_id = action_target(action)
+        results.append({'serial': serial, 'portId': port_id, 'batchId': batch_id,
+                        'status': 'rolled back' if failed else 'applied', 'detail': ''})
+
+    for message in errors:
+        indexes = _actions_for_error(message, actions) or range(len(actions))
+        for index in indexes:
+            results[index]['status'] = 'failed'
+            results[index]['detail'] = message
+    return results
+
+# Function to submit actions as asynchronous action batches and wait for them to finish.
+# At most config.ACTION_BATCH_MAX_RUNNING batches run at once (the API's per-org limit);
+# running batches are polled with a growing interval. A batch whose status cannot be read
+# config.ACTION_BATCH_POLL_FAILURES times in a row, or that has not finished within
+# config.ACTION_BATCH_TIMEOUT seconds, is given up on and its actions reported as failed.
+# Returns one result per action with its serial, portId, batchId and status ('applied',
+# 'failed' or 'rolled back').
+def run_action_batches(client, org_id, actions, progress=None):
+    batches = chunk_actions(list(actions))
+    results = []
+    running = {}
+    deadlines = {}
+    failures = {}
+    next_batch = 0
+    interval = config.ACTION_BATCH_POLL_INITIAL
+
+    while next_batch < len(batches) or running:
+        # Fill the free slots with new batches
+        while next_batch < len(batches) and len(running) < config.ACTION_BATCH_MAX_RUNNING:
+            batch_actions = batches[next_batch]
+            next_batch += 1
+            payload = {'confirmed': True, 'synchronous': False, 'actions': batch_actions}
+            try:
+                batch = client.post(f'/organizations/{org_id}/actionBatches', json=payload, org_id=org_id)
+            except requests.exceptions.RequestException as e:
+                results.extend(_batch_results(None, batch_actions, {'failed': True, 'errors': [str(e)]}))
+                if progress:
+                    progress(len(batch_actions))
+                continue
+            running[batch['id']] = batch_actions
+            deadlines[batch['id']] = time.monotonic() + config.ACTION_BATCH_TIMEOUT
+            failures[batch['id']] = 0
+            interval = config.ACTION_BATCH_POLL_INITIAL
+
+        if not running:
+            continue
+
+        time.sleep(interval)
+        interval = min(interval * 2, config.ACTION_BATCH_POLL_MAX)
+
+        for batch_id in list(running):
+            try:
+                batch = client.get(f'/organizations/{org_id}/actionBatches/{batch_id}', org_id=org_id)
+            except requests.exceptions.RequestException as e:
+                # The batch may still be running server-side; poll again next round unless it keeps failing
+                failures[batch_id] += 1
+                status = None
+                if failures[batch_id] >= config.ACTION_BATCH_POLL_FAILURES:
+                    status = {'failed': True, 'errors': [f'Could not read batch status: {e}']}
+            else:
+                failures[batch_id] = 0
+                status = batch.get('status') or {}
+                if not (status.get('completed') or status.get('failed')):
+                    status = None
+
+            if status is None and time.monotonic() >= deadlines[batch_id]:
+                status = {'failed': True,
+                          'errors': [f'Batch did not finish within {config.ACTION_BATCH_TIMEOUT} seconds']}
+            if status is not None:
+                batch_actions = running.pop(batch_id)
+                del deadlines[batch_id], failures[batch_id]
+                results.extend(_batch_results(batch_id, batch_actions, status))
+                if progress:
+                    progress(len(batch_actions))
+
+    return results
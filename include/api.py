@@ -0,0 +1,190 @@
+# Desc: Shared HTTP client for Meraki API scripts
+# Author: Mohd NeoTech <mohdneotech@gmail.com>
+
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import include.config as config
+from include.cache import ResponseCache, ttl_for
+from include.jsonutil import iter_array, response_json
+from include.metrics import Metrics, endpoint_name
+from include.pagination import iter_pages, paginate
+from include.ratelimit import RateLimiter, backoff_delay, retry_after
+
+# Shared clients, one per API key, so every function in a run reuses the same connection pool
+_clients = {}
+_clients_lock = threading.Lock()
+
+# Server-side errors that are worth retrying
+RETRY_STATUS_CODES = (500, 502, 503, 504)
+
+# Methods that are safe to send again when a request may already have reached the API (a timeout,
+# a dropped connection or a 5xx); other methods (POST) are only retried when the API rejected them
+# with a 429 or no connection was made
+IDEMPOTENT_METHODS = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE')
+
+# Class that owns a keep-alive connection pool, the default headers and the rate limiter for the Meraki API
+class MerakiClient:
+    def __init__(self, api_key, base_url=None, cache=None):
+        self.api_key = api_key
+        self.base_url = (base_url or config.BASE_URL).rstrip('/')
+        self.rate_limiter = RateLimiter()
+        self.cache = cache
+        self.metrics = Metrics()
+
+        self.session = requests.Session()
+        self.session.headers.update({
+            'X-Cisco-Meraki-API-Key': api_key,
+            'Accept': 'application/json',
+            'Accept-Encoding': 'gzip, deflate',
+            'User-Agent': config.USER_AGENT,
+        })
+
+        adapter = HTTPAdapter(pool_connections=config.POOL_CONNECTIONS, pool_maxsize=config.POOL_MAXSIZE)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    # Function to build a full URL from an API path (absolute URLs, e.g. pagination links, pass through)
+    def url(self, path):
+        if path.startswith('http://') or path.startswith('https://'):
+            return path
+        return f'{self.base_url}/{path.lstrip("/")}'
+
+    # Function to send a request and return the raw response after checking its status.
+    # GET requests to slow-changing endpoints are answered from the response cache when possible.
+    # With stream on, the body is left unread (and uncached) for iter_response_items.
+    def request(self, method, path, params=None, json=None, org_id=None, use_cache=True, stream=False):
+        url = self.url(path)
+        if stream:
+            return self._send(method, url, params, json, org_id, stream=True)
+        if method == 'GET' and use_cache and self.cache is not None:
+            full_url = requests.Request('GET', url, params=params).prepare().url
+            if ttl_for(full_url) > 0:
+                return self._cached_get(full_url, org_id)
+        return self._send(method, url, params, json, org_id)
+
+    # Function to answer a GET from the cache, revalidating stale entries with If-None-Match
+    def _cached_get(self, url, org_id):
+        key = self.cache.key(self.api_key, url)
+        cached, fresh = self.cache.lookup(key, url)
+        if fresh:
+            self.metrics.record_cache_hit(endpoint_name('GET', url))
+            return cached
+
+        headers = None
+        if cached is not None and cached.headers.get('ETag'):
+            headers = {'If-None-Match': cached.headers['ETag']}
+
+        response = self._send('GET', url, None, None, org_id, headers)
+        if response.status_code == 304 and cached is not None:
+            self.cache.touch(key)
+            return cached
+
+        self.cache.store(key, url, response)
+        return response
+
+    # Function to send a request within the organization's rate limit, retrying on 429 (and on
+    # timeouts, dropped connections and 5xx for idempotent methods), and return the raw response
+    # after checking its status
+    def _send(self, method, url, params=None, json=None, org_id=None, headers=None, stream=False):
+        endpoint = endpoint_name(method, url)
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        attempt = 0
+
+        while True:
+            self.metrics.record_wait(self.rate_limiter.acquire(org_id))
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, url, params=params, json=json, headers=headers,
+                                                timeout=config.REQUEST_TIMEOUT, stream=stream)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                self.metrics.record_request(endpoint, None, time.perf_counter() - started)
+                if attempt >= config.MAX_RETRIES or not (idempotent or isinstance(e, requests.exceptions.ConnectTimeout)):
+                    raise
+                self.metrics.record_retry(endpoint)
+                time.sleep(backoff_delay(attempt))
+                attempt += 1
+                continue
+
+            self.metrics.record_request(endpoint, response.status_code, time.perf_counter() - started,
+                                        _bytes_received(response), len(response.request.body or b''))
+
+            if response.status_code == 429 or (idempotent and response.status_code in RETRY_STATUS_CODES):
+                if attempt < config.MAX_RETRIES:
+                    self.metrics.record_retry(endpoint)
+                    response.close()
+                    delay = retry_after(response)
+                    if delay is None:
+                        delay = backoff_delay(attempt)
+                    else:
+                        delay += random.uniform(0, config.RETRY_BACKOFF_BASE)
+                    if response.status_code == 429:
+                        self.rate_limiter.throttle(org_id, delay)
+                    else:
+                        time.sleep(delay)
+                    attempt += 1
+                    continue
+
+            response.raise_for_status()
+            return response
+
+    # Function to send a GET request and return the decoded JSON body
+    def get(self, path, params=None, org_id=None):
+        return response_json(self.request('GET', path, params=params, org_id=org_id))
+
+    # Function to yield the elements of a streamed JSON array response as the body arrives,
+    # then close the response and count the bytes it took
+    def iter_response_items(self, response):
+        try:
+            yield from iter_array(response.iter_content(config.JSON_STREAM_CHUNK_SIZE))
+            self.metrics.record_bytes(endpoint_name(response.request.method, response.url), _bytes_received(response))
+        finally:
+            response.close()
+
+    # Function to yield each page of a paginated GET endpoint (see include/pagination.py)
+    def get_pages(self, path, params=None, org_id=None, per_page=None, prefetch=True):
+        return iter_pages(self, path, params, org_id, per_page, prefetch)
+
+    # Function to yield the items of a paginated GET endpoint one by one (decoded as they stream in with stream on)
+    def paginate(self, path, params=None, org_id=None, per_page=None, prefetch=True, stream=False):
+        return paginate(self, path, params, org_id, per_page, prefetch, stream)
+
+    # Function to send a POST request and return the decoded JSON body
+    def post(self, path, json=None, org_id=None):
+        response = self.request('POST', path, json=json, org_id=org_id)
+        return response_json(response) if response.content else None
+
+    # Function to send a PUT request and return the decoded JSON body
+    def put(self, path, json=None, org_id=None):
+        response = self.request('PUT', path, json=json, org_id=org_id)
+        return response_json(response) if response.content else None
+
+    # Function to close the pooled connections
+    def close(self):
+        self.session.close()
+
+# Function to count the bytes of a response as they came over the wire (compressed, when gzip was used)
+def _bytes_received(response):
+    try:
+        return response.raw.tell()
+    except (AttributeError, TypeError, ValueError):
+        return len(response.content)
+
+# Function to get the shared client for an API key, creating it on first use
+def get_client(api_key):
+    with _clients_lock:
+        client = _clients.get(api_key)
+        if client is None:
+            client = MerakiClient(api_key, cache=ResponseCache() if config.CACHE_ENABLED else None)
+            _clients[api_key] = client
+        return client
+
+# Function to forget the shared clients without closing them, so a forked worker process opens
+# its own connections instead of sharing the parent's sockets and cache database handle
+def reset_clients():
+    with _clients_lock:
+        _clients.clear()
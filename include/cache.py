@@ -0,0 +1,114 @@
+# Desc: Persistent SQLite response cache for Meraki API scripts
+# Author: Mohd NeoTech <mohdneotech@gmail.com>
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+import include.config as config
+
+# Response headers kept with a cached body
+_KEPT_HEADERS = ('Content-Type', 'ETag', 'Link', 'Last-Modified')
+
+# Function to find the time-to-live of a URL from config.CACHE_TTLS (0 means never cache)
+def ttl_for(url):
+    path = url.split('?', 1)[0]
+    for pattern, ttl in config.CACHE_TTLS:
+        if re.search(pattern, path):
+            return ttl
+    return 0
+
+# Class storing GET responses in SQLite with per-endpoint TTLs, an LRU size cap and ETag revalidation
+class ResponseCache:
+    def __init__(self, path=None, max_entries=None):
+        self.path = path or config.CACHE_PATH
+        self.max_entries = max_entries or config.CACHE_MAX_ENTRIES
+        self.lock = threading.Lock()
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.db = sqlite3.connect(self.path, check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('''CREATE TABLE IF NOT EXISTS responses (
+                               key TEXT PRIMARY KEY,
+                               url TEXT NOT NULL,
+                               headers TEXT NOT NULL,
+                               body BLOB NOT NULL,
+                               etag TEXT,
+                               stored_at REAL NOT NULL,
+                               accessed_at REAL NOT NULL)''')
+        self.db.execute('CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)')
+        self.db.commit()
+
+    # Function to build the cache key of a request (the API key is part of it, as results differ per key)
+    @staticmethod
+    def key(api_key, url):
+        return hashlib.sha256(f'{api_key}\n{url}'.encode()).hexdigest()
+
+    # Function to look up a cached entry; returns (response, is_fresh) or (None, False)
+    def lookup(self, key, url):
+        with self.lock:
+            row = self.db.execute('SELECT headers, body, stored_at FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None, False
+            self.db.execute('UPDATE responses SET accessed_at = ? WHERE key = ?', (time.time(), key))
+            self.db.commit()
+
+        headers, body, stored_at = row
+        fresh = time.time() - stored_at < ttl_for(url)
+        return build_response(url, json.loads(headers), body), fresh
+
+    # Function to store a successful response if its endpoint is cacheable
+    def store(self, key, url, response):
+        if ttl_for(url) <= 0:
+            return
+        headers = {name: response.headers[name] for name in _KEPT_HEADERS if name in response.headers}
+        now = time.time()
+        with self.lock:
+            self.db.execute('INSERT OR REPLACE INTO responses (key, url, headers, body, etag, stored_at, accessed_at) '
+                            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                            (key, url, json.dumps(headers), response.content, headers.get('ETag'), now, now))
+            self._evict()
+            self.db.commit()
+
+    # Function to mark a stale entry fresh again after the API answered 304 Not Modified
+    def touch(self, key):
+        now = time.time()
+        with self.lock:
+            self.db.execute('UPDATE responses SET stored_at = ?, accessed_at = ? WHERE key = ?', (now, now, key))
+            self.db.commit()
+
+    # Function to drop the least recently used entries above the size cap (call with the lock held)
+    def _evict(self):
+        count = self.db.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+        if count > self.max_entries:
+            self.db.execute('DELETE FROM responses WHERE key IN '
+                            '(SELECT key FROM responses ORDER BY accessed_at LIMIT ?)', (count - self.max_entries,))
+
+    # Function to remove every cached response
+    def clear(self):
+        with self.lock:
+            self.db.execute('DELETE FROM responses')
+            self.db.commit()
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+# Function to rebuild a requests.Response from a cached body and headers
+def build_response(url, headers, body):
+    response = requests.Response()
+    response.status_code = 200
+    response.url = url
+    response.headers = CaseInsensitiveDict(headers)
+    response._content = body
+    response.encoding = 'utf-8'
+    return response
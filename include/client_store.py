@@ -0,0 +1,172 @@
+# Desc: Compact columnar in-memory store of client records with group-by counts and filters
+# Author: Mohd NeoTech <mohdneotech@gmail.com>
+
+import socket
+import struct
+import time
+from array import array
+from collections import Counter
+
+from include.client_sync import last_seen_epoch
+from include.timeutil import load_numpy
+
+# Repeated values stored once per distinct value, keyed by the names used for grouping and filtering
+CATEGORY_COLUMNS = {
+    'network': 'networkName',
+    'ssid': 'ssid',
+    'vlan': 'vlan',
+    'ap': 'recentDeviceSerial',
+    'ap_name': 'recentDeviceName',
+    'os': 'os',
+    'status': 'status',
+    'manufacturer': 'manufacturer',
+    'user': 'user',
+}
+
+# Marks a missing MAC or IPv4 address in the packed integer columns
+_MISSING_MAC = 2 ** 64 - 1
+_MISSING_IP = 0
+
+# Function to pack a MAC address into an integer (the missing marker when it is absent or malformed)
+def _pack_mac(mac):
+    try:
+        return int(mac.replace(':', '').replace('-', ''), 16)
+    except (AttributeError, ValueError):
+        return _MISSING_MAC
+
+# Function to unpack an integer back into a MAC address string
+def _unpack_mac(value):
+    if value == _MISSING_MAC:
+        return None
+    text = f'{value:012x}'
+    return ':'.join(text[i:i + 2] for i in range(0, 12, 2))
+
+# Function to pack an IPv4 address into an integer (the missing marker when it is absent or not IPv4)
+def _pack_ip(ip):
+    try:
+        return struct.unpack('!I', socket.inet_aton(ip))[0] if ip and ip.count('.') == 3 else _MISSING_IP
+    except OSError:
+        return _MISSING_IP
+
+# Function to unpack an integer back into an IPv4 address string
+def _unpack_ip(value):
+    return None if value == _MISSING_IP else socket.inet_ntoa(struct.pack('!I', value))
+
+# Class holding the distinct values of one column; rows store a small integer code instead of the value
+class CategoryColumn:
+    def __init__(self):
+        self.values = []
+        self.codes_by_value = {}
+        self.codes = array('I')
+
+    def append(self, value):
+        code = self.codes_by_value.get(value)
+        if code is None:
+            code = self.codes_by_value[value] = len(self.values)
+            self.values.append(value)
+        self.codes.append(code)
+
+    # Function to get the codes of the values matching one wanted value or a collection of them,
+    # compared as text so command-line filters such as vlan=10 match integer VLANs
+    def codes_for(self, wanted):
+        if not isinstance(wanted, (list, tuple, set, frozenset)):
+            wanted = [wanted]
+        wanted = {str(value) for value in wanted}
+        return {code for code, value in enumerate(self.values) if str(value) in wanted}
+
+# Class storing client records column by column: MAC and IPv4 addresses packed into integers, last seen
+# times and usage in float arrays, and repeated values (SSID, VLAN, AP, OS, ...) as interned codes. Holds
+# hundreds of thousands of clients in a fraction of the memory of the raw JSON dictionaries, and groups or
+# filters them without rebuilding those dictionaries.
+class ClientStore:
+    def __init__(self):
+        self.ids = []
+        self.descriptions = []
+        self.macs = array('Q')
+        self.ips = array('I')
+        self.last_seen = array('d')
+        self.sent = array('d')
+        self.received = array('d')
+        self.categories = {name: CategoryColumn() for name in CATEGORY_COLUMNS}
+
+    def __len__(self):
+        return len(self.ids)
+
+    # Function to add one client record (network_name fills in the record's networkName, as the API's
+    # client records do not name their network)
+    def add(self, client, network_name=None):
+        usage = client.get('usage') or {}
+        self.ids.append(client.get('id'))
+        self.descriptions.append(client.get('description'))
+        self.macs.append(_pack_mac(client.get('mac')))
+        self.ips.append(_pack_ip(client.get('ip')))
+        self.last_seen.append(last_seen_epoch(client))
+        self.sent.append(usage.get('sent') or 0)
+        self.received.append(usage.get('recv') or 0)
+        for name, field in CATEGORY_COLUMNS.items():
+            value = network_name if name == 'network' and network_name else client.get(field)
+            self.categories[name].append(value)
+
+    # Function to add a batch of client records
+    def extend(self, clients, network_name=None):
+        for client in clients:
+            self.add(client, network_name)
+
+    # Function to get the row numbers matching every condition, given as column=value or
+    # column=[values]; column names are the keys of CATEGORY_COLUMNS. Returns all rows when
+    # there are no conditions.
+    def where(self, **conditions):
+        for name in conditions:
+            if name not in self.categories:
+                raise ValueError(f'Unknown client column: {name} (use one of {", ".join(CATEGORY_COLUMNS)})')
+
+        numpy = load_numpy()
+        if numpy is not None:
+            rows = numpy.ones(len(self), dtype=bool)
+            for name, wanted in conditions.items():
+                codes = numpy.frombuffer(self.categories[name].codes, dtype=numpy.uint32)
+                rows &= numpy.isin(codes, list(self.categories[name].codes_for(wanted)))
+            return numpy.flatnonzero(rows).tolist()
+
+        rows = range(len(self))
+        for name, wanted in conditions.items():
+            codes, matching = self.categories[name].codes, self.categories[name].codes_for(wanted)
+            rows = [row for row in rows if codes[row] in matching]
+        return list(rows)
+
+    # Function to count clients per value of a column, optionally within some rows; returns
+    # (value, count) pairs with the largest count first
+    def count_by(self, name, rows=None):
+        if name not in self.categories:
+            raise ValueError(f'Unknown client column: {name} (use one of {", ".join(CATEGORY_COLUMNS)})')
+        column = self.categories[name]
+
+        numpy = load_numpy()
+        if numpy is not None and len(self):
+            codes = numpy.frombuffer(column.codes, dtype=numpy.uint32)
+            if rows is not None:
+                codes = codes[numpy.asarray(rows, dtype=numpy.intp)]
+            counts = Counter(dict(enumerate(numpy.bincount(codes, minlength=len(column.values)).tolist())))
+        else:
+            codes = column.codes if rows is None else (column.codes[row] for row in rows)
+            counts = Counter(codes)
+        return [(column.values[code], count) for code, count in counts.most_common() if count]
+
+    # Function to rebuild the record of one row as a dictionary shaped like the API's client records
+    def record(self, row):
+        record = {
+            'id': self.ids[row],
+            'description': self.descriptions[row],
+            'mac': _unpack_mac(self.macs[row]),
+            'ip': _unpack_ip(self.ips[row]),
+            'lastSeen': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(self.last_seen[row])) if self.last_seen[row] else None,
+            'usage': {'sent': self.sent[row], 'recv': self.received[row]},
+        }
+        for name, field in CATEGORY_COLUMNS.items():
+            record[field] = self.categories[name].values[self.categories[name].codes[row]]
+        return record
+
+    # Function to iterate over rebuilt records, optionally only of some rows
+    def records(self, rows=None):
+        for row in range(len(self)) if rows is None else rows:
+            yield self.record(row)
@@ -0,0 +1,108 @@
+# Desc: Local SQLite state of network clients for incremental client syncs
+# Author: Mohd NeoTech <mohdneotech@gmail.com>
+
+import calendar
+import json
+import os
+import sqlite3
+import time
+
+import include.config as config
+from include.timeutil import parse_utc
+
+# Function to get the key of a client record (its client ID, or its MAC address when there is none)
+def client_key(client):
+    return client.get('id') or client.get('mac')
+
+# Function to get when a client was last seen, in seconds since the epoch (0 when unknown)
+def last_seen_epoch(client):
+    seen = client.get('lastSeen')
+    if isinstance(seen, (int, float)):
+        return float(seen)
+    seen = parse_utc(seen)
+    return float(calendar.timegm(seen.timetuple())) if seen else 0.0
+
+# Function to format seconds since the epoch as the API's t0 parameter
+def format_t0(epoch):
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(epoch))
+
+# Function to list the compared fields that differ between two records of the same client
+def changed_fields(old, new, fields=None):
+    return [field for field in (fields or config.CLIENT_SYNC_FIELDS) if old.get(field) != new.get(field)]
+
+# Function to merge freshly fetched client records into a snapshot. Clients missing from the snapshot
+# have joined, clients whose compared fields differ have changed, and clients of the snapshot that were
+# neither fetched again nor seen since `left_before` (seconds since the epoch) have left. Returns (merged snapshot, changes),
+# where changes holds lists of 'joined' and 'left' records and of 'changed' (record, fields) pairs.
+def merge_clients(snapshot, fetched, left_before):
+    merged = dict(snapshot)
+    changes = {'joined': [], 'left': [], 'changed': []}
+    seen = set()
+
+    for client in fetched:
+        key = client_key(client)
+        if not key:
+            continue
+        seen.add(key)
+        old = merged.get(key)
+        if old is None:
+            changes['joined'].append(client)
+        else:
+            fields = changed_fields(old, client)
+            if fields:
+                changes['changed'].append((client, fields))
+        merged[key] = client
+
+    for key, client in list(merged.items()):
+        if key not in seen and last_seen_epoch(client) < left_before:
+            changes['left'].append(merged.pop(key))
+    return merged, changes
+
+# Class keeping the last synced client list of each network in SQLite
+class ClientStateStore:
+    def __init__(self, path=None):
+        self.path = path or config.CLIENT_STATE_PATH
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.db = sqlite3.connect(self.path)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('''CREATE TABLE IF NOT EXISTS clients (
+                               network_id TEXT NOT NULL,
+                               client_key TEXT NOT NULL,
+                               record TEXT NOT NULL,
+                               PRIMARY KEY (network_id, client_key))''')
+        self.db.execute('''CREATE TABLE IF NOT EXISTS syncs (
+                               network_id TEXT PRIMARY KEY,
+                               synced_at REAL NOT NULL)''')
+        self.db.commit()
+
+    # Function to get when a network was last synced (seconds since the epoch), or None if never
+    def last_sync(self, network_id):
+        row = self.db.execute('SELECT synced_at FROM syncs WHERE network_id = ?', (network_id,)).fetchone()
+        return row[0] if row else None
+
+    # Function to load a network's stored clients as a dictionary keyed by client_key
+    def snapshot(self, network_id):
+        rows = self.db.execute('SELECT client_key, record FROM clients WHERE network_id = ?', (network_id,))
+        return {key: json.loads(record) for key, record in rows}
+
+    # Function to save the result of a sync in one transaction: clients that left are deleted and every
+    # fetched client is upserted, unchanged ones included, as their lastSeen decides when they leave
+    def save(self, network_id, changes, synced_at, fetched=()):
+        with self.db:
+            self.db.executemany('DELETE FROM clients WHERE network_id = ? AND client_key = ?',
+                                [(network_id, client_key(client)) for client in changes['left']])
+            self.db.executemany('INSERT OR REPLACE INTO clients (network_id, client_key, record) VALUES (?, ?, ?)',
+                                [(network_id, client_key(client), json.dumps(client))
+                                 for client in fetched if client_key(client)])
+            self.db.execute('INSERT OR REPLACE INTO syncs (network_id, synced_at) VALUES (?, ?)', (network_id, synced_at))
+
+    # Function to forget a network's state so its next sync is a full one
+    def reset(self, network_id):
+        with self.db:
+            self.db.execute('DELETE FROM clients WHERE network_id = ?', (network_id,))
+            self.db.execute('DELETE FROM syncs WHERE network_id = ?', (network_id,))
+
+    def close(self):
+        self.db.close()
@@ -0,0 +1,39 @@
+# Desc: Bounded-concurrency helpers for Meraki API scripts
+# Author: Mohd NeoTech <mohdneotech@gmail.com>
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import include.config as config
+
+# Function to call func on every item with at most `concurrency` calls in flight, yielding
+# (item, result, error) tuples in the same order as the items as soon as each one is ready,
+# where error is the exception raised for that item (or None). Only a small window of
+# results is held at a time, so this also works for very long item streams.
+def iter_concurrently(func, items, concurrency=None):
+    concurrency = concurrency or config.CONCURRENCY
+
+    def call(item):
+        try:
+            return item, func(item), None
+        except Exception as e:
+            return item, None, e
+
+    if concurrency <= 1:
+        for item in items:
+            yield call(item)
+        return
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        pending = deque()
+        for item in items:
+            pending.append(executor.submit(call, item))
+            if len(pending) >= concurrency * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+# Function to call func on every item with at most `concurrency` calls in flight.
+# Returns a list of (item, result, error) tuples in the same order as the items.
+def run_concurrently(func, items, concurrency=None):
+    return list(iter_concurrently(func, items, concurrency))
@@ -1,8 +1,121 @@
 # Desc: Configuration file for Meraki API scripts
 # Author: Mohd NeoTech <mohdneotech@gmail.com>
 
+import os
+
 # Default API key (you can replace this with your default key)
 DEFAULT_API_KEY = 'STORE-DEFAULT-API-KEY-HERE'
 
-# Meraki base URL
-BASE_URL = 'https://api.meraki.com/api/v1'
\ No newline at end of file
+# Meraki base URL (MERAKI_BASE_URL overrides it, e.g. to point the scripts at benchmarks/mock_server.py)
+BASE_URL = os.environ.get('MERAKI_BASE_URL', 'https://api.meraki.com/api/v1')
+
+# HTTP client settings
+USER_AGENT = 'mohdneotech-meraki-scripts'
+REQUEST_TIMEOUT = 30
+POOL_CONNECTIONS = 4
+POOL_MAXSIZE = 16
+
+# Rate limiting and retry settings (Meraki allows about 10 requests per second per organization)
+RATE_LIMIT_PER_SECOND = 10
+RATE_LIMIT_BURST = 10
+MAX_RETRIES = 5
+RETRY_BACKOFF_BASE = 0.5
+RETRY_BACKOFF_MAX = 30
+
+# Number of API calls run at the same time by the bulk operations (1 = one at a time)
+CONCURRENCY = 8
+
+# Worker processes used to work through several organizations in parallel (1 = all in this process).
+# Each process has its own connection pool and per-organization rate limiters.
+PROCESSES = 1
+
+# How getWifiConnected.py counts clients per AP:
+#   'network' - one paginated pass over the network-wide clients endpoint (fewest API calls)
+#   'per-ap'  - one clients request per AP (useful for cross-checking the results)
+CLIENT_COUNT_MODE = 'network'
+NETWORK_CLIENTS_PER_PAGE = 5000
+
+# Watch mode of getWifiConnected.py: each AP is polled every WATCH_MIN_INTERVAL seconds while its client
+# count changes, backing off (doubling) up to WATCH_MAX_INTERVAL while it stays the same. APs with at
+# least WATCH_BUSY_CLIENTS clients back off no further than WATCH_BUSY_MAX_INTERVAL.
+WATCH_MIN_INTERVAL = 30
+WATCH_MAX_INTERVAL = 300
+WATCH_BUSY_CLIENTS = 20
+WATCH_BUSY_MAX_INTERVAL = 60
+# Seconds between rediscoveries of the watched networks' APs
+WATCH_TOPOLOGY_REFRESH = 900
+
+# Largest page size requested from paginated list endpoints
+PER_PAGE_MAX = 1000
+# Most network IDs sent as a device list filter; longer selections are filtered locally to keep URLs short
+DEVICE_FILTER_MAX_NETWORK_IDS = 20
+
+# Bytes read at a time when a response body is decoded as it streams in
+JSON_STREAM_CHUNK_SIZE = 65536
+
+# Time zone used to display timestamps (any IANA name, e.g. 'Asia/Singapore', 'Europe/London')
+DISPLAY_TIMEZONE = 'Asia/Singapore'
+
+# Response cache for slow-changing endpoints (set CACHE_ENABLED = False or pass --no-cache to bypass)
+CACHE_ENABLED = True
+CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'meraki-scripts', 'responses.sqlite')
+CACHE_MAX_ENTRIES = 5000
+# (URL path regex, seconds to keep) - the first match wins; endpoints without a match are never cached
+CACHE_TTLS = [
+    (r'/organizations$', 3600),
+    (r'/organizations/[^/]+/networks$', 3600),
+    (r'/devices$', 900),
+    (r'/devices/[^/]+/switch/ports$', 300),
+]
+
+# Journal of completed switch clones, so an interrupted batch can be rerun without redoing finished targets
+CLONE_JOURNAL_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'meraki-scripts', 'clone-journal.ndjson')
+
+# Local topology snapshot (organizations, networks, devices, switch ports, clients) searched by lookupTopology.py
+TOPOLOGY_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'meraki-scripts', 'topology.sqlite')
+
+# Local state of the last client sync per network, used by getWifiConnectedUsers.py --incremental
+CLIENT_STATE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'meraki-scripts', 'client-state.sqlite')
+# Clients not seen for this many seconds have left (86400 matches the API's default client list timespan)
+CLIENT_SYNC_WINDOW = 86400
+# Seconds an incremental sync reaches back before the previous one, covering late-reported client activity
+CLIENT_SYNC_OVERLAP = 300
+# Client fields compared between syncs; a difference in any of them reports the client as changed
+CLIENT_SYNC_FIELDS = ('description', 'ip', 'ip6', 'vlan', 'ssid', 'recentDeviceSerial', 'status', 'user')
+
+# Action batches (bulk writes): actions per batch, batches running at once per organization, polling interval bounds
+ACTION_BATCH_SIZE = 100
+ACTION_BATCH_MAX_RUNNING = 5
+ACTION_BATCH_POLL_INITIAL = 1
+ACTION_BATCH_POLL_MAX = 15
+# Consecutive failed status polls, and seconds since submission, after which a batch is given up on as failed
+ACTION_BATCH_POLL_FAILURES = 5
+ACTION_BATCH_TIMEOUT = 1800
+
+# Switch port telemetry (getPortsFromMS.py --telemetry): seconds of history per status request (at most 31 days),
+# busiest ports listed, and standard deviations above the fleet mean that make a switch's port error rate an outlier
+PORT_STATUS_TIMESPAN = 86400
+PORT_TOP_N = 10
+PORT_ERROR_OUTLIER_SIGMA = 2
+# Port status errors that only describe an unused port, so they do not count towards error rates
+PORT_IGNORED_ERRORS = ('Port disconnected',)
+# Total PoE budget in watts per switch model; switches of models not listed show no headroom
+POE_BUDGETS = {
+    'MS120-8LP': 67, 'MS120-8FP': 124, 'MS120-24P': 370, 'MS120-48LP': 370, 'MS120-48FP': 740,
+    'MS125-24P': 370, 'MS125-48LP': 370, 'MS125-48FP': 740,
+    'MS210-24P': 370, 'MS210-48LP': 370, 'MS210-48FP': 740,
+    'MS225-24P': 370, 'MS225-48LP': 370, 'MS225-48FP': 740,
+    'MS250-24P': 370, 'MS250-48LP': 370, 'MS250-48FP': 740,
+    'MS350-24P': 370, 'MS350-48LP': 370, 'MS350-48FP': 740,
+}
+
+# Local history of AP client counts (getWifiConnected.py --record), its raw sample retention in seconds,
+# its rollups as (bucket seconds, seconds kept) from finest to coarsest, and the most buckets per AP a range
+# query reads before moving to a coarser rollup
+HISTORY_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'meraki-scripts', 'client-history.sqlite')
+HISTORY_RAW_RETENTION = 2 * 86400
+HISTORY_ROLLUPS = ((300, 35 * 86400), (3600, 400 * 86400), (86400, 5 * 365 * 86400))
+HISTORY_QUERY_BUCKETS = 300
+
+# Upper bounds (seconds) of the request latency histogram buckets
+METRICS_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
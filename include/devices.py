@@ -0,0 +1,68 @@
+# Desc: Shared device queries with filters pushed down to the Meraki API
+# Author: Mohd NeoTech <mohdneotech@gmail.com>
+
+import include.config as config
+from include.api import get_client
+
+# Function to build the query parameters of the organization devices endpoint from filters
+# (list parameters are sent as repeated keys, e.g. productTypes[]=switch&productTypes[]=wireless)
+def device_query_params(product_types=None, models=None, network_ids=None, tags=None, tags_filter_type=None):
+    params = {}
+    if product_types:
+        params['productTypes[]'] = list(product_types)
+    if models:
+        params['models[]'] = list(models)
+    if network_ids:
+        params['networkIds[]'] = list(network_ids)
+    if tags:
+        params['tags[]'] = list(tags)
+        params['tagsFilterType'] = tags_filter_type or 'withAnyTags'
+    return params
+
+# Function to check a device against the same filters on the client side, plus model prefixes
+# (such as 'MS'), which the API cannot filter on. Fields a record lacks do not count against it,
+# and an empty network ID list (unlike None) matches no device.
+def device_matches(device, product_types=None, models=None, network_ids=None, tags=None, tags_filter_type=None,
+                   model_prefixes=None):
+    if product_types and device.get('productType') and device['productType'] not in product_types:
+        return False
+    if models and device.get('model') not in models:
+        return False
+    if network_ids is not None and device.get('networkId') not in network_ids:
+        return False
+    if tags:
+        device_tags = set(device.get('tags') or [])
+        if tags_filter_type == 'withAllTags':
+            matched = device_tags.issuperset(tags)
+        else:
+            matched = bool(device_tags.intersection(tags))
+        if not matched:
+            return False
+    if model_prefixes and not (device.get('model') or '').startswith(tuple(model_prefixes)):
+        return False
+    return True
+
+# Function to list an organization's devices, asking the API for only the product types, models,
+# networks and tags wanted and paginating through the result. The same filters are checked again
+# on the client side as a fallback, which costs nothing when the API already applied them. More
+# than config.DEVICE_FILTER_MAX_NETWORK_IDS networks are only filtered on the client side, as each
+# ID adds to the request URL; no networks at all means no devices and no request.
+def get_org_devices(api_key, org_id, product_types=None, models=None, network_ids=None, tags=None,
+                    tags_filter_type=None, model_prefixes=None):
+    if network_ids is not None:
+        network_ids = set(network_ids)
+        if not network_ids:
+            return []
+    query_network_ids = sorted(network_ids) if network_ids and len(network_ids) <= config.DEVICE_FILTER_MAX_NETWORK_IDS else None
+    params = device_query_params(product_types, models, query_network_ids, tags, tags_filter_type)
+    devices = get_client(api_key).paginate(f'/organizations/{org_id}/devices', params=params, org_id=org_id)
+    return [device for device in devices
+            if device_matches(device, product_types, models, network_ids, tags, tags_filter_type, model_prefixes)]
+
+# Function to list the Meraki MS switches of an organization, optionally in some networks only
+def get_switches(api_key, org_id, network_ids=None):
+    return get_org_devices(api_key, org_id, product_types=['switch'], network_ids=network_ids, model_prefixes=('MS',))
+
+# Function to list the Meraki MR access points of an organization, optionally in some networks only
+def get_access_points(api_key, org_id, network_ids=None):
+    return get_org_devices(api_key, org_id, product_types=['wireless'], network_ids=network_ids, model_prefixes=('MR',))
@@ -0,0 +1,42 @@
+# Desc: Shared organization and network discovery for Meraki API scripts
+# Author: Mohd NeoTech <mohdneotech@gmail.com>
+
+import requests
+
+from include.api import get_client
+from include.selection import child_selectors, select
+
+# Function to fetch the organizations the API key can access
+def get_organizations(api_key):
+    url = '/organizations'
+
+    try:
+        return get_client(api_key).get(url)
+    except requests.exceptions.RequestException as e:
+        print(f'Error fetching organizations: {e}')
+        return None
+
+# Function to fetch the networks within an organization
+def get_networks(api_key, org_id):
+    url = f'/organizations/{org_id}/networks'
+
+    try:
+        return get_client(api_key).get(url, org_id=org_id)
+    except requests.exceptions.RequestException as e:
+        print(f'Error fetching networks: {e}')
+        return None
+
+# Function to select organizations and then networks within each of them (all matching ones with
+# selectors, otherwise prompt; all networks when only organizations were given); returns a list of
+# (organization ID, network) pairs
+def select_networks(api_key, organizations, org_selectors=None, network_selectors=None):
+    selection = []
+    for organization in select(organizations, org_selectors, 'Organization'):
+        networks = get_networks(api_key, organization['id'])
+
+        if not networks:
+            print(f'No networks found in organization {organization["name"]}.')
+            continue
+
+        selection.extend((organization['id'], network) for network in select(networks, child_selectors(network_selectors, org_selectors), 'Network'))
+    return selection
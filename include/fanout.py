@@ -0,0 +1,53 @@
+# Desc: Multi-process fan-out of per-organization work for runs across many organizations
+# Author: Mohd NeoTech <mohdneotech@gmail.com>
+
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import include.config as config
+from include.api import get_client, reset_clients
+
+# Function to copy the settings of this run (including ones changed by command-line options)
+def _config_snapshot():
+    return {name: getattr(config, name) for name in dir(config) if name.isupper()}
+
+# Function to apply the parent's settings in a freshly started worker process
+def _init_worker(settings):
+    for name, value in settings.items():
+        setattr(config, name, value)
+    reset_clients()
+
+# Function to run the work of one organization and hand back its result, its error message
+# (exceptions may not survive pickling) and the API metrics it collected
+def _run_for_org(func, api_key, organization, args):
+    try:
+        result, error = func(api_key, organization, *args), None
+    except Exception as e:
+        result, error = None, f'{type(e).__name__}: {e}'
+    return result, error, get_client(api_key).metrics.take()
+
+# Function to call func(api_key, organization, *args) for every organization across `processes` worker
+# processes, yielding (organization, result, error) as each organization finishes. The Meraki rate limit
+# is per organization, so each worker's own clients, connection pools and rate limiters never compete.
+# func must be a module-level function and its result picklable; worker metrics are merged into the
+# parent's client so the end-of-run report covers every process. With one process it runs in this process.
+def iter_orgs_in_processes(func, api_key, organizations, args=(), processes=None):
+    organizations = list(organizations)
+    processes = min(processes or os.cpu_count() or 1, len(organizations) or 1)
+    metrics = get_client(api_key).metrics
+
+    if processes <= 1:
+        for organization in organizations:
+            try:
+                yield organization, func(api_key, organization, *args), None
+            except Exception as e:
+                yield organization, None, f'{type(e).__name__}: {e}'
+        return
+
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(_config_snapshot(),)) as executor:
+        futures = {executor.submit(_run_for_org, func, api_key, organization, args): organization
+                   for organization in organizations}
+        for future in as_completed(futures):
+            result, error, worker_metrics = future.result()
+            metrics.merge(*worker_metrics)
+            yield futures[future], result, error
@@ -0,0 +1,147 @@
+# Desc: Local append-only history of AP client counts in SQLite with 5-minute, hourly and daily rollups
+# Author: Mohd NeoTech <mohdneotech@gmail.com>
+
+import os
+import re
+import sqlite3
+import time
+
+import include.config as config
+
+# Columns of the peak report and of an AP's trend
+PEAK_COLUMNS = ['AP Name', 'Serial', 'Network', 'Peak Clients', 'Peak Time', 'Average Clients', 'Samples']
+TREND_COLUMNS = ['Time', 'Samples', 'Average Clients', 'Min Clients', 'Max Clients']
+
+_SPAN_RE = re.compile(r'^(\d+(?:\.\d+)?)\s*([smhdw]?)$', re.IGNORECASE)
+_SPAN_SECONDS = {'': 1, 's': 1, 'm': 60, 'h': 3600, 'd': 86400, 'w': 604800}
+
+# Resolution code of the raw samples in query results (rollups use their bucket size in seconds)
+RAW = 0
+
+# Function to parse a time span such as 90m, 24h, 7d or 2w (plain numbers are seconds) into seconds
+def parse_span(text):
+    match = _SPAN_RE.match(text.strip())
+    if not match:
+        raise ValueError(f'Invalid time span: {text} (use e.g. 90m, 24h, 7d or 2w)')
+    return int(float(match.group(1)) * _SPAN_SECONDS[match.group(2).lower()])
+
+# Class storing every polled client count of every AP, plus rollups of them per 5 minutes, hour and day
+# (sample count, total, minimum and maximum per bucket). Rollups are updated as samples are recorded,
+# and each level is kept for its own retention, so range queries over weeks or months read a few
+# hundred rows per AP instead of every sample.
+class ClientCountHistory:
+    def __init__(self, path=None):
+        self.path = path or config.HISTORY_PATH
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.db = sqlite3.connect(self.path, timeout=30)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('''CREATE TABLE IF NOT EXISTS samples (
+                               polled_at REAL NOT NULL,
+                               serial TEXT NOT NULL,
+                               clients INTEGER NOT NULL,
+                               PRIMARY KEY (polled_at, serial)) WITHOUT ROWID''')
+        self.db.execute('''CREATE TABLE IF NOT EXISTS rollups (
+                               resolution INTEGER NOT NULL,
+                               bucket INTEGER NOT NULL,
+                               serial TEXT NOT NULL,
+                               samples INTEGER NOT NULL,
+                               total INTEGER NOT NULL,
+                               min INTEGER NOT NULL,
+                               max INTEGER NOT NULL,
+                               PRIMARY KEY (resolution, serial, bucket)) WITHOUT ROWID''')
+        self.db.execute('CREATE INDEX IF NOT EXISTS rollups_bucket ON rollups (resolution, bucket)')
+        self.db.execute('''CREATE TABLE IF NOT EXISTS aps (
+                               serial TEXT PRIMARY KEY,
+                               name TEXT,
+                               network_id TEXT,
+                               network_name TEXT,
+                               organization_id TEXT)''')
+        self.db.commit()
+
+    # Function to record one poll: counts are (serial, clients) pairs and aps optional (serial, name,
+    # network ID, network name, organization ID) rows naming them. Old samples and rollups past their
+    # retention are dropped in the same transaction.
+    def record(self, counts, polled_at=None, aps=()):
+        polled_at = polled_at if polled_at is not None else time.time()
+        counts = [(serial, int(clients)) for serial, clients in counts]
+        with self.db:
+            self.db.executemany('INSERT OR IGNORE INTO aps (serial) VALUES (?)', [(serial,) for serial, _ in counts])
+            self.db.executemany('INSERT OR REPLACE INTO aps (serial, name, network_id, network_name, organization_id) '
+                                'VALUES (?, ?, ?, ?, ?)', aps)
+            self.db.executemany('INSERT OR REPLACE INTO samples (polled_at, serial, clients) VALUES (?, ?, ?)',
+                                [(polled_at, serial, clients) for serial, clients in counts])
+            for resolution, _ in config.HISTORY_ROLLUPS:
+                bucket = int(polled_at - polled_at % resolution)
+                self.db.executemany('''INSERT INTO rollups (resolution, bucket, serial, samples, total, min, max)
+                                       VALUES (?, ?, ?, 1, ?, ?, ?)
+                                       ON CONFLICT (resolution, bucket, serial) DO UPDATE SET
+                                           samples = samples + 1, total = total + excluded.total,
+                                           min = MIN(min, excluded.min), max = MAX(max, excluded.max)''',
+                                    [(resolution, bucket, serial, clients, clients, clients) for serial, clients in counts])
+            self._prune(polled_at)
+
+    # Function to drop raw samples and rollups older than their retention
+    def _prune(self, now):
+        self.db.execute('DELETE FROM samples WHERE polled_at < ?', (now - config.HISTORY_RAW_RETENTION,))
+        for resolution, retention in config.HISTORY_ROLLUPS:
+            self.db.execute('DELETE FROM rollups WHERE resolution = ? AND bucket < ?', (resolution, now - retention))
+
+    # Function to pick the data a range is read from: raw samples for up to an hour, otherwise the finest
+    # rollup that still reaches back to the start and splits the range into at most
+    # config.HISTORY_QUERY_BUCKETS buckets (the coarsest one when none does). Ranges are widened to
+    # whole buckets, so a peak may come from the bucket holding the start of the range.
+    def resolution_for(self, start, end, now=None):
+        now = now if now is not None else time.time()
+        if end - start <= 3600 and start >= now - config.HISTORY_RAW_RETENTION:
+            return RAW
+        for resolution, retention in config.HISTORY_ROLLUPS:
+            if start >= now - retention and (end - start) / resolution <= config.HISTORY_QUERY_BUCKETS:
+                return resolution
+        return config.HISTORY_ROLLUPS[-1][0]
+
+    # Function to get the peak, when it happened and the average client count of every AP over a range
+    # (seconds since the epoch), busiest first; optionally only some serials. Each AP is one index range
+    # of at most a few hundred rollup rows.
+    def peaks(self, start, end, serials=None):
+        resolution = self.resolution_for(start, end)
+        names = self.ap_names()
+        if resolution == RAW:
+            query = ('SELECT serial, MAX(clients), polled_at, SUM(clients), COUNT(*) FROM samples '
+                     'WHERE polled_at >= ? AND polled_at < ? GROUP BY serial')
+            rows = [row for row in self.db.execute(query, (start, end)) if not serials or row[0] in serials]
+        else:
+            query = ('SELECT serial, MAX(max), bucket, SUM(total), SUM(samples) FROM rollups '
+                     'WHERE resolution = ? AND serial = ? AND bucket >= ? AND bucket < ?')
+            start -= start % resolution
+            rows = [self.db.execute(query, (resolution, serial, start, end)).fetchone() for serial in serials or names]
+            rows = [row for row in rows if row[4]]
+
+        results = []
+        for serial, peak, peak_at, total, samples in rows:
+            name, network = names.get(serial, (None, None))
+            results.append([name or serial, serial, network, peak, peak_at, round(total / samples, 1), samples])
+        return sorted(results, key=lambda row: (-row[3], row[0]))
+
+    # Function to get the client counts of one AP over a range, one row per bucket (or per sample for
+    # short ranges): (time, samples, average, minimum, maximum)
+    def series(self, serial, start, end):
+        resolution = self.resolution_for(start, end)
+        if resolution == RAW:
+            rows = self.db.execute('SELECT polled_at, 1, clients, clients, clients FROM samples '
+                                   'WHERE polled_at >= ? AND polled_at < ? AND serial = ? ORDER BY polled_at',
+                                   (start, end, serial))
+        else:
+            rows = self.db.execute('SELECT bucket, samples, total * 1.0 / samples, min, max FROM rollups '
+                                   'WHERE resolution = ? AND bucket >= ? AND bucket < ? AND serial = ? ORDER BY bucket',
+                                   (resolution, start - start % resolution, end, serial))
+        return [(at, samples, round(average, 1), low, high) for at, samples, average, low, high in rows]
+
+    # Function to get the name and network name of every recorded AP, keyed by serial
+    def ap_names(self):
+        return {serial: (name, network) for serial, name, network in
+                self.db.execute('SELECT serial, name, network_name FROM aps')}
+
+    def close(self):
+        self.db.close()
@@ -0,0 +1,54 @@
+# Desc: Append-only on-disk journal so interrupted bulk operations can be resumed
+# Author: Mohd NeoTech <mohdneotech@gmail.com>
+
+import json
+import os
+import threading
+import time
+
+# Class recording the outcome of each operation as one JSON line; a rerun reads it
+# back to skip operations that already succeeded
+class Journal:
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    # Function to read the latest recorded status of every key
+    def statuses(self):
+        statuses = {}
+        if not os.path.exists(self.path):
+            return statuses
+        with open(self.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # a line cut short by an interrupted run
+                statuses[entry['key']] = entry['status']
+        return statuses
+
+    # Function to get the keys whose latest status is 'ok'
+    def completed(self):
+        return {key for key, status in self.statuses().items() if status == 'ok'}
+
+    # Function to append the outcome of one operation and flush it to disk right away
+    def record(self, key, status, detail=None):
+        entry = {'key': key, 'status': status, 'time': time.time()}
+        if detail:
+            entry['detail'] = detail
+        with self.lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+
+    # Function to forget the recorded success of some keys so they run again (keys not recorded
+    # as done are left alone, so repeated resets do not grow the journal)
+    def reset(self, keys):
+        done = self.completed()
+        for key in keys:
+            if key in done:
+                self.record(key, 'reset')
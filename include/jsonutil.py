@@ -0,0 +1,84 @@
+# Desc: Fast and incremental JSON decoding of Meraki API responses
+# Author: Mohd NeoTech <mohdneotech@gmail.com>
+
+import codecs
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Whitespace allowed between JSON tokens
+_WHITESPACE = ' \t\n\r'
+
+_decoder = json.JSONDecoder()
+
+# Function to decode a JSON document (bytes or text), with orjson when it is installed
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+# Function to decode the JSON body of a requests response. Bodies the fast path cannot read (an unusual
+# encoding, invalid JSON) go through requests itself, so errors stay requests.exceptions.JSONDecodeError.
+def response_json(response):
+    try:
+        return loads(response.content)
+    except ValueError:
+        return response.json()
+
+# Function to skip whitespace in a buffer from a position
+def _skip_whitespace(buffer, pos):
+    while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+        pos += 1
+    return pos
+
+# Function to decode a top-level JSON array from an iterable of byte chunks, yielding each element as
+# soon as it is complete. Only the current element is held in memory, not the whole body.
+def iter_array(chunks):
+    text = codecs.getincrementaldecoder('utf-8')()
+    chunks = iter(chunks)
+    buffer = ''
+    pos = 0
+    started = False
+    finished = False
+
+    while True:
+        pos = _skip_whitespace(buffer, pos)
+        if pos < len(buffer):
+            if not started:
+                if buffer[pos] != '[':
+                    raise ValueError('Expected a JSON array')
+                started = True
+                pos += 1
+                continue
+            if buffer[pos] == ']':
+                return
+            if buffer[pos] == ',':
+                pos += 1
+                continue
+            try:
+                item, end = _decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if finished:
+                    raise
+            else:
+                # A number cut off by the end of a chunk (such as 12 of 12.5) decodes too early,
+                # so an element only counts once the character after it has arrived
+                if finished or (end < len(buffer) and buffer[end] in ',]' + _WHITESPACE):
+                    yield item
+                    pos = end
+                    continue
+        elif finished:
+            raise ValueError('Unexpected end of JSON array')
+
+        # Need more data: drop what has been consumed and read the next chunk
+        buffer = buffer[pos:]
+        pos = 0
+        chunk = next(chunks, None)
+        if chunk is None:
+            buffer += text.decode(b'', final=True)
+            finished = True
+        else:
+            buffer += text.decode(chunk)
@@ -0,0 +1,198 @@
+# Desc: Request instrumentation for Meraki API scripts (summary, JSON and Prometheus output)
+# Author: Mohd NeoTech <mohdneotech@gmail.com>
+
+import json
+import sys
+import threading
+from bisect import bisect_left
+from urllib.parse import urlparse
+
+import include.config as config
+
+# Path segments followed by an identifier, which is replaced by a placeholder in endpoint names
+_ID_SEGMENTS = {'organizations': '{organizationId}', 'networks': '{networkId}', 'devices': '{serial}',
+                'actionBatches': '{actionBatchId}', 'ports': '{portId}'}
+
+# Function to turn a request URL into an endpoint name such as GET /devices/{serial}/switch/ports
+def endpoint_name(method, url):
+    path = urlparse(url).path
+    if '/api/v1' in path:
+        path = path.split('/api/v1', 1)[1]
+    parts = path.strip('/').split('/')
+    for i in range(1, len(parts)):
+        placeholder = _ID_SEGMENTS.get(parts[i - 1])
+        if placeholder and parts[i] not in _ID_SEGMENTS and parts[i] != 'statuses':
+            parts[i] = placeholder
+    return f'{method} /{"/".join(parts)}'
+
+# Counters of an endpoint that add up across endpoints and processes
+_COUNTERS = ('calls', 'errors', 'retries', 'throttled', 'cache_hits', 'bytes_received', 'bytes_sent', 'seconds')
+
+# Class holding the counters of one endpoint
+class EndpointStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.throttled = 0
+        self.cache_hits = 0
+        self.bytes_received = 0
+        self.bytes_sent = 0
+        self.seconds = 0.0
+        self.buckets = [0] * (len(config.METRICS_LATENCY_BUCKETS) + 1)
+
+    def as_dict(self):
+        return {
+            'calls': self.calls, 'errors': self.errors, 'retries': self.retries, 'throttled': self.throttled,
+            'cache_hits': self.cache_hits, 'bytes_received': self.bytes_received, 'bytes_sent': self.bytes_sent,
+            'seconds': round(self.seconds, 6),
+            'latency_buckets': dict(zip([str(bound) for bound in config.METRICS_LATENCY_BUCKETS] + ['+Inf'], self.buckets)),
+        }
+
+# Class collecting per-endpoint call counts, latency histograms, bytes, retries, 429s and limiter waits
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.endpoints = {}
+        self.wait_seconds = 0.0
+
+    def _stats(self, endpoint):
+        stats = self.endpoints.get(endpoint)
+        if stats is None:
+            stats = self.endpoints[endpoint] = EndpointStats()
+        return stats
+
+    # Function to record one HTTP exchange (every attempt, including the ones that get retried)
+    def record_request(self, endpoint, status, seconds, bytes_received=0, bytes_sent=0):
+        with self.lock:
+            stats = self._stats(endpoint)
+            stats.calls += 1
+            stats.seconds += seconds
+            stats.bytes_received += bytes_received
+            stats.bytes_sent += bytes_sent
+            stats.buckets[bisect_left(config.METRICS_LATENCY_BUCKETS, seconds)] += 1
+            if status == 429:
+                stats.throttled += 1
+            elif status is None or status >= 400:
+                stats.errors += 1
+
+    # Function to add the bytes of a streamed response body, which are only known once it has been read
+    def record_bytes(self, endpoint, bytes_received):
+        with self.lock:
+            self._stats(endpoint).bytes_received += bytes_received
+
+    # Function to record that a request is being retried
+    def record_retry(self, endpoint):
+        with self.lock:
+            self._stats(endpoint).retries += 1
+
+    # Function to record a request answered from the response cache
+    def record_cache_hit(self, endpoint):
+        with self.lock:
+            self._stats(endpoint).cache_hits += 1
+
+    # Function to record time spent waiting on the rate limiter
+    def record_wait(self, seconds):
+        if seconds:
+            with self.lock:
+                self.wait_seconds += seconds
+
+    # Function to hand over the counters collected so far and start again from zero
+    # (used by worker processes to report to their parent)
+    def take(self):
+        with self.lock:
+            endpoints, wait_seconds = self.endpoints, self.wait_seconds
+            self.endpoints, self.wait_seconds = {}, 0.0
+        return endpoints, wait_seconds
+
+    # Function to add counters handed over by take() in another process
+    def merge(self, endpoints, wait_seconds=0.0):
+        with self.lock:
+            self.wait_seconds += wait_seconds
+            for endpoint, other in endpoints.items():
+                stats = self._stats(endpoint)
+                for name in _COUNTERS:
+                    setattr(stats, name, getattr(stats, name) + getattr(other, name))
+                stats.buckets = [a + b for a, b in zip(stats.buckets, other.buckets)]
+
+    # Function to add up the counters of every endpoint
+    def totals(self):
+        total = EndpointStats()
+        with self.lock:
+            for stats in self.endpoints.values():
+                for name in _COUNTERS:
+                    setattr(total, name, getattr(total, name) + getattr(stats, name))
+                total.buckets = [a + b for a, b in zip(total.buckets, stats.buckets)]
+        return total
+
+    # Function to export everything as a JSON-serializable dictionary
+    def as_dict(self):
+        with self.lock:
+            endpoints = {endpoint: stats.as_dict() for endpoint, stats in sorted(self.endpoints.items())}
+            wait_seconds = round(self.wait_seconds, 6)
+        return {'endpoints': endpoints, 'totals': self.totals().as_dict(), 'rate_limit_wait_seconds': wait_seconds}
+
+    # Function to render an end-of-run summary
+    def summary(self):
+        total = self.totals()
+        lines = [f'{"Endpoint":<58} {"Calls":>6} {"Avg ms":>8} {"Retries":>7} {"429s":>5} {"Cached":>6} {"KB in":>9}']
+        with self.lock:
+            for endpoint, stats in sorted(self.endpoints.items()):
+                average = stats.seconds / stats.calls * 1000 if stats.calls else 0
+                lines.append(f'{endpoint:<58} {stats.calls:>6} {average:>8.1f} {stats.retries:>7} '
+                             f'{stats.throttled:>5} {stats.cache_hits:>6} {stats.bytes_received / 1024:>9.1f}')
+            wait_seconds = self.wait_seconds
+        lines.append(f'Total: {total.calls} call(s) in {total.seconds:.2f}s of API time, {total.retries} retries, '
+                     f'{total.throttled} throttled, {total.cache_hits} cache hit(s), '
+                     f'{total.bytes_received / 1024:.1f} KB received, {wait_seconds:.2f}s waiting on the rate limiter')
+        return '\n'.join(lines)
+
+    # Function to render the metrics in the Prometheus text exposition format
+    def prometheus(self):
+        lines = []
+        counters = [('calls', 'meraki_api_requests_total', 'HTTP requests sent, including retried attempts'),
+                    ('errors', 'meraki_api_errors_total', 'Requests that failed (excluding 429)'),
+                    ('retries', 'meraki_api_retries_total', 'Requests retried after 429, 5xx or a connection error'),
+                    ('throttled', 'meraki_api_throttled_total', 'Responses with status 429'),
+                    ('cache_hits', 'meraki_api_cache_hits_total', 'Requests answered from the response cache'),
+                    ('bytes_received', 'meraki_api_received_bytes_total', 'Response bytes received'),
+                    ('bytes_sent', 'meraki_api_sent_bytes_total', 'Request body bytes sent')]
+        with self.lock:
+            endpoints = sorted(self.endpoints.items())
+            wait_seconds = self.wait_seconds
+
+        for attribute, name, help_text in counters:
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+            lines += [f'{name}{{endpoint="{endpoint}"}} {getattr(stats, attribute)}' for endpoint, stats in endpoints]
+
+        name = 'meraki_api_request_duration_seconds'
+        lines += [f'# HELP {name} Request latency', f'# TYPE {name} histogram']
+        for endpoint, stats in endpoints:
+            cumulative = 0
+            for bound, count in zip(list(config.METRICS_LATENCY_BUCKETS) + ['+Inf'], stats.buckets):
+                cumulative += count
+                lines.append(f'{name}_bucket{{endpoint="{endpoint}",le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_sum{{endpoint="{endpoint}"}} {stats.seconds:.6f}')
+            lines.append(f'{name}_count{{endpoint="{endpoint}"}} {stats.calls}')
+
+        name = 'meraki_api_rate_limit_wait_seconds_total'
+        lines += [f'# HELP {name} Time spent waiting on the client-side rate limiter', f'# TYPE {name} counter',
+                  f'{name} {wait_seconds:.6f}']
+        return '\n'.join(lines) + '\n'
+
+# Function to print or save a client's metrics in the requested format ('summary', 'json', 'prometheus' or 'none')
+def report_metrics(client, output_format='summary', path=None):
+    if output_format == 'none':
+        return
+    if output_format == 'json':
+        text = json.dumps(client.metrics.as_dict(), indent=2) + '\n'
+    elif output_format == 'prometheus':
+        text = client.metrics.prometheus()
+    else:
+        text = client.metrics.summary() + '\n'
+
+    if path:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        sys.stdout.write(text)
@@ -0,0 +1,120 @@
+# Desc: Streaming row writers (CSV, NDJSON, Parquet) for Meraki API scripts
+# Author: Mohd NeoTech <mohdneotech@gmail.com>
+
+import csv
+import importlib.util
+import json
+import sys
+
+# Output formats that write rows as they arrive instead of building a table in memory
+STREAMING_FORMATS = ('csv', 'ndjson', 'parquet')
+
+# Base class for row writers; rows are written to a file path or to a stream (stdout by default)
+class RowWriter:
+    def __init__(self, headers, path=None, stream=None):
+        self.headers = list(headers)
+        self.path = path
+        self.rows_written = 0
+        if path:
+            self.stream = open(path, 'w', newline='', encoding='utf-8')
+        else:
+            self.stream = stream or sys.stdout
+
+    def write_row(self, row):
+        raise NotImplementedError
+
+    def write_rows(self, rows):
+        for row in rows:
+            self.write_row(row)
+
+    # Function to push written rows out to the file or stream right away
+    def flush(self):
+        self.stream.flush()
+
+    def close(self):
+        self.stream.flush()
+        if self.path:
+            self.stream.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+# Class writing rows as CSV with a header line
+class CsvWriter(RowWriter):
+    def __init__(self, headers, path=None, stream=None):
+        super().__init__(headers, path, stream)
+        self.writer = csv.writer(self.stream)
+        self.writer.writerow(self.headers)
+
+    def write_row(self, row):
+        self.writer.writerow(row)
+        self.rows_written += 1
+
+# Class writing rows as newline-delimited JSON objects keyed by header
+class NdjsonWriter(RowWriter):
+    def write_row(self, row):
+        self.stream.write(json.dumps(dict(zip(self.headers, row)), default=str))
+        self.stream.write('\n')
+        self.rows_written += 1
+
+# Class writing rows to a Parquet file in row groups (requires pyarrow)
+class ParquetWriter(RowWriter):
+    def __init__(self, headers, path=None, stream=None, row_group_size=50000):
+        if not path:
+            raise ValueError('Parquet output needs a file path.')
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError('Parquet output requires pyarrow (pip install pyarrow).')
+
+        self.headers = list(headers)
+        self.path = path
+        self.rows_written = 0
+        self.row_group_size = row_group_size
+        self.pyarrow = pyarrow
+        self.schema = pyarrow.schema([(header, pyarrow.string()) for header in self.headers])
+        self.writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+        self.buffer = []
+
+    def write_row(self, row):
+        self.buffer.append(row)
+        self.rows_written += 1
+        if len(self.buffer) >= self.row_group_size:
+            self.flush()
+
+    # Function to write the buffered rows as one row group
+    def flush(self):
+        if not self.buffer:
+            return
+        columns = [[None if value is None else str(value) for value in column] for column in zip(*self.buffer)]
+        self.writer.write_table(self.pyarrow.Table.from_arrays(columns, schema=self.schema))
+        self.buffer = []
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+WRITERS = {
+    'csv': CsvWriter,
+    'ndjson': NdjsonWriter,
+    'parquet': ParquetWriter,
+}
+
+# Function to check, without importing it, that the package an output format needs is installed;
+# returns an error message for the command line, or None when the format can be used
+def missing_dependency(output_format):
+    if output_format == 'parquet' and importlib.util.find_spec('pyarrow') is None:
+        return 'Parquet output requires pyarrow (pip install pyarrow).'
+    return None
+
+# Function to open a streaming row writer for an output format
+def open_writer(output_format, headers, path=None, stream=None):
+    try:
+        writer_class = WRITERS[output_format]
+    except KeyError:
+        raise ValueError(f'Unknown output format: {output_format}')
+    return writer_class(headers, path, stream)
@@ -0,0 +1,101 @@
+# Desc: Streaming paginator for Meraki list endpoints
+# Author: Mohd NeoTech <mohdneotech@gmail.com>
+
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+import include.config as config
+from include.jsonutil import response_json
+
+# One link-value of an RFC 5988 Link header: <uri> followed by ;-separated parameters
+_LINK_RE = re.compile(r'<([^>]*)>((?:\s*;\s*[^;,=]+(?:=\s*(?:"[^"]*"|[^;,]*))?)*)')
+_PARAM_RE = re.compile(r';\s*([^;=\s]+)\s*=\s*(?:"([^"]*)"|([^;,\s]*))')
+
+# Function to parse an RFC 5988 Link header into a {rel: url} dictionary
+def parse_link_header(value):
+    links = {}
+    if not value:
+        return links
+
+    for match in _LINK_RE.finditer(value):
+        url, params = match.group(1).strip(), match.group(2)
+        for name, quoted, bare in _PARAM_RE.findall(params):
+            if name.lower() == 'rel':
+                # A rel parameter may hold several space-separated relation types
+                for rel in (quoted or bare).split():
+                    links.setdefault(rel.lower(), url)
+    return links
+
+# Function to fetch one page and return its decoded items and the URL of the next page
+def _fetch_page(client, path, params, org_id):
+    response = client.request('GET', path, params=params, org_id=org_id)
+    return response_json(response), parse_link_header(response.headers.get('Link')).get('next')
+
+# Function to send the request for one page without reading its body; the Link header
+# (and so the next page's URL) arrives before the body
+def _open_page(client, path, params, org_id):
+    response = client.request('GET', path, params=params, org_id=org_id, stream=True)
+    return response, parse_link_header(response.headers.get('Link')).get('next')
+
+# Function to close the streamed response of a prefetched page that will not be read
+def _close_page(future):
+    if future.exception() is None:
+        future.result()[0].close()
+
+# Function to yield the items of a paginated endpoint while each page's body streams in. With
+# prefetch on, the next page is requested as soon as the current page's headers arrive.
+def _iter_streamed_items(client, path, params, org_id, prefetch):
+    if not prefetch:
+        while path:
+            response, path = _open_page(client, path, params, org_id)
+            params = None
+            yield from client.iter_response_items(response)
+        return
+
+    executor = ThreadPoolExecutor(max_workers=1)
+    future = executor.submit(_open_page, client, path, params, org_id)
+    try:
+        while future is not None:
+            response, next_url = future.result()
+            future = executor.submit(_open_page, client, next_url, None, org_id) if next_url else None
+            yield from client.iter_response_items(response)
+    finally:
+        # A prefetch still in flight when the caller stops is closed as soon as its response arrives
+        if future is not None and not future.cancel():
+            future.add_done_callback(_close_page)
+        executor.shutdown(wait=False, cancel_futures=True)
+
+# Function to yield each page of a paginated endpoint. The largest page size is requested
+# and, with prefetch on, page N+1 is downloaded while the caller is still processing page N.
+def iter_pages(client, path, params=None, org_id=None, per_page=None, prefetch=True):
+    params = dict(params or {})
+    params.setdefault('perPage', per_page or config.PER_PAGE_MAX)
+
+    if not prefetch:
+        while path:
+            page, path = _fetch_page(client, path, params, org_id)
+            params = None
+            yield page
+        return
+
+    executor = ThreadPoolExecutor(max_workers=1)
+    try:
+        future = executor.submit(_fetch_page, client, path, params, org_id)
+        while future is not None:
+            page, next_url = future.result()
+            future = executor.submit(_fetch_page, client, next_url, None, org_id) if next_url else None
+            yield page
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+# Function to yield the items of a paginated endpoint one by one with constant memory. With stream on,
+# items are decoded as each page's body arrives, so not even a whole page is held in memory.
+def paginate(client, path, params=None, org_id=None, per_page=None, prefetch=True, stream=False):
+    if stream:
+        params = dict(params or {})
+        params.setdefault('perPage', per_page or config.PER_PAGE_MAX)
+        yield from _iter_streamed_items(client, path, params, org_id, prefetch)
+        return
+
+    for page in iter_pages(client, path, params, org_id, per_page, prefetch):
+        yield from page
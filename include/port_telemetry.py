@@ -0,0 +1,200 @@
+# Desc: Live switch port statuses in columnar arrays with fleet-wide traffic, PoE and error statistics
+# Author: Mohd NeoTech <mohdneotech@gmail.com>
+
+import heapq
+import math
+import re
+from array import array
+
+import requests
+
+import include.config as config
+from include.api import get_client
+from include.concurrency import iter_concurrently
+from include.timeutil import load_numpy
+
+# Columns of the busiest ports, PoE headroom and error outlier tables
+TOP_PORT_COLUMNS = ['Switch', 'Serial', 'Port', 'Speed (Mbps)', 'Traffic (Kbps)', 'Utilization %']
+POE_COLUMNS = ['Switch', 'Serial', 'Model', 'Powered ports', 'Average draw (W)', 'Budget (W)', 'Headroom (W)', 'Used %']
+ERROR_COLUMNS = ['Switch', 'Serial', 'Connected ports', 'Ports with errors', 'Error rate %', 'Ports affected']
+
+_SPEED_RE = re.compile(r'([\d.]+)\s*([GMK])', re.IGNORECASE)
+_SPEED_KBPS = {'G': 1000000, 'M': 1000, 'K': 1}
+
+# Function to turn a link speed such as '1 Gbps' or '100 Mbps' into Kbps (0 when there is no link)
+def speed_kbps(speed):
+    match = _SPEED_RE.search(speed or '')
+    return float(match.group(1)) * _SPEED_KBPS[match.group(2).upper()] if match else 0.0
+
+# Function to get the total PoE budget of a switch model in watts (None when it is not known)
+def poe_budget(model):
+    return config.POE_BUDGETS.get(model)
+
+# Class storing the port statuses of many switches column by column: one entry per port in typed
+# arrays (switch index, link speed, traffic, PoE energy, error and warning counts), with the
+# switches kept once. Statistics are computed over whole columns with NumPy when it is installed,
+# so tens of thousands of ports need no per-port Python loop.
+class PortTelemetry:
+    def __init__(self, timespan=None):
+        self.timespan = timespan or config.PORT_STATUS_TIMESPAN
+        self.switches = []
+        self.port_ids = []
+        self.switch_rows = array('I')
+        self.connected = array('B')
+        self.speed = array('d')
+        self.traffic = array('d')
+        self.sent = array('d')
+        self.received = array('d')
+        self.power = array('d')
+        self.errors = array('I')
+        self.warnings = array('I')
+
+    def __len__(self):
+        return len(self.port_ids)
+
+    # Function to add the statuses of one switch's ports
+    def add_switch(self, device, statuses):
+        index = len(self.switches)
+        self.switches.append({'serial': device['serial'], 'name': device.get('name') or device['serial'],
+                              'model': device.get('model'), 'networkId': device.get('networkId')})
+        for status in statuses:
+            traffic = status.get('trafficInKbps') or {}
+            self.port_ids.append(str(status.get('portId')))
+            self.switch_rows.append(index)
+            self.connected.append(status.get('status') == 'Connected')
+            self.speed.append(speed_kbps(status.get('speed')))
+            self.traffic.append(traffic.get('total') or 0)
+            self.sent.append(traffic.get('sent') or 0)
+            self.received.append(traffic.get('recv') or 0)
+            self.power.append(status.get('powerUsageInWh') or 0)
+            self.errors.append(sum(error not in config.PORT_IGNORED_ERRORS for error in status.get('errors') or []))
+            self.warnings.append(len(status.get('warnings') or []))
+
+    # Function to get the share of each port's link speed its traffic used (0 for ports without a link)
+    def utilization(self):
+        numpy = load_numpy()
+        if numpy is not None:
+            speed = numpy.frombuffer(self.speed, dtype=numpy.float64)
+            traffic = numpy.frombuffer(self.traffic, dtype=numpy.float64)
+            return numpy.divide(traffic, speed, out=numpy.zeros(len(self)), where=speed > 0)
+        return [traffic / speed if speed else 0.0 for traffic, speed in zip(self.traffic, self.speed)]
+
+    # Function to list the n busiest ports, by average traffic or by utilization of the link speed
+    def top_ports(self, n=None, by='traffic'):
+        n = min(n or config.PORT_TOP_N, len(self))
+        if not n:
+            return []
+        utilization = self.utilization()
+
+        numpy = load_numpy()
+        if numpy is not None:
+            values = utilization if by == 'utilization' else numpy.frombuffer(self.traffic, dtype=numpy.float64)
+            rows = numpy.argpartition(-values, n - 1)[:n]
+            rows = rows[numpy.argsort(-values[rows], kind='stable')].tolist()
+        else:
+            values = utilization if by == 'utilization' else self.traffic
+            rows = heapq.nlargest(n, range(len(self)), key=values.__getitem__)
+
+        results = []
+        for row in rows:
+            switch = self.switches[self.switch_rows[row]]
+            results.append([switch['name'], switch['serial'], self.port_ids[row], round(self.speed[row] / 1000),
+                            round(self.traffic[row], 1), round(float(utilization[row]) * 100, 2)])
+        return results
+
+    # Function to sum a per-port column per switch and count the ports per switch
+    def _per_switch(self, values):
+        numpy = load_numpy()
+        if numpy is not None:
+            switch_rows = numpy.frombuffer(self.switch_rows, dtype=numpy.uint32)
+            totals = numpy.bincount(switch_rows, weights=values, minlength=len(self.switches))
+            ports = numpy.bincount(switch_rows, minlength=len(self.switches))
+            return totals.tolist(), ports.tolist()
+
+        totals, ports = [0.0] * len(self.switches), [0] * len(self.switches)
+        for switch, value in zip(self.switch_rows, values):
+            totals[switch] += value
+            ports[switch] += 1
+        return totals, ports
+
+    # Function to compare each switch's average PoE draw over the timespan with the budget of its model;
+    # switches with the least headroom come first and switches of unknown models last
+    def poe_headroom(self):
+        numpy = load_numpy()
+        if numpy is not None:
+            power = numpy.frombuffer(self.power, dtype=numpy.float64)
+            energy, _ = self._per_switch(power)
+            powered, _ = self._per_switch((power > 0).astype(numpy.float64))
+        else:
+            energy, _ = self._per_switch(self.power)
+            powered, _ = self._per_switch([float(value > 0) for value in self.power])
+
+        hours = self.timespan / 3600
+        results = []
+        for switch, used, ports in zip(self.switches, energy, powered):
+            draw = used / hours
+            budget = poe_budget(switch['model'])
+            headroom = None if budget is None else round(budget - draw, 1)
+            share = None if budget is None else round(draw / budget * 100, 1)
+            results.append([switch['name'], switch['serial'], switch['model'], int(ports), round(draw, 1), budget, headroom, share])
+        return sorted(results, key=lambda row: (row[6] is None, row[6] if row[6] is not None else 0))
+
+    # Function to find the switches whose share of connected ports reporting errors stands out from the
+    # fleet: more than `sigma` standard deviations above the mean rate of all switches. Unused ports
+    # (and errors such as 'Port disconnected' that only say so) do not count.
+    def error_outliers(self, sigma=None):
+        sigma = config.PORT_ERROR_OUTLIER_SIGMA if sigma is None else sigma
+        numpy = load_numpy()
+        if numpy is not None:
+            connected = numpy.frombuffer(self.connected, dtype=numpy.uint8) > 0
+            errors = numpy.frombuffer(self.errors, dtype=numpy.uint32) > 0
+            failing, _ = self._per_switch((errors & connected).astype(numpy.float64))
+            ports, _ = self._per_switch(connected.astype(numpy.float64))
+        else:
+            failing, _ = self._per_switch([float(count > 0 and up) for count, up in zip(self.errors, self.connected)])
+            ports, _ = self._per_switch([float(up) for up in self.connected])
+        if not ports:
+            return []
+
+        rates = [errors / count if count else 0.0 for errors, count in zip(failing, ports)]
+        mean = sum(rates) / len(rates)
+        deviation = math.sqrt(sum((rate - mean) ** 2 for rate in rates) / len(rates))
+        threshold = mean + sigma * deviation
+
+        outliers = [index for index, rate in enumerate(rates) if rate > 0 and rate > threshold]
+        affected = {index: [] for index in outliers}
+        if affected and numpy is not None:
+            switch_rows = numpy.frombuffer(self.switch_rows, dtype=numpy.uint32)
+            mask = numpy.isin(switch_rows, outliers) & errors & connected
+            for row in numpy.flatnonzero(mask).tolist():
+                affected[self.switch_rows[row]].append(self.port_ids[row])
+        elif affected:
+            for row, (switch, count, up) in enumerate(zip(self.switch_rows, self.errors, self.connected)):
+                if count and up and switch in affected:
+                    affected[switch].append(self.port_ids[row])
+
+        results = []
+        for index in sorted(outliers, key=lambda index: -rates[index]):
+            switch = self.switches[index]
+            results.append([switch['name'], switch['serial'], int(ports[index]), int(failing[index]),
+                            round(rates[index] * 100, 1), ','.join(affected[index])])
+        return results
+
+# Function to fetch the live port statuses of many switches concurrently (within the rate limit) into
+# a PortTelemetry; switches that fail are reported and skipped
+def fetch_port_telemetry(api_key, organization_id, switches, timespan=None, concurrency=None, telemetry=None):
+    telemetry = telemetry if telemetry is not None else PortTelemetry(timespan)
+    client = get_client(api_key)
+    params = {'timespan': telemetry.timespan}
+
+    def fetch_statuses(device):
+        return client.get(f'/devices/{device["serial"]}/switch/ports/statuses', params=params, org_id=organization_id)
+
+    for device, statuses, error in iter_concurrently(fetch_statuses, switches, concurrency):
+        if error is None:
+            telemetry.add_switch(device, statuses or [])
+        elif isinstance(error, requests.exceptions.RequestException):
+            print(f'Error fetching port statuses for {device.get("name")} ({device["serial"]}): {error}')
+        else:
+            raise error
+    return telemetry
@@ -0,0 +1,85 @@
+# Desc: Per-organization rate limiting for Meraki API scripts
+# Author: Mohd NeoTech <mohdneotech@gmail.com>
+
+import random
+import threading
+import time
+
+import include.config as config
+
+# Class implementing a thread-safe token bucket
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    # Function to take one token, sleeping until one is available; returns the seconds spent waiting
+    def acquire(self):
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if now < self.blocked_until:
+                    delay = self.blocked_until - now
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                else:
+                    delay = (1 - self.tokens) / self.rate
+
+            time.sleep(delay)
+            waited += delay
+
+    # Function to stop handing out tokens for a while (used when the API answers 429)
+    def block(self, seconds):
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+            self.tokens = 0.0
+
+# Class that keeps one token bucket per organization (waits are reported through the request metrics)
+class RateLimiter:
+    def __init__(self, rate=None, burst=None):
+        self.rate = rate or config.RATE_LIMIT_PER_SECOND
+        self.burst = burst or config.RATE_LIMIT_BURST
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    # Function to get the bucket for an organization, creating it on first use
+    def bucket(self, key):
+        key = key or 'default'
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = TokenBucket(self.rate, self.burst)
+                self.buckets[key] = bucket
+            return bucket
+
+    # Function to wait for a request slot in an organization's bucket; returns the seconds spent waiting
+    def acquire(self, key=None):
+        return self.bucket(key).acquire()
+
+    # Function to pause an organization's bucket after the API answered 429
+    def throttle(self, key, seconds):
+        self.bucket(key).block(seconds)
+
+# Function to compute a jittered exponential backoff delay for a retry attempt
+def backoff_delay(attempt):
+    delay = min(config.RETRY_BACKOFF_MAX, config.RETRY_BACKOFF_BASE * (2 ** attempt))
+    return random.uniform(delay / 2, delay)
+
+# Function to read the Retry-After header of a response in seconds, if present
+def retry_after(response):
+    value = response.headers.get('Retry-After')
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
@@ -0,0 +1,116 @@
+# Desc: Shared command-line selection of API key, organizations, networks and devices
+# Author: Mohd NeoTech <mohdneotech@gmail.com>
+
+import fnmatch
+import os
+import sys
+
+import include.config as config
+
+# API key shipped in include/config.py, which only marks where a real key goes
+PLACEHOLDER_API_KEY = 'STORE-DEFAULT-API-KEY-HERE'
+
+# Function to add the options shared by every script to an argparse parser
+def add_common_arguments(parser, networks=True):
+    parser.add_argument('--api-key', help='Meraki API key (default: $MERAKI_DASHBOARD_API_KEY, '
+                                          'the key in include/config.py when running non-interactively, or a prompt)')
+    parser.add_argument('--org', action='append', metavar='ID|GLOB|all',
+                        help='organization to use, by ID, name glob or "all" (repeatable; prompts when omitted)')
+    if networks:
+        parser.add_argument('--network', action='append', metavar='ID|GLOB|all',
+                            help='network to use, by ID, name glob or "all" (repeatable; prompts when omitted)')
+    parser.add_argument('--no-cache', action='store_true', help='bypass the local response cache')
+    parser.add_argument('--clear-cache', action='store_true', help='empty the local response cache before running')
+    parser.add_argument('--metrics', choices=('summary', 'json', 'prometheus', 'none'), default='summary',
+                        help='API request metrics to report at the end of the run (default: summary)')
+    parser.add_argument('--metrics-file', metavar='PATH', help='write the request metrics to a file instead of stdout')
+
+# Function to apply the shared options that change global settings
+def apply_common_arguments(args):
+    if args.no_cache:
+        config.CACHE_ENABLED = False
+    if args.clear_cache:
+        from include.cache import ResponseCache
+        cache = ResponseCache()
+        cache.clear()
+        cache.close()
+
+# Function to decide whether a run is interactive (no selection flags given)
+def is_interactive(args):
+    return not any(getattr(args, name, None) for name in ('org', 'network', 'device', 'source', 'target'))
+
+# Function to get the API key from the options, the environment, the config file or a prompt;
+# exits with a message when that leaves no key or only the placeholder from include/config.py
+def resolve_api_key(args):
+    if args.api_key:
+        api_key = args.api_key
+    elif os.environ.get('MERAKI_DASHBOARD_API_KEY'):
+        api_key = os.environ['MERAKI_DASHBOARD_API_KEY']
+    elif not is_interactive(args):
+        api_key = config.DEFAULT_API_KEY
+    else:
+        # Prompt for API key choice
+        use_default_api_key = input('Do you want to use the default API key? (y/n): ').strip().lower()
+        if use_default_api_key == 'y':
+            api_key = config.DEFAULT_API_KEY
+        else:
+            api_key = input('Enter your Meraki API key: ').strip()
+
+    if not api_key or api_key == PLACEHOLDER_API_KEY:
+        sys.exit('No Meraki API key: pass --api-key, set MERAKI_DASHBOARD_API_KEY or store a key in include/config.py.')
+    return api_key
+
+# Function to pick the items matching a list of selectors (ID, case-insensitive name glob or "all"),
+# keeping the original order and listing each item once
+def match_items(items, selectors, id_field='id'):
+    if any(selector.lower() == 'all' for selector in selectors):
+        return list(items)
+
+    matched = []
+    for item in items:
+        name = (item.get('name') or '').lower()
+        for selector in selectors:
+            if str(item.get(id_field)) == selector or fnmatch.fnmatchcase(name, selector.lower()):
+                matched.append(item)
+                break
+    return matched
+
+# Function to print a list of items with numbered options and get the user's choice (None to exit)
+def prompt_choice(items, item_type, id_field='id'):
+    while True:
+        print(f'{item_type}:')
+        for i, item in enumerate(items, start=1):
+            print(f'{i}. {item.get("name") or item[id_field]} ({id_field}: {item[id_field]})')
+        choice = input(f'Enter the number of the {item_type} you want to select (or enter 0 to exit): ')
+
+        if choice.isdigit():
+            choice = int(choice)
+            if 1 <= choice <= len(items):
+                return items[choice - 1]
+            elif choice == 0:
+                return None
+            else:
+                print('Invalid choice. Please select a valid number.')
+        else:
+            print('Invalid input. Please enter a number.')
+
+# Function to get the selectors for items within already selected ones (such as networks within
+# organizations): when the parent was chosen on the command line, an omitted option means all of them
+# rather than a prompt
+def child_selectors(selectors, parent_selectors):
+    if selectors:
+        return selectors
+    return ['all'] if parent_selectors else None
+
+# Function to select items from the command-line selectors, or with a prompt when there are none
+def select(items, selectors, item_type, id_field='id'):
+    if not items:
+        return []
+    if selectors:
+        matched = match_items(items, selectors, id_field)
+        if not matched:
+            print(f'No {item_type} matches {", ".join(selectors)}.')
+        return matched
+
+    item = prompt_choice(items, item_type, id_field)
+    return [item] if item else []
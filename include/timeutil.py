@@ -0,0 +1,102 @@
+# Desc: Fast, batched conversion of Meraki UTC timestamps to a display time zone
+# Author: Mohd NeoTech <mohdneotech@gmail.com>
+
+from datetime import datetime, timezone
+from functools import lru_cache
+
+import include.config as config
+
+# Placeholder returned for missing or unparseable timestamps
+MISSING = 'N/A'
+
+# Function to import NumPy on first use (it takes longer to import than the rest of a script),
+# returning None when it is not installed
+@lru_cache(maxsize=None)
+def load_numpy():
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+# Function to get a time zone object by name, cached so each zone is loaded only once
+@lru_cache(maxsize=None)
+def get_timezone(tz_name=None):
+    import pytz
+    return pytz.timezone(tz_name or config.DISPLAY_TIMEZONE)
+
+# Function to format a UTC offset as a short label such as GMT+8 or GMT+5:30
+def format_offset(offset):
+    minutes = int(offset.total_seconds() // 60)
+    sign = '+' if minutes >= 0 else '-'
+    hours, minutes = divmod(abs(minutes), 60)
+    return f'GMT{sign}{hours}:{minutes:02d}' if minutes else f'GMT{sign}{hours}'
+
+# Function to get a label for a time zone (used for column headers): its offset, such as
+# GMT+8, when it has no daylight saving time, otherwise the zone name
+def timezone_label(tz_name=None):
+    tz = get_timezone(tz_name)
+    year = datetime.now(timezone.utc).year
+    winter, summer = (datetime(year, month, 1, tzinfo=timezone.utc).astimezone(tz).utcoffset() for month in (1, 7))
+    return format_offset(winter) if winter == summer else tz.zone
+
+# Function to parse Meraki's fixed 'YYYY-MM-DDTHH:MM:SSZ' format into a naive UTC datetime
+def parse_utc(value):
+    if not value or not isinstance(value, str):
+        return None
+    try:
+        return datetime.fromisoformat(value[:-1] if value.endswith('Z') else value).replace(tzinfo=None)
+    except ValueError:
+        return None
+
+# Function to convert a naive UTC datetime to a formatted local time string
+def _format_local(utc_time, tz):
+    local_time = utc_time.replace(tzinfo=timezone.utc).astimezone(tz)
+    return f'{local_time:%Y-%m-%d %H:%M:%S} {format_offset(local_time.utcoffset())}'
+
+# Function to convert one UTC timestamp string; missing values return 'N/A' instead of raising
+def convert_timestamp(value, tz_name=None):
+    utc_time = parse_utc(value)
+    if utc_time is None:
+        return MISSING
+    return _format_local(utc_time, get_timezone(tz_name))
+
+# Function to get the UTC instants at which a zone's offset changes as a NumPy array, or None for
+# zones with a fixed offset
+@lru_cache(maxsize=None)
+def _transition_times(tz):
+    transitions = getattr(tz, '_utc_transition_times', None)
+    if not transitions:
+        return None
+    return load_numpy().array(transitions, dtype='datetime64[s]')
+
+# Function to convert a batch of UTC timestamp strings, vectorized with NumPy when it is installed
+def convert_timestamps(values, tz_name=None):
+    values = list(values)
+    tz = get_timezone(tz_name)
+    numpy = load_numpy()
+
+    if numpy is None or not values:
+        return [convert_timestamp(value, tz_name) for value in values]
+
+    utc_times = [parse_utc(value) for value in values]
+    valid = [utc_time is not None for utc_time in utc_times]
+    stamps = numpy.array([utc_time if utc_time is not None else datetime(1970, 1, 1) for utc_time in utc_times],
+                         dtype='datetime64[s]')
+
+    # Find the period between the zone's offset transitions each timestamp falls in (the same lookup
+    # pytz does per value), so each offset is formatted once per distinct period
+    transitions = _transition_times(tz)
+    if transitions is not None:
+        periods = numpy.maximum(numpy.searchsorted(transitions, stamps, side='right') - 1, 0)
+        periods, inverse = numpy.unique(periods, return_inverse=True)
+        offsets = [tz._transition_info[period][0] for period in periods.tolist()]
+    else:
+        inverse = numpy.zeros(len(stamps), dtype=int)
+        offsets = [tz.utcoffset(datetime(1970, 1, 1))]
+    offset_seconds = numpy.array([int(offset.total_seconds()) for offset in offsets]).astype('timedelta64[s]')
+    labels = [format_offset(offset) for offset in offsets]
+
+    local = numpy.datetime_as_string(stamps + offset_seconds[inverse], unit='s')
+    return [f'{text.replace("T", " ")} {labels[index]}' if ok else MISSING
+            for text, index, ok in zip(local, inverse, valid)]
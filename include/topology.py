@@ -0,0 +1,224 @@
+# Desc: Indexed local SQLite snapshot of organizations, networks, devices, switch ports and clients
+# Author: Mohd NeoTech <mohdneotech@gmail.com>
+
+import json
+import os
+import re
+import sqlite3
+import time
+
+import requests
+
+import include.config as config
+from include.api import get_client
+from include.concurrency import iter_concurrently
+from include.devices import get_org_devices
+
+_SCHEMA = '''
+CREATE TABLE organizations (id TEXT PRIMARY KEY, name TEXT, name_key TEXT);
+CREATE TABLE networks (id TEXT PRIMARY KEY, organization_id TEXT, name TEXT, name_key TEXT);
+CREATE TABLE devices (serial TEXT PRIMARY KEY, organization_id TEXT, network_id TEXT, name TEXT, name_key TEXT,
+                      model TEXT, mac TEXT, ip TEXT, product_type TEXT);
+CREATE TABLE ports (serial TEXT, port_id TEXT, name TEXT, name_key TEXT, enabled INTEGER, type TEXT, vlan TEXT,
+                    PRIMARY KEY (serial, port_id));
+CREATE TABLE clients (network_id TEXT, mac TEXT, id TEXT, name TEXT, name_key TEXT, ip TEXT, vlan TEXT, ssid TEXT,
+                      ap_serial TEXT, switchport TEXT, last_seen TEXT, PRIMARY KEY (network_id, mac));
+CREATE TABLE snapshot (key TEXT PRIMARY KEY, value TEXT);
+CREATE INDEX organizations_name_key ON organizations (name_key);
+CREATE INDEX networks_name_key ON networks (name_key);
+CREATE INDEX devices_name_key ON devices (name_key);
+CREATE INDEX devices_mac ON devices (mac);
+CREATE INDEX devices_ip ON devices (ip);
+CREATE INDEX ports_name_key ON ports (name_key);
+CREATE INDEX clients_mac ON clients (mac);
+CREATE INDEX clients_ip ON clients (ip);
+CREATE INDEX clients_name_key ON clients (name_key);
+'''
+
+# Columns of lookup results
+RESULT_COLUMNS = ['Kind', 'Name', 'Serial/MAC/ID', 'IP', 'Model/VLAN', 'Where', 'Network', 'Organization']
+
+_MAC_RE = re.compile(r'^[0-9a-f]{2}([:.-]?[0-9a-f]{2}){5}$', re.IGNORECASE)
+_IP_RE = re.compile(r'^\d{1,3}(\.\d{1,3}){3}$')
+_SERIAL_RE = re.compile(r'^[A-Z0-9]{4}-[A-Z0-9]{4}-[A-Z0-9]{4}$', re.IGNORECASE)
+
+# Function to normalize a MAC address to lower-case colon-separated form (None if it is not one)
+def normalize_mac(value):
+    if not value or not _MAC_RE.match(value):
+        return None
+    digits = re.sub(r'[^0-9a-f]', '', value.lower())
+    return ':'.join(digits[i:i + 2] for i in range(0, 12, 2))
+
+# Function to get the stored form of a MAC address (normalized, or as given in lower case if it is not one)
+def _mac_key(value):
+    return normalize_mac(value) or (value.lower() if value else None)
+
+# Function to turn a search into a lower-case GLOB pattern (a plain word matches as a prefix)
+def name_pattern(query):
+    query = query.lower()
+    return query if any(char in query for char in '*?[') else query + '*'
+
+# Function to fetch everything a snapshot holds for one organization; returns a dictionary of rows per table.
+# Switch ports and clients are optional as they take one request per switch and a pass per network.
+# Devices are only filtered by network (on the client side when there are many) when the networks
+# are a subset of the organization's.
+def fetch_organization(api_key, organization, networks, include_ports=True, include_clients=True, concurrency=None,
+                       all_networks=False):
+    client = get_client(api_key)
+    org_id = organization['id']
+    network_ids = None if all_networks else {network['id'] for network in networks}
+    devices = get_org_devices(api_key, org_id, network_ids=network_ids)
+    data = {'networks': networks, 'devices': devices, 'ports': [], 'clients': []}
+
+    if include_ports:
+        switches = [device for device in devices if device.get('model', '').startswith('MS')]
+
+        def fetch_ports(device):
+            return client.get(f'/devices/{device["serial"]}/switch/ports', org_id=org_id)
+
+        for device, ports, error in iter_concurrently(fetch_ports, switches, concurrency):
+            if error is None:
+                data['ports'].extend(dict(port, serial=device['serial']) for port in ports)
+            elif isinstance(error, requests.exceptions.RequestException):
+                print(f'Error fetching switch ports for {device.get("name")} ({device["serial"]}): {error}')
+            else:
+                raise error
+
+    if include_clients:
+        for network in networks:
+            try:
+                for record in client.paginate(f'/networks/{network["id"]}/clients', org_id=org_id,
+                                              per_page=config.NETWORK_CLIENTS_PER_PAGE, stream=True):
+                    data['clients'].append(dict(record, networkId=network['id']))
+            except requests.exceptions.RequestException as e:
+                print(f'Error fetching clients for network {network["name"]}: {e}')
+    return data
+
+# Class holding the snapshot database. Every lookup is an index search, so answers come back in
+# milliseconds without an API key or any API call.
+class TopologySnapshot:
+    def __init__(self, path=None):
+        self.path = path or config.TOPOLOGY_PATH
+        self.db = sqlite3.connect(f'file:{self.path}?mode=ro', uri=True) if os.path.exists(self.path) else None
+
+    # Function to write a new snapshot from fetched organizations, replacing the old one in one step
+    # so lookups running meanwhile always see a complete snapshot
+    @staticmethod
+    def build(path, organizations):
+        path = path or config.TOPOLOGY_PATH
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        building = f'{path}.building'
+        if os.path.exists(building):
+            os.remove(building)
+
+        db = sqlite3.connect(building)
+        db.executescript(_SCHEMA)
+        counts = {'organizations': 0, 'networks': 0, 'devices': 0, 'ports': 0, 'clients': 0}
+        with db:
+            for organization, data in organizations:
+                org_id = organization['id']
+                db.execute('INSERT OR REPLACE INTO organizations VALUES (?, ?, ?)',
+                           (org_id, organization.get('name'), (organization.get('name') or '').lower()))
+                db.executemany('INSERT OR REPLACE INTO networks VALUES (?, ?, ?, ?)',
+                               [(network['id'], org_id, network.get('name'), (network.get('name') or '').lower())
+                                for network in data['networks']])
+                db.executemany('INSERT OR REPLACE INTO devices VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                               [(device['serial'], org_id, device.get('networkId'), device.get('name'),
+                                 (device.get('name') or '').lower(), device.get('model'), _mac_key(device.get('mac')),
+                                 device.get('lanIp'), device.get('productType'))
+                                for device in data['devices']])
+                db.executemany('INSERT OR REPLACE INTO ports VALUES (?, ?, ?, ?, ?, ?, ?)',
+                               [(port['serial'], str(port.get('portId')), port.get('name'), (port.get('name') or '').lower(),
+                                 int(bool(port.get('enabled'))), port.get('type'), None if port.get('vlan') is None else str(port['vlan']))
+                                for port in data['ports']])
+                db.executemany('INSERT OR REPLACE INTO clients VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                               [(record['networkId'], _mac_key(record.get('mac')), record.get('id'), record.get('description'),
+                                 (record.get('description') or '').lower(), record.get('ip'),
+                                 None if record.get('vlan') is None else str(record['vlan']), record.get('ssid'),
+                                 record.get('recentDeviceSerial'), json.dumps(record.get('switchport')) if record.get('switchport') else None,
+                                 record.get('lastSeen'))
+                                for record in data['clients'] if record.get('mac')])
+                counts['organizations'] += 1
+                for table in ('networks', 'devices', 'ports', 'clients'):
+                    counts[table] += len(data[table])
+            db.execute('INSERT OR REPLACE INTO snapshot VALUES (?, ?)', ('built_at', str(time.time())))
+            db.execute('INSERT OR REPLACE INTO snapshot VALUES (?, ?)', ('counts', json.dumps(counts)))
+        db.close()
+        os.replace(building, path)
+        return counts
+
+    # Function to describe the snapshot: when it was built and how many rows of each kind it holds
+    def info(self):
+        if self.db is None:
+            return None
+        meta = dict(self.db.execute('SELECT key, value FROM snapshot'))
+        return {'built_at': float(meta.get('built_at', 0)), 'counts': json.loads(meta.get('counts', '{}'))}
+
+    # Function to find everything matching a query: a MAC address, an IPv4 address or a serial is looked
+    # up exactly; anything else is a case-insensitive prefix or glob (*, ?) matched against names across
+    # all kinds, and against device serials and device and client MAC and IP addresses (e.g. Q2XX-*,
+    # 7a:*, 172.16.*)
+    def lookup(self, query):
+        if self.db is None:
+            return []
+        query = query.strip()
+        mac = normalize_mac(query)
+        if mac:
+            return self._devices('d.mac = ?', mac) + self._clients('c.mac = ?', mac)
+        if _IP_RE.match(query):
+            return self._devices('d.ip = ?', query) + self._clients('c.ip = ?', query)
+        if _SERIAL_RE.match(query):
+            return self._devices('d.serial = ?', query.upper()) + self._ports('p.serial = ?', query.upper())
+
+        pattern = name_pattern(query)
+        return (self._organizations(pattern) + self._networks(pattern)
+                + self._devices('d.name_key GLOB ? OR d.serial GLOB ? OR d.mac GLOB ? OR d.ip GLOB ?',
+                                pattern, pattern.upper(), pattern, pattern)
+                + self._ports('p.name_key GLOB ?', pattern)
+                + self._clients('c.name_key GLOB ? OR c.mac GLOB ? OR c.ip GLOB ?', pattern, pattern, pattern))
+
+    def _organizations(self, pattern):
+        rows = self.db.execute('SELECT id, name FROM organizations WHERE name_key GLOB ? ORDER BY name_key', (pattern,))
+        return [['organization', name, org_id, None, None, None, None, name] for org_id, name in rows]
+
+    def _networks(self, pattern):
+        rows = self.db.execute('SELECT n.id, n.name, o.name FROM networks n LEFT JOIN organizations o ON o.id = n.organization_id '
+                               'WHERE n.name_key GLOB ? ORDER BY n.name_key', (pattern,))
+        return [['network', name, network_id, None, None, None, name, org_name] for network_id, name, org_name in rows]
+
+    def _devices(self, condition, *values):
+        rows = self.db.execute('SELECT d.serial, d.name, d.mac, d.ip, d.model, n.name, o.name FROM devices d '
+                               'LEFT JOIN networks n ON n.id = d.network_id LEFT JOIN organizations o ON o.id = d.organization_id '
+                               f'WHERE {condition} ORDER BY d.name_key', values)
+        return [['device', name, f'{serial} ({mac})' if mac else serial, ip, model, None, network, org]
+                for serial, name, mac, ip, model, network, org in rows]
+
+    def _ports(self, condition, *values):
+        rows = self.db.execute('SELECT p.serial, p.port_id, p.name, p.vlan, p.enabled, d.name, n.name, o.name FROM ports p '
+                               'LEFT JOIN devices d ON d.serial = p.serial LEFT JOIN networks n ON n.id = d.network_id '
+                               'LEFT JOIN organizations o ON o.id = d.organization_id '
+                               f'WHERE {condition} ORDER BY p.serial, CAST(p.port_id AS INTEGER)', values)
+        return [['port', name, f'{serial}/{port_id}', None, f'VLAN {vlan}' if vlan else None,
+                 f'{switch or serial} port {port_id}' + ('' if enabled else ' (disabled)'), network, org]
+                for serial, port_id, name, vlan, enabled, switch, network, org in rows]
+
+    def _clients(self, condition, *values):
+        rows = self.db.execute('SELECT c.mac, c.name, c.ip, c.vlan, c.ssid, c.ap_serial, c.switchport, d.name, n.name, o.name '
+                               'FROM clients c LEFT JOIN devices d ON d.serial = c.ap_serial '
+                               'LEFT JOIN networks n ON n.id = c.network_id LEFT JOIN organizations o ON o.id = n.organization_id '
+                               f'WHERE {condition} ORDER BY c.name_key', values)
+        results = []
+        for mac, name, ip, vlan, ssid, ap_serial, switchport, device, network, org in rows:
+            where = device or ap_serial
+            if ssid:
+                where = f'{where} / {ssid}'
+            if switchport:
+                where = f'{where} port {json.loads(switchport)}'
+            results.append(['client', name, mac, ip, f'VLAN {vlan}' if vlan else None, where, network, org])
+        return results
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
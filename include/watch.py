@@ -0,0 +1,62 @@
+# Desc: Adaptive per-item polling schedule for long-running watch modes
+# Author: Mohd NeoTech <mohdneotech@gmail.com>
+
+import time
+
+import include.config as config
+
+# Class scheduling polls per key (such as an AP serial or a network ID). A key whose value changed is
+# polled again after the minimum interval; while it stays the same its interval doubles up to the
+# maximum, or up to the busy maximum when its load (the value itself unless given) is at least the
+# busy threshold.
+class AdaptivePoller:
+    def __init__(self, min_interval=None, max_interval=None, busy_threshold=None, busy_max_interval=None):
+        self.min_interval = min_interval or config.WATCH_MIN_INTERVAL
+        self.max_interval = max(max_interval or config.WATCH_MAX_INTERVAL, self.min_interval)
+        self.busy_threshold = config.WATCH_BUSY_CLIENTS if busy_threshold is None else busy_threshold
+        self.busy_max_interval = max(busy_max_interval or config.WATCH_BUSY_MAX_INTERVAL, self.min_interval)
+        self.values = {}
+        self.intervals = {}
+        self.next_poll = {}
+
+    # Function to set the keys being watched: new keys are due right away, removed ones are forgotten
+    def sync(self, keys, now=None):
+        now = time.monotonic() if now is None else now
+        keys = set(keys)
+        for key in list(self.next_poll):
+            if key not in keys:
+                del self.next_poll[key]
+                self.intervals.pop(key, None)
+                self.values.pop(key, None)
+        for key in keys:
+            if key not in self.next_poll:
+                self.next_poll[key] = now
+                self.intervals[key] = self.min_interval
+
+    # Function to list the keys due for a poll
+    def due(self, now=None):
+        now = time.monotonic() if now is None else now
+        return [key for key, when in self.next_poll.items() if when <= now]
+
+    # Function to get the time of the next due poll (None when nothing is watched)
+    def next_due(self):
+        return min(self.next_poll.values(), default=None)
+
+    # Function to record a polled value and schedule the key's next poll; returns the new interval
+    def record(self, key, value, now=None, load=None):
+        now = time.monotonic() if now is None else now
+        previous = self.values.get(key)
+        if previous is None or value != previous:
+            interval = self.min_interval
+        else:
+            limit = self.busy_max_interval if (value if load is None else load) >= self.busy_threshold else self.max_interval
+            interval = min(self.intervals.get(key, self.min_interval) * 2, max(limit, self.min_interval))
+        self.values[key] = value
+        self.intervals[key] = interval
+        self.next_poll[key] = now + interval
+        return interval
+
+    # Function to schedule another try after a failed poll, keeping the key's interval
+    def failed(self, key, now=None):
+        now = time.monotonic() if now is None else now
+        self.next_poll[key] = now + self.intervals.get(key, self.min_interval)
@@ -0,0 +1,105 @@
+# title: Cisco Meraki Topology Snapshot and Lookup
+# description: This script builds a local snapshot of organizations, networks, devices, switch ports
+#              and clients (--build), then answers lookups from it by MAC address, IP address,
+#              serial or name (prefix or glob) in milliseconds, without an API key or API calls.
+#                  python lookupTopology.py --build --org all
+#                  python lookupTopology.py aa:bb:cc:dd:ee:ff 10.0.0.12 Q2XX-AAAA-BBBB "lobby*"
+
+import argparse
+import sys
+import time
+
+import include.config as config
+from include.api import get_client
+from include.discovery import get_networks, get_organizations
+from include.metrics import report_metrics
+from include.output import open_writer
+from include.selection import add_common_arguments, apply_common_arguments, match_items, resolve_api_key, select
+from include.topology import RESULT_COLUMNS, TopologySnapshot, fetch_organization
+
+# Function to fetch the selected organizations one at a time for the snapshot builder
+def iter_organization_data(api_key, organizations, network_selectors, include_ports, include_clients, concurrency):
+    for organization in organizations:
+        org_networks = get_networks(api_key, organization['id']) or []
+        networks = match_items(org_networks, network_selectors or ['all'])
+        if not networks:
+            print(f'Organization {organization["name"]}: no matching networks, skipped')
+            continue
+        print(f'Organization {organization["name"]}: {len(networks)} network(s)')
+        yield organization, fetch_organization(api_key, organization, networks, include_ports, include_clients, concurrency,
+                                               all_networks=len(networks) == len(org_networks))
+
+# Function to build the snapshot of the selected organizations
+def build_snapshot(args):
+    # Banner message
+    print('Cisco Meraki Topology Snapshot')
+    print('Developer: Mohd NeoTech <mohdneotech@gmail.com>')
+    print('-----------------------------------------------')
+
+    api_key = resolve_api_key(args)
+    organizations = get_organizations(api_key)
+
+    if not organizations:
+        print('No organizations found.')
+        return
+
+    selected_orgs = select(organizations, args.org, 'Organization')
+    counts = TopologySnapshot.build(args.snapshot, iter_organization_data(api_key, selected_orgs, args.network, not args.no_ports,
+                                                                          not args.no_clients, args.concurrency))
+    print('Snapshot written to {}: {}'.format(args.snapshot, ', '.join(f'{count} {kind}' for kind, count in counts.items())))
+    report_metrics(get_client(api_key), args.metrics, args.metrics_file)
+
+# Function to answer lookups from the snapshot
+def lookup(args):
+    snapshot = TopologySnapshot(args.snapshot)
+    info = snapshot.info()
+    if info is None:
+        print(f'No snapshot at {args.snapshot}; build one with --build first.', file=sys.stderr)
+        return
+
+    age = (time.time() - info['built_at']) / 3600
+    print(f'Snapshot built {age:.1f} hour(s) ago', file=sys.stderr)
+    results = [result for query in args.query for result in snapshot.lookup(query)]
+    snapshot.close()
+
+    if args.format == 'grid':
+        if results:
+            from tabulate import tabulate
+            print(tabulate(results, headers=RESULT_COLUMNS, tablefmt="grid"))
+        else:
+            print('No matches.')
+        return
+
+    with open_writer(args.format, RESULT_COLUMNS) as writer:
+        writer.write_rows(results)
+
+# Function to parse command-line options
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Cisco Meraki Topology Snapshot and Lookup')
+    add_common_arguments(parser)
+    parser.add_argument('query', nargs='*', help='MAC address, IP address, serial or name (prefix or glob) to look up')
+    parser.add_argument('--build', action='store_true', help='fetch the selected organizations and rebuild the snapshot')
+    parser.add_argument('--snapshot', metavar='PATH', default=config.TOPOLOGY_PATH,
+                        help=f'snapshot file (default: {config.TOPOLOGY_PATH})')
+    parser.add_argument('--no-ports', action='store_true', help='leave switch ports out of the snapshot')
+    parser.add_argument('--no-clients', action='store_true', help='leave clients out of the snapshot')
+    parser.add_argument('--concurrency', type=int, default=config.CONCURRENCY,
+                        help=f'number of switches fetched at the same time (default: {config.CONCURRENCY})')
+    parser.add_argument('--format', choices=('grid', 'csv', 'ndjson'), default='grid', help='lookup output format (default: grid)')
+    args = parser.parse_args(argv)
+    if not args.build and not args.query:
+        parser.error('give something to look up, or --build to build the snapshot')
+    return args
+
+# Main function
+def main(argv=None):
+    args = parse_args(argv)
+    apply_common_arguments(args)
+
+    if args.build:
+        build_snapshot(args)
+    if args.query:
+        lookup(args)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+# title: Cisco Meraki tools
+# description: One entry point for the Meraki scripts. Each subcommand runs one of the scripts with
+#              the options that follow it, importing that script (and its dependencies) only when
+#              it is used, so wrappers that call the tools many times start quickly.
+#                  python meraki_tools.py ap-counts --org all --network all
+#                  python meraki_tools.py clients --org "Acme*" --network all --format ndjson
+#                  python meraki_tools.py ports --org all --inventory ports.csv
+#                  python meraki_tools.py clone --org 123456 --source Q2XX-AAAA --target Q2XX-BBBB --dry-run
+#                  python meraki_tools.py lookup --build --org all
+#              Run "python meraki_tools.py <command> --help" for the options of a command.
+
+import argparse
+import importlib
+import sys
+
+# Subcommands and the script module each one runs
+COMMANDS = {
+    'ap-counts': ('getWifiConnected', 'count connected clients per wireless AP'),
+    'clients': ('getWifiConnectedUsers', 'list, summarize or sync the connected wireless clients'),
+    'ports': ('getPortsFromMS', 'show switch ports or write an org-wide port inventory'),
+    'clone': ('postCloneSwitch', 'clone a switch, or its port configuration, to other switches'),
+    'lookup': ('lookupTopology', 'build a local topology snapshot and look up MACs, IPs, serials and names'),
+}
+
+# Function to parse the subcommand, leaving its options to the script it runs
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Cisco Meraki tools',
+                                     epilog='commands:\n' + '\n'.join(f'  {name:<10} {help_text}' for name, (_, help_text) in COMMANDS.items()),
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=COMMANDS, metavar='command', help=f'one of {", ".join(COMMANDS)}')
+    parser.add_argument('args', nargs=argparse.REMAINDER, help='options of the command (see <command> --help)')
+    return parser.parse_args(argv)
+
+# Main function
+def main(argv=None):
+    args = parse_args(argv)
+    module_name = COMMANDS[args.command][0]
+
+    # The script's own parser names itself after sys.argv[0], so show the subcommand in its usage
+    sys.argv[0] = f'{sys.argv[0]} {args.command}'
+    return importlib.import_module(module_name).main(args.args)
+
+if __name__ == '__main__':
+    sys.exit(main())
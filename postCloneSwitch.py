@@ -1,49 +1,214 @@
 # title: Cisco Meraki Switch Device Cloning
 # description: This script will clone a source switch to one or more target switches within the same organization.
+#              Pass --org/--source/--target to run without prompts.
+
+import argparse
+import sys
+from collections import Counter
 
 import requests
-from tqdm import tqdm
 import include.config as config
+from include.action_batch import port_update_action, run_action_batches
+from include.api import get_client
+from include.concurrency import iter_concurrently
+from include.devices import get_switches
+from include.journal import Journal
+from include.jsonutil import response_json
+from include.metrics import report_metrics
+from include.selection import add_common_arguments, apply_common_arguments, match_items, resolve_api_key, select
+# tqdm is imported where a progress bar is shown, so planning and dry runs start faster
 
 # Default API key (you can replace this with your default key)
 DEFAULT_API_KEY = config.DEFAULT_API_KEY
-BASE_URL = config.BASE_URL
 
 # Function to fetch organizations
 def get_organizations(api_key):
-    headers = {'X-Cisco-Meraki-API-Key': api_key}
-    response = requests.get(f'{BASE_URL}/organizations', headers=headers)
-    response.raise_for_status()
-    return response.json()
+    return get_client(api_key).get('/organizations')
 
 # Function to fetch MS devices (switches) within an organization
 def get_ms_devices(api_key, org_id):
-    headers = {'X-Cisco-Meraki-API-Key': api_key}
-    response = requests.get(f'{BASE_URL}/organizations/{org_id}/devices', headers=headers)
-    response.raise_for_status()
-    return [device for device in response.json() if device['model'][:2] == 'MS']
-
-# Function to clone a switch to target devices
-def clone_switch(api_key, org_id, source_serial, target_serials):
-    headers = {'X-Cisco-Meraki-API-Key': api_key}
-    source_device = next((device for device in get_ms_devices(api_key, org_id) if device['serial'] == source_serial), None)
-
-    if source_device:
-        print(f"Cloning source switch: {source_device['name']} ({source_device['serial']})")
-
-        for target_serial in tqdm(target_serials, desc="Cloning Progress"):
-            if target_serial != source_serial:
-                payload = {
-                    'name': source_device['name'],
-                    'cloneFromSerial': source_device['serial'],
-                    'copyPortConfigs': True,
-                    'copySwitchSettings': True,
-                }
-
-                response = requests.post(f'{BASE_URL}/devices/{target_serial}/clone', headers=headers, json=payload)
-                response.raise_for_status()
-    else:
+    return get_switches(api_key, org_id)
+
+# Function to clone a switch to target devices, up to `concurrency` targets at a time.
+# `ms_devices` is the caller's device list (fetched again only when not given). When a journal
+# is given, targets that were already cloned from this source are skipped and every outcome
+# is recorded, so an interrupted batch can simply be rerun. Returns one result per target.
+def clone_switch(api_key, org_id, source_serial, target_serials, ms_devices=None, concurrency=None, journal=None):
+    client = get_client(api_key)
+    if ms_devices is None:
+        ms_devices = get_ms_devices(api_key, org_id)
+    source_device = next((device for device in ms_devices if device['serial'] == source_serial), None)
+
+    if not source_device:
         print(f"Source switch with serial {source_serial} not found.")
+        return []
+
+    print(f"Cloning source switch: {source_device['name']} ({source_device['serial']})")
+
+    payload = {
+        'name': source_device['name'],
+        'cloneFromSerial': source_device['serial'],
+        'copyPortConfigs': True,
+        'copySwitchSettings': True,
+    }
+
+    def journal_key(target_serial):
+        return f'{source_serial}->{target_serial}'
+
+    results = []
+    done = journal.completed() if journal else set()
+    pending = []
+    for target_serial in dict.fromkeys(target_serials):
+        if target_serial == source_serial:
+            continue
+        if journal_key(target_serial) in done:
+            results.append({'serial': target_serial, 'status': 'skipped', 'detail': 'already cloned'})
+        else:
+            pending.append(target_serial)
+
+    def clone(target_serial):
+        return client.post(f'/devices/{target_serial}/clone', json=payload, org_id=org_id)
+
+    from tqdm import tqdm
+    for target_serial, _, error in tqdm(iter_concurrently(clone, pending, concurrency), total=len(pending), desc="Cloning Progress"):
+        if error is None:
+            result = {'serial': target_serial, 'status': 'cloned', 'detail': ''}
+        elif isinstance(error, requests.exceptions.RequestException):
+            result = {'serial': target_serial, 'status': 'failed', 'detail': str(error)}
+        else:
+            raise error
+
+        if journal:
+            journal.record(journal_key(target_serial), 'ok' if result['status'] == 'cloned' else 'failed', result['detail'])
+        results.append(result)
+
+    return results
+
+# Function to print the per-target outcome of a clone run
+def print_clone_report(results):
+    for result in results:
+        print(f"{result['serial']}: {result['status']}{' - ' + result['detail'] if result['detail'] else ''}")
+
+    counts = Counter(result['status'] for result in results)
+    print(', '.join(f'{status.capitalize()}: {count}' for status, count in counts.items()) or 'Nothing to do.')
+
+# Function to get the exit status of a run: 1 when any target or port failed or was rolled back
+def exit_status(results):
+    return 1 if any(result['status'] in ('failed', 'rolled back') for result in results) else 0
+
+# Port fields that describe the hardware or are not writable, so they are neither compared nor pushed
+PORT_READ_ONLY_FIELDS = ('portId', 'linkNegotiationCapabilities', 'module', 'mirror')
+
+# Function to fetch the live port configuration of a switch (never from the response cache)
+def get_switch_ports(api_key, org_id, serial):
+    return response_json(get_client(api_key).request('GET', f'/devices/{serial}/switch/ports', org_id=org_id, use_cache=False))
+
+# Function to compare a target switch's ports with the source's; returns one change per differing field
+def diff_ports(source_ports, target_ports):
+    target_by_id = {port['portId']: port for port in target_ports}
+    changes = []
+    for source_port in source_ports:
+        port_id = source_port['portId']
+        target_port = target_by_id.get(port_id)
+        if target_port is None:
+            changes.append({'portId': port_id, 'field': None, 'current': None, 'desired': 'port missing on target'})
+            continue
+        for field, desired in source_port.items():
+            if field in PORT_READ_ONLY_FIELDS:
+                continue
+            current = target_port.get(field)
+            if current != desired:
+                changes.append({'portId': port_id, 'field': field, 'current': current, 'desired': desired})
+    return changes
+
+# Function to plan a clone: fetch source and target port configs concurrently and diff every
+# target against the source. Returns one entry per target with its pending changes (or error).
+def plan_clone(api_key, org_id, source_serial, target_serials, concurrency=None):
+    source_ports = get_switch_ports(api_key, org_id, source_serial)
+    targets = [serial for serial in dict.fromkeys(target_serials) if serial != source_serial]
+
+    plan = []
+    for serial, target_ports, error in iter_concurrently(lambda serial: get_switch_ports(api_key, org_id, serial), targets, concurrency):
+        if error is None:
+            plan.append({'serial': serial, 'changes': diff_ports(source_ports, target_ports), 'error': None})
+        elif isinstance(error, requests.exceptions.RequestException):
+            plan.append({'serial': serial, 'changes': [], 'error': str(error)})
+        else:
+            raise error
+    return plan
+
+# Function to print the pending changes of a clone plan (the dry-run report)
+def print_clone_plan(plan):
+    for entry in plan:
+        if entry['error']:
+            print(f"{entry['serial']}: could not be compared - {entry['error']}")
+        elif not entry['changes']:
+            print(f"{entry['serial']}: in sync with the source")
+        else:
+            print(f"{entry['serial']}: {len(entry['changes'])} change(s)")
+            for change in entry['changes']:
+                if change['field'] is None:
+                    print(f"    port {change['portId']}: {change['desired']}")
+                else:
+                    print(f"    port {change['portId']} {change['field']}: {change['current']!r} -> {change['desired']!r}")
+
+# Function to get the serials that need a write, i.e. that differ from the source or could not be compared
+def targets_needing_changes(plan):
+    return [entry['serial'] for entry in plan if entry['changes'] or entry['error']]
+
+# Function to group a target's changes into one port update payload per port
+def port_update_payloads(changes):
+    payloads = {}
+    for change in changes:
+        if change['field'] is not None:
+            payloads.setdefault(change['portId'], {})[change['field']] = change['desired']
+    return payloads
+
+# Function to report what port updates cannot do: targets the plan could not compare, and ports
+# missing on a target (only a full clone adds them)
+def unhandled_changes(plan):
+    results = []
+    for entry in plan:
+        if entry['error']:
+            results.append({'serial': entry['serial'], 'status': 'failed', 'detail': f"could not be compared - {entry['error']}"})
+        for change in entry['changes']:
+            if change['field'] is None:
+                results.append({'serial': f"{entry['serial']} port {change['portId']}", 'status': 'failed',
+                                'detail': 'port missing on target (use --apply clone)'})
+    return results
+
+# Function to push only the differing port fields to each target, instead of a full clone
+def update_ports(api_key, org_id, plan, concurrency=None):
+    client = get_client(api_key)
+    updates = [(entry['serial'], port_id, payload)
+               for entry in plan if not entry['error']
+               for port_id, payload in port_update_payloads(entry['changes']).items()]
+
+    def update(item):
+        serial, port_id, payload = item
+        return client.put(f'/devices/{serial}/switch/ports/{port_id}', json=payload, org_id=org_id)
+
+    results = unhandled_changes(plan)
+    from tqdm import tqdm
+    for (serial, port_id, _), _, error in tqdm(iter_concurrently(update, updates, concurrency), total=len(updates), desc="Port Updates"):
+        if error is not None and not isinstance(error, requests.exceptions.RequestException):
+            raise error
+        results.append({'serial': f'{serial} port {port_id}', 'status': 'failed' if error else 'updated',
+                        'detail': str(error) if error else ''})
+    return results
+
+# Function to push the differing port fields to every target as Meraki action batches
+def update_ports_in_batches(api_key, org_id, plan):
+    actions = [port_update_action(entry['serial'], port_id, payload)
+               for entry in plan if not entry['error']
+               for port_id, payload in port_update_payloads(entry['changes']).items()]
+
+    from tqdm import tqdm
+    with tqdm(total=len(actions), desc="Action Batches") as progress_bar:
+        results = run_action_batches(get_client(api_key), org_id, actions, progress_bar.update)
+
+    return unhandled_changes(plan) + [{'serial': f"{result['serial']} port {result['portId']}", 'status': result['status'],
+                                       'detail': result['detail']} for result in results]
 
 # Function to list registered switches
 def list_registered_switches(ms_devices):
@@ -51,19 +216,75 @@ def list_registered_switches(ms_devices):
     for i, device in enumerate(ms_devices, start=1):
         print(f'{i}. {device["name"]} ({device["serial"]})')
 
+# Function to pick a device by serial or name from the command line, or with a prompt
+def choose_source_switch(ms_devices, selector):
+    if selector:
+        matches = match_items(ms_devices, [selector], 'serial')
+        if len(matches) != 1:
+            print(f'--source {selector} must match exactly one switch ({len(matches)} matched).')
+            return None
+        return matches[0]
+
+    source_choice = int(input('Enter the number of the source switch to clone: '))
+    if source_choice < 1 or source_choice > len(ms_devices):
+        print('Invalid source switch choice.')
+        return None
+    return ms_devices[source_choice - 1]
+
+# Function to pick target switches from the command line, or with repeated prompts
+def choose_target_switches(ms_devices, selectors):
+    if selectors:
+        return [device['serial'] for device in match_items(ms_devices, selectors, 'serial')]
+
+    # Prompt for target switches selection (multiple)
+    print('Select one or more target switches to clone to (enter 0 when done):')
+    target_serials = []
+    while True:
+        target_choice = int(input('Enter the number of a target switch or 0 to finish: '))
+        if target_choice == 0:
+            break
+        if target_choice < 1 or target_choice > len(ms_devices):
+            print('Invalid target switch choice.')
+        else:
+            target_serial = ms_devices[target_choice - 1]['serial']
+            target_serials.append(target_serial)
+    return target_serials
+
+# Function to parse command-line options
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Cisco Meraki Switch Device Cloning Script')
+    add_common_arguments(parser, networks=False)
+    parser.add_argument('--source', metavar='SERIAL|NAME', help='source switch to clone from (prompts when omitted)')
+    parser.add_argument('--target', action='append', metavar='SERIAL|GLOB|all',
+                        help='target switches, by serial, name glob or "all" (repeatable; prompts when omitted)')
+    parser.add_argument('--concurrency', type=int, default=config.CONCURRENCY,
+                        help=f'number of clone requests in flight (default: {config.CONCURRENCY})')
+    parser.add_argument('--journal', default=config.CLONE_JOURNAL_PATH,
+                        help=f'journal of completed clones used to resume an interrupted batch (default: {config.CLONE_JOURNAL_PATH})')
+    parser.add_argument('--reclone', action='store_true',
+                        help='with --no-plan, clone every target again, even if the journal says it is done')
+    parser.add_argument('--no-plan', action='store_true',
+                        help='clone every target without first comparing its port configs with the source')
+    parser.add_argument('--dry-run', action='store_true', help='only report the port changes each target needs')
+    parser.add_argument('--apply', choices=('clone', 'ports', 'batch'), default='clone',
+                        help='for differing targets, clone the whole switch, update just the differing ports, '
+                             'or send those port updates as action batches (default: clone)')
+    args = parser.parse_args(argv)
+    if args.dry_run and args.no_plan:
+        parser.error('--dry-run reports the planned port changes, so it cannot be combined with --no-plan')
+    return args
+
 # Main function
-def main():
+def main(argv=None):
+    args = parse_args(argv)
+    apply_common_arguments(args)
+
     # Banner message
     print('Cisco Meraki Switch Device Cloning Script')
     print('Developer: Mohd NeoTech <mohdneotech@gmail.com>')
     print('-----------------------------------------------')
 
-   # Prompt for API key choice
-    use_default_api_key = input('Do you want to use the default API key? (y/n): ').strip().lower()
-    if use_default_api_key == 'y':
-        api_key = DEFAULT_API_KEY
-    else:
-        api_key = input('Enter your Meraki API key: ')
+    api_key = resolve_api_key(args)
 
     # Fetch organizations
     try:
@@ -75,18 +296,13 @@ def main():
         print(f'Error fetching organizations: {e}')
         return
 
-    # Prompt for organization selection
-    print('Select an organization:')
-    for i, org in enumerate(organizations, start=1):
-        print(f'{i}. {org["name"]} ({org["id"]})')
-    
-    org_choice = int(input('Enter the number of the organization: '))
-    if org_choice < 1 or org_choice > len(organizations):
-        print('Invalid organization choice.')
+    # Select the organization (cloning works within one organization)
+    selected_orgs = select(organizations, args.org, 'Organization')
+    if len(selected_orgs) != 1:
+        print('Select exactly one organization to clone within.')
         return
-    
-    selected_org = organizations[org_choice - 1]
-    org_id = selected_org['id']
+
+    org_id = selected_orgs[0]['id']
 
     # Fetch and list MS devices within the selected organization
     try:
@@ -98,37 +314,62 @@ def main():
         print(f'Error fetching MS devices: {e}')
         return
 
-    list_registered_switches(ms_devices)
+    if not args.source or not args.target:
+        list_registered_switches(ms_devices)
 
-    # Prompt for source switch selection
-    source_choice = int(input('Enter the number of the source switch to clone: '))
-    if source_choice < 1 or source_choice > len(ms_devices):
-        print('Invalid source switch choice.')
+    # Select the source switch
+    source_device = choose_source_switch(ms_devices, args.source)
+    if not source_device:
         return
-    
-    source_serial = ms_devices[source_choice - 1]['serial']
 
-    # Prompt for target switches selection (multiple)
-    print('Select one or more target switches to clone to (enter 0 when done):')
-    target_serials = []
-    while True:
-        target_choice = int(input('Enter the number of a target switch or 0 to finish: '))
-        if target_choice == 0:
-            break
-        if target_choice < 1 or target_choice > len(ms_devices):
-            print('Invalid target switch choice.')
-        else:
-            target_serial = ms_devices[target_choice - 1]['serial']
-            target_serials.append(target_serial)
+    source_serial = source_device['serial']
+
+    # Select the target switches
+    target_serials = choose_target_switches(ms_devices, args.target)
 
     if not target_serials:
         print('No valid target switches selected.')
         return
 
-    # Clone switches with progress bar
-    clone_switch(api_key, org_id, source_serial, target_serials)
+    if not args.no_plan:
+        # Compare port configs first so only switches that differ get written to
+        plan = plan_clone(api_key, org_id, source_serial, target_serials, args.concurrency)
+        print_clone_plan(plan)
+        if args.dry_run:
+            return
+
+        if args.apply in ('ports', 'batch'):
+            if args.apply == 'batch':
+                results = update_ports_in_batches(api_key, org_id, plan)
+            else:
+                results = update_ports(api_key, org_id, plan, args.concurrency)
+            print_clone_report(results)
+            print('Port updates completed with errors.' if exit_status(results) else 'Port updates completed.')
+            report_metrics(get_client(api_key), args.metrics, args.metrics_file)
+            return exit_status(results)
+
+        target_serials = targets_needing_changes(plan)
+        if not target_serials:
+            print('All target switches already match the source.')
+            return
+
+    # The journal lets an interrupted batch resume. Targets the plan compared and found differing from
+    # the source are cloned again even if the journal says an earlier run did; targets it could not
+    # compare keep their journal record.
+    journal = Journal(args.journal)
+    if args.no_plan:
+        stale_serials = target_serials if args.reclone else []
+    else:
+        stale_serials = [entry['serial'] for entry in plan if entry['changes'] and not entry['error']]
+    journal.reset(f'{source_serial}->{target_serial}' for target_serial in stale_serials)
+
+    # Clone switches with progress bar, reusing the device list fetched above
+    results = clone_switch(api_key, org_id, source_serial, target_serials, ms_devices, args.concurrency, journal)
+    print_clone_report(results)
 
-    print('Switch cloning completed.')
+    print('Switch cloning completed with errors.' if exit_status(results) else 'Switch cloning completed.')
+    report_metrics(get_client(api_key), args.metrics, args.metrics_file)
+    return exit_status(results)
 
 if __name__ == '__main__':
-    main()
+    sys.exit(main())
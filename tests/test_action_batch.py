@@ -0,0 +1,101 @@
+# Desc: Tests of action batch building, result mapping and polling
+# Author: Mohd NeoTech <mohdneotech@gmail.com>
+
+import pytest
+import requests
+
+import include.config as config
+from include.action_batch import _batch_results, action_target, chunk_actions, port_update_action, run_action_batches
+
+ACTIONS = [port_update_action('Q-1', '1', {'vlan': 10}), port_update_action('Q-1', '2', {'vlan': 20}),
+           port_update_action('Q-2', '12', {'enabled': False})]
+
+def test_port_update_action_and_target():
+    assert ACTIONS[0] == {'resource': '/devices/Q-1/switch/ports/1', 'operation': 'update', 'body': {'vlan': 10}}
+    assert action_target(ACTIONS[2]) == ('Q-2', '12')
+    assert action_target({'resource': '/devices/Q-3/switch/settings'}) == ('Q-3', None)
+    assert action_target({'resource': '/networks/N_1'}) == (None, None)
+
+def test_chunk_actions():
+    assert [len(chunk) for chunk in chunk_actions(list(range(250)), 100)] == [100, 100, 50]
+    assert chunk_actions([], 100) == []
+
+def test_batch_results_applied():
+    results = _batch_results('b1', ACTIONS, {'completed': True, 'failed': False, 'errors': []})
+    assert [(result['serial'], result['portId'], result['status']) for result in results] == [
+        ('Q-1', '1', 'applied'), ('Q-1', '2', 'applied'), ('Q-2', '12', 'applied')]
+    assert all(result['batchId'] == 'b1' for result in results)
+
+def test_batch_results_map_errors_to_actions():
+    status = {'failed': True, 'errors': ['Action 1: Invalid VLAN',
+                                         'Error updating /devices/Q-2/switch/ports/12: port is read-only']}
+    results = _batch_results('b1', ACTIONS, status)
+    assert [result['status'] for result in results] == ['rolled back', 'failed', 'failed']
+    assert results[1]['detail'] == 'Action 1: Invalid VLAN'
+    assert results[2]['detail'].endswith('port is read-only')
+
+def test_batch_results_resource_match_is_exact():
+    # /ports/1 must not match an error about /ports/12
+    status = {'failed': True, 'errors': ['/devices/Q-2/switch/ports/12 failed']}
+    actions = [port_update_action('Q-2', '1', {}), port_update_action('Q-2', '12', {})]
+    assert [result['status'] for result in _batch_results('b1', actions, status)] == ['rolled back', 'failed']
+
+def test_batch_results_unmatched_error_fails_every_action():
+    results = _batch_results('b1', ACTIONS, {'failed': True, 'errors': ['Internal error']})
+    assert [result['status'] for result in results] == ['failed'] * 3
+
+# Class standing in for MerakiClient's action batch endpoints
+class FakeClient:
+    def __init__(self, polls):
+        self.polls = polls
+        self.batches = []
+        self.gets = 0
+
+    def post(self, path, json=None, org_id=None):
+        self.batches.append(json['actions'])
+        return {'id': str(len(self.batches))}
+
+    def get(self, path, org_id=None):
+        self.gets += 1
+        return self.polls(self, path)
+
+@pytest.fixture(autouse=True)
+def fast_polling(monkeypatch):
+    monkeypatch.setattr(config, 'ACTION_BATCH_POLL_INITIAL', 0)
+    monkeypatch.setattr(config, 'ACTION_BATCH_POLL_MAX', 0)
+    monkeypatch.setattr(config, 'ACTION_BATCH_SIZE', 2)
+
+def test_run_action_batches_completes():
+    def polls(client, path):
+        return {'status': {'completed': client.gets > 2, 'failed': False, 'errors': []}}
+
+    client = FakeClient(polls)
+    progress = []
+    results = run_action_batches(client, 'O_1', ACTIONS, progress.append)
+    assert [len(batch) for batch in client.batches] == [2, 1]
+    assert [result['status'] for result in results] == ['applied'] * 3
+    assert sum(progress) == 3
+
+def test_run_action_batches_gives_up_on_failing_polls():
+    def polls(client, path):
+        raise requests.exceptions.HTTPError(f'404 Client Error: Not Found for url: {path}')
+
+    client = FakeClient(polls)
+    results = run_action_batches(client, 'O_1', ACTIONS)
+    assert client.gets == 2 * config.ACTION_BATCH_POLL_FAILURES
+    assert [result['status'] for result in results] == ['failed'] * 3
+    assert results[0]['detail'].startswith('Could not read batch status: 404')
+
+def test_run_action_batches_times_out(monkeypatch):
+    monkeypatch.setattr(config, 'ACTION_BATCH_TIMEOUT', 0.05)
+    client = FakeClient(lambda client, path: {'status': {'completed': False}})
+    results = run_action_batches(client, 'O_1', ACTIONS[:1])
+    assert results[0]['status'] == 'failed' and 'did not finish' in results[0]['detail']
+
+def test_run_action_batches_reports_rejected_batches():
+    class RejectingClient(FakeClient):
+        def post(self, path, json=None, org_id=None):
+            raise requests.exceptions.HTTPError('400 Client Error: Bad Request')
+
+    results = run_action_batches(RejectingClient(None), 'O_1', ACTIONS)
+    assert [(result['batchId'], result['status']) for result in results] == [(None, 'failed')] * 3
@@ -0,0 +1,52 @@
+# Desc: Tests of the incremental client sync helpers and state store
+# Author: Mohd NeoTech <mohdneotech@gmail.com>
+
+from include.client_sync import ClientStateStore, changed_fields, format_t0, last_seen_epoch, merge_clients
+
+NOW = 1_800_000_000
+
+# Function to build a client record last seen some seconds before NOW
+def _client(key, ago=0, **fields):
+    return dict({'id': key, 'mac': f'aa:bb:cc:00:00:{key[-2:]}', 'ip': '10.0.0.1', 'vlan': 10, 'lastSeen': NOW - ago}, **fields)
+
+def test_last_seen_epoch():
+    assert last_seen_epoch({'lastSeen': 1700000000}) == 1700000000.0
+    assert last_seen_epoch({'lastSeen': '2023-11-14T22:13:20Z'}) == 1700000000.0
+    assert last_seen_epoch({}) == 0.0
+    assert format_t0(1700000000) == '2023-11-14T22:13:20Z'
+
+def test_changed_fields():
+    assert changed_fields({'ip': 'a', 'vlan': 1}, {'ip': 'b', 'vlan': 1}, ('ip', 'vlan')) == ['ip']
+    assert changed_fields({'ip': 'a'}, {'ip': 'a', 'lastSeen': 5}) == []
+
+def test_merge_clients():
+    snapshot = {'k01': _client('k01'), 'k02': _client('k02'), 'k03': _client('k03', ago=3600), 'k04': _client('k04', ago=10)}
+    fetched = [_client('k01'), _client('k02', ip='10.0.0.2'), _client('k05'), {'name': 'no key'}]
+    merged, changes = merge_clients(snapshot, fetched, left_before=NOW - 60)
+
+    assert [client['id'] for client in changes['joined']] == ['k05']
+    assert [(client['id'], fields) for client, fields in changes['changed']] == [('k02', ['ip'])]
+    # k03 was last seen before the window and not fetched again; k04 is recent enough to stay
+    assert [client['id'] for client in changes['left']] == ['k03']
+    assert sorted(merged) == ['k01', 'k02', 'k04', 'k05']
+    assert merged['k02']['ip'] == '10.0.0.2'
+    assert 'k03' in snapshot  # the caller's snapshot is not modified
+
+def test_merge_clients_keys_by_mac_without_id():
+    merged, changes = merge_clients({}, [{'mac': 'aa:bb:cc:dd:ee:ff'}], left_before=NOW)
+    assert list(merged) == ['aa:bb:cc:dd:ee:ff'] and len(changes['joined']) == 1
+
+def test_state_store_round_trip(tmp_path):
+    store = ClientStateStore(str(tmp_path / 'state.sqlite'))
+    assert store.last_sync('N_1') is None
+    _, changes = merge_clients({}, [_client('k01'), _client('k02')], NOW - 60)
+    store.save('N_1', changes, NOW, [_client('k01'), _client('k02')])
+    assert store.last_sync('N_1') == NOW
+    assert sorted(store.snapshot('N_1')) == ['k01', 'k02']
+
+    merged, changes = merge_clients(store.snapshot('N_1'), [_client('k01', ago=0)], NOW + 3600)
+    store.save('N_1', changes, NOW + 3600, [_client('k01')])
+    assert sorted(store.snapshot('N_1')) == ['k01']
+    store.reset('N_1')
+    assert store.last_sync('N_1') is None and store.snapshot('N_1') == {}
+    store.close()
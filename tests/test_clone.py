@@ -0,0 +1,36 @@
+# Desc: Tests of the switch clone planning helpers
+# Author: Mohd NeoTech <mohdneotech@gmail.com>
+
+from postCloneSwitch import (diff_ports, exit_status, port_update_payloads, targets_needing_changes,
+                             unhandled_changes)
+
+SOURCE = [{'portId': '1', 'name': 'uplink', 'vlan': 1, 'enabled': True, 'linkNegotiationCapabilities': ['Auto']},
+          {'portId': '2', 'name': None, 'vlan': 20, 'enabled': True},
+          {'portId': '49', 'name': 'sfp', 'vlan': 1, 'enabled': True}]
+
+def test_diff_ports():
+    target = [{'portId': '1', 'name': 'uplink', 'vlan': 1, 'enabled': True, 'linkNegotiationCapabilities': ['1 Gbps']},
+              {'portId': '2', 'name': 'desk', 'vlan': 10, 'enabled': True}]
+    assert diff_ports(SOURCE, target) == [
+        {'portId': '2', 'field': 'name', 'current': 'desk', 'desired': None},
+        {'portId': '2', 'field': 'vlan', 'current': 10, 'desired': 20},
+        {'portId': '49', 'field': None, 'current': None, 'desired': 'port missing on target'},
+    ]
+    assert diff_ports(SOURCE, SOURCE) == []
+
+def test_port_update_payloads_skip_missing_ports():
+    changes = diff_ports(SOURCE, [{'portId': '2', 'name': 'desk', 'vlan': 10, 'enabled': True}, SOURCE[0]])
+    assert port_update_payloads(changes) == {'2': {'name': None, 'vlan': 20}}
+
+def test_plan_outcomes():
+    plan = [{'serial': 'Q-1', 'changes': [], 'error': None},
+            {'serial': 'Q-2', 'changes': diff_ports(SOURCE, SOURCE[:2]), 'error': None},
+            {'serial': 'Q-3', 'changes': [], 'error': '404 Client Error'}]
+    assert targets_needing_changes(plan) == ['Q-2', 'Q-3']
+    assert [(result['serial'], result['status']) for result in unhandled_changes(plan)] == [
+        ('Q-2 port 49', 'failed'), ('Q-3', 'failed')]
+
+def test_exit_status():
+    assert exit_status([]) == 0
+    assert exit_status([{'status': 'updated'}, {'status': 'skipped'}]) == 0
+    assert exit_status([{'status': 'applied'}, {'status': 'rolled back'}]) == 1
@@ -0,0 +1,71 @@
+# Desc: Tests of the client count history and its rollups
+# Author: Mohd NeoTech <mohdneotech@gmail.com>
+
+import time
+
+import pytest
+
+from include.history import RAW, ClientCountHistory, parse_span
+
+DAY = 86400
+
+@pytest.fixture
+def history(tmp_path):
+    history = ClientCountHistory(str(tmp_path / 'history.sqlite'))
+    yield history
+    history.close()
+
+def test_parse_span():
+    assert parse_span('90m') == 5400
+    assert parse_span('24H') == DAY
+    assert parse_span('2w') == 14 * DAY
+    assert parse_span('1.5h') == 5400
+    assert parse_span('45') == 45
+    with pytest.raises(ValueError):
+        parse_span('soon')
+
+def test_resolution_for(history):
+    now = 1_800_000_000
+    assert history.resolution_for(now - 3600, now, now) == RAW
+    assert history.resolution_for(now - DAY, now, now) == 300
+    assert history.resolution_for(now - 7 * DAY, now, now) == 3600
+    assert history.resolution_for(now - 12 * DAY, now, now) == 3600
+    assert history.resolution_for(now - 90 * DAY, now, now) == 86400
+    # Past the 5-minute retention even short ranges come from the hourly rollup
+    assert history.resolution_for(now - 40 * DAY, now - 40 * DAY + 7200, now) == 3600
+
+def test_rollups_aggregate_every_level(history):
+    start = time.time() // DAY * DAY - DAY
+    aps = [('Q-1', 'ap-1', 'N_1', 'Site 1', 'O_1'), ('Q-2', 'ap-2', 'N_1', 'Site 1', 'O_1')]
+    for minute, clients in enumerate([3, 7, 5, 1]):
+        history.record([('Q-1', clients), ('Q-2', 2)], start + minute * 120, aps)
+
+    rows = history.db.execute('SELECT resolution, bucket, samples, total, min, max FROM rollups '
+                              'WHERE serial = ? ORDER BY resolution, bucket', ('Q-1',)).fetchall()
+    assert rows == [(300, start, 3, 15, 3, 7), (300, start + 300, 1, 1, 1, 1),
+                    (3600, start, 4, 16, 1, 7), (86400, start, 4, 16, 1, 7)]
+    assert history.ap_names() == {'Q-1': ('ap-1', 'Site 1'), 'Q-2': ('ap-2', 'Site 1')}
+
+def test_peaks_and_series(history):
+    start = time.time() // DAY * DAY - DAY
+    for minute, clients in enumerate([3, 7, 5, 1]):
+        history.record([('Q-1', clients), ('Q-2', 2)], start + minute * 120)
+
+    # A raw range: the peak is the exact sample
+    peaks = history.peaks(start, start + 3600)
+    assert peaks[0] == ['Q-1', 'Q-1', None, 7, start + 120, 4.0, 4]
+    assert peaks[1][:4] == ['Q-2', 'Q-2', None, 2]
+    assert history.peaks(start, start + 3600, serials=['Q-2'])[0][1] == 'Q-2'
+    assert [row[2] for row in history.series('Q-1', start, start + 3600)] == [3, 7, 5, 1]
+
+    # A day: 5-minute buckets
+    assert history.peaks(start, start + DAY)[0][3:] == [7, start, 4.0, 4]
+    assert history.series('Q-1', start, start + DAY) == [(start, 3, 5.0, 3, 7), (start + 300, 1, 1.0, 1, 1)]
+
+def test_retention_prunes_old_data(history):
+    now = time.time() // DAY * DAY
+    history.record([('Q-1', 4)], now - 3 * DAY)
+    history.record([('Q-1', 6)], now)
+    assert history.db.execute('SELECT COUNT(*) FROM samples').fetchone()[0] == 1
+    # The 5-minute rollup of three days ago is still within its own retention
+    assert history.db.execute('SELECT COUNT(*) FROM rollups WHERE resolution = 300').fetchone()[0] == 2
@@ -0,0 +1,39 @@
+# Desc: Tests of the incremental JSON array decoder
+# Author: Mohd NeoTech <mohdneotech@gmail.com>
+
+import json
+
+import pytest
+
+from include.jsonutil import iter_array
+
+ITEMS = [{'id': 1, 'name': 'café ☕', 'tags': []}, 12.5, -3, 'a,b]', None, True, [1, [2]], {}]
+
+# Function to split bytes into chunks of a fixed size
+def _chunks(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+@pytest.mark.parametrize('size', [1, 2, 3, 7, 64, 100000])
+def test_any_chunking(size):
+    data = json.dumps(ITEMS).encode('utf-8')
+    assert list(iter_array(_chunks(data, size))) == ITEMS
+
+def test_whitespace_and_empty():
+    assert list(iter_array([b' \n[ 1 ,\t2 ] \n'])) == [1, 2]
+    assert list(iter_array([b'[]'])) == []
+    assert list(iter_array([b'[', b']'])) == []
+
+def test_number_split_across_chunks():
+    assert list(iter_array([b'[12', b'.5,3', b'4]'])) == [12.5, 34]
+
+def test_items_arrive_before_the_end():
+    items = iter_array(iter([b'[{"a": 1}, ', b'{"b"']))
+    assert next(items) == {'a': 1}
+
+def test_invalid_input():
+    with pytest.raises(ValueError):
+        list(iter_array([b'{"a": 1}']))
+    with pytest.raises(ValueError):
+        list(iter_array([b'[1, 2']))
+    with pytest.raises(ValueError):
+        list(iter_array([b'[1, {"a": }]']))
@@ -0,0 +1,84 @@
+# Desc: Tests of the Link header parser and the paginator
+# Author: Mohd NeoTech <mohdneotech@gmail.com>
+
+import json
+import threading
+import time
+
+import pytest
+
+from include.pagination import iter_pages, paginate, parse_link_header
+
+def test_parse_link_header():
+    value = ('<https://api.meraki.com/api/v1/x?startingAfter=a>; rel=first, '
+             '<https://api.meraki.com/api/v1/x?startingAfter=b&perPage=10>; rel="next", '
+             '<https://api.meraki.com/api/v1/x?endingBefore=z>; rel="prev last"')
+    assert parse_link_header(value) == {
+        'first': 'https://api.meraki.com/api/v1/x?startingAfter=a',
+        'next': 'https://api.meraki.com/api/v1/x?startingAfter=b&perPage=10',
+        'prev': 'https://api.meraki.com/api/v1/x?endingBefore=z',
+        'last': 'https://api.meraki.com/api/v1/x?endingBefore=z',
+    }
+
+def test_parse_link_header_empty_and_odd():
+    assert parse_link_header(None) == {}
+    assert parse_link_header('') == {}
+    assert parse_link_header('<https://x/y?a=1,2>; title="a, b"; REL=Next') == {'next': 'https://x/y?a=1,2'}
+
+# Class standing in for a streamed requests response
+class FakeResponse:
+    def __init__(self, items, next_url):
+        self.content = json.dumps(items).encode()
+        self.headers = {'Link': f'<{next_url}>; rel=next'} if next_url else {}
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+# Class standing in for MerakiClient, serving `pages` pages of `per_page` numbered items
+class FakeClient:
+    def __init__(self, pages, per_page=3, delay=0.0):
+        self.pages = pages
+        self.per_page = per_page
+        self.delay = delay
+        self.requests = []
+        self.responses = []
+        self.lock = threading.Lock()
+
+    def request(self, method, path, params=None, org_id=None, stream=False):
+        time.sleep(self.delay)
+        page = int(path.rsplit('/', 1)[1])
+        with self.lock:
+            self.requests.append((path, params))
+        items = list(range(page * self.per_page, (page + 1) * self.per_page))
+        response = FakeResponse(items, f'/items/{page + 1}' if page + 1 < self.pages else None)
+        self.responses.append(response)
+        return response
+
+    def iter_response_items(self, response):
+        try:
+            yield from json.loads(response.content)
+        finally:
+            response.close()
+
+@pytest.mark.parametrize('prefetch', [True, False])
+@pytest.mark.parametrize('stream', [True, False])
+def test_paginate_reads_every_page(prefetch, stream):
+    client = FakeClient(pages=4)
+    assert list(paginate(client, '/items/0', {'x': 1}, prefetch=prefetch, stream=stream)) == list(range(12))
+    assert [path for path, _ in client.requests] == ['/items/0', '/items/1', '/items/2', '/items/3']
+    # Only the first request carries the parameters; the next URLs already hold them
+    assert client.requests[0][1] == {'x': 1, 'perPage': 1000}
+    assert all(params is None for _, params in client.requests[1:])
+
+def test_iter_pages():
+    assert list(iter_pages(FakeClient(pages=2, per_page=2), '/items/0', prefetch=False)) == [[0, 1], [2, 3]]
+
+def test_stopping_early_closes_the_prefetched_page():
+    client = FakeClient(pages=10, delay=0.1)
+    items = paginate(client, '/items/0', stream=True)
+    next(items)
+    time.sleep(0.02)  # let the prefetch of the second page start
+    items.close()
+    time.sleep(0.3)
+    assert client.responses and all(response.closed for response in client.responses)
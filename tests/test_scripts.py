@@ -0,0 +1,117 @@
+# Desc: Smoke runs of every script against the local mock API (benchmarks/mock_server.py)
+# Author: Mohd NeoTech <mohdneotech@gmail.com>
+
+import csv
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+import requests
+
+from benchmarks.mock_server import MockServerProcess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Options every networked run shares: a throwaway key, no prompts and no cache or metrics output
+COMMON = ['--api-key', 'test-key', '--org', 'all', '--no-cache', '--metrics', 'none']
+
+# One organization with APs in Site 1 and switches in Site 2
+@pytest.fixture(scope='module')
+def mock_api():
+    with MockServerProcess(orgs=1, networks=2, devices=20, clients_per_ap=5) as server:
+        yield server.url
+
+@pytest.fixture
+def run(mock_api, tmp_path):
+    # Scripts run in a fresh process with their state files (~/.cache) under a temporary home
+    env = dict(os.environ, MERAKI_BASE_URL=mock_api, HOME=str(tmp_path), PYTHONIOENCODING='utf-8')
+    env.pop('MERAKI_DASHBOARD_API_KEY', None)
+
+    def run(script, *args, status=0):
+        result = subprocess.run([sys.executable, os.path.join(ROOT, script)] + list(args), cwd=ROOT, env=env,
+                                stdin=subprocess.DEVNULL, capture_output=True, text=True, timeout=120)
+        assert result.returncode == status, result.stdout + result.stderr
+        return result.stdout
+    return run
+
+def test_ap_counts(run):
+    for mode in ('network', 'per-ap'):
+        output = run('meraki_tools.py', 'ap-counts', *COMMON, '--network', 'all', '--mode', mode)
+        assert output.count('Connected Clients: 5') == 10
+        assert 'No wireless APs found' in output
+
+def test_ap_counts_watch_and_history(run, tmp_path):
+    history = str(tmp_path / 'history.sqlite')
+    output = run('meraki_tools.py', 'ap-counts', *COMMON, '--network', 'all', '--watch', '--cycles', '2',
+                 '--interval', '0.1', '--max-interval', '0.2', '--record', '--history', history)
+    rows = [json.loads(line) for line in output.splitlines() if line.startswith('{')]
+    assert len(rows) == 20 and {row['Connected Clients'] for row in rows} == {5}
+
+    report = run('meraki_tools.py', 'ap-counts', '--history', history, '--history-report', '1h')
+    assert report.count('Q200-0000-') == 10
+    trend = run('meraki_tools.py', 'ap-counts', '--history', history, '--history-report', '1h', '--trend', 'Q200-0000-0000')
+    assert 'Max Clients' in trend
+
+def test_clients(run, tmp_path):
+    output = run('meraki_tools.py', 'clients', *COMMON, '--network', 'all', '--format', 'ndjson')
+    assert len([line for line in output.splitlines() if line.startswith('{')]) == 50
+
+    output = run('meraki_tools.py', 'clients', *COMMON, '--network', 'all', '--group-by', 'ssid')
+    assert 'Total connected clients: 50' in output
+
+    state = str(tmp_path / 'state.sqlite')
+    first = run('meraki_tools.py', 'clients', *COMMON, '--network', 'all', '--incremental', '--state', state)
+    assert '50 joined, 0 left, 0 changed' in first
+    second = run('meraki_tools.py', 'clients', *COMMON, '--network', 'all', '--incremental', '--state', state)
+    assert '0 joined, 0 left, 0 changed' in second
+
+def test_clients_rejects_bad_options(run):
+    assert run('getWifiConnectedUsers.py', '--timezone', 'Foo/Bar', status=2) == ''
+
+def test_ports(run, tmp_path):
+    output = run('meraki_tools.py', 'ports', *COMMON, '--network', 'all', '--device', 'sw-00001')
+    assert 'Serial Number: Q200-0000-0001' in output
+
+    inventory = str(tmp_path / 'ports.csv')
+    run('meraki_tools.py', 'ports', *COMMON, '--inventory', inventory)
+    with open(inventory, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 10 * 24 and rows[0]['serial'].startswith('Q200-')
+
+    output = run('meraki_tools.py', 'ports', *COMMON, '--network', 'all', '--telemetry', '--top', '3')
+    assert '240 port(s) on 10 switch(es)' in output
+
+def test_switch_ports(run):
+    output = run('getSwitchPorts.py', *COMMON, '--network', 'N_0_1', '--device', 'Q200-0000-0001')
+    assert output.startswith('Cisco Meraki Switch Ports Information Retrieval Script')
+
+def test_clone(run, mock_api, tmp_path):
+    journal = str(tmp_path / 'clone.ndjson')
+    output = run('meraki_tools.py', 'clone', *COMMON, '--source', 'sw-00001', '--target', 'sw-0000[35]', '--dry-run')
+    assert 'Q200-0000-0003: in sync with the source' in output
+
+    output = run('meraki_tools.py', 'clone', *COMMON, '--source', 'sw-00001', '--target', 'sw-00003', '--no-plan',
+                 '--journal', journal)
+    assert 'Cloned: 1' in output
+    output = run('meraki_tools.py', 'clone', *COMMON, '--source', 'sw-00001', '--target', 'sw-00003', '--no-plan',
+                 '--journal', journal)
+    assert 'already cloned' in output
+
+    # Change one source port so every other switch differs from it, then sync them with action batches
+    requests.put(f'{mock_api}/devices/Q200-0000-0001/switch/ports/1', json={'name': 'uplink'}, timeout=30).raise_for_status()
+    output = run('meraki_tools.py', 'clone', *COMMON, '--source', 'sw-00001', '--target', 'sw-*', '--apply', 'batch')
+    assert 'Applied: 9' in output and 'Port updates completed.' in output
+    output = run('meraki_tools.py', 'clone', *COMMON, '--source', 'sw-00001', '--target', 'sw-*', '--dry-run')
+    assert output.count('in sync with the source') == 9
+
+def test_lookup(run, tmp_path):
+    snapshot = str(tmp_path / 'topology.sqlite')
+    output = run('meraki_tools.py', 'lookup', *COMMON, '--build', '--snapshot', snapshot)
+    assert '1 organizations, 2 networks, 20 devices, 240 ports, 50 clients' in output
+
+    output = run('meraki_tools.py', 'lookup', '--snapshot', snapshot, 'sw-0000*', '0c:00:00:00:00:02', '--format', 'csv')
+    lines = output.splitlines()
+    rows = list(csv.DictReader(lines[lines.index('Kind,Name,Serial/MAC/ID,IP,Model/VLAN,Where,Network,Organization'):]))
+    assert [row['Name'] for row in rows] == ['sw-00001', 'sw-00003', 'sw-00005', 'sw-00007', 'sw-00009', 'ap-00002']
@@ -0,0 +1,40 @@
+# Desc: Tests of the UTC timestamp conversion helpers
+# Author: Mohd NeoTech <mohdneotech@gmail.com>
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from include.timeutil import MISSING, convert_timestamp, convert_timestamps, format_offset, parse_utc
+
+# Zones with hour, half-hour and quarter-hour offsets and transitions, plus fixed-offset zones
+ZONES = ['Asia/Kuala_Lumpur', 'Europe/London', 'America/New_York', 'Australia/Adelaide',
+         'America/St_Johns', 'Australia/Lord_Howe', 'Asia/Kathmandu', 'Asia/Kolkata', 'UTC', 'Etc/GMT+5']
+
+# Function to list timestamps every 15 minutes across the daylight saving changes of 2026
+def _timestamps():
+    stamps = []
+    for start in (datetime(2026, 3, 7), datetime(2026, 3, 28), datetime(2026, 4, 4),
+                  datetime(2026, 10, 3), datetime(2026, 10, 24), datetime(2026, 10, 31)):
+        stamps.extend(f'{start + timedelta(minutes=15 * step):%Y-%m-%dT%H:%M:%S}Z' for step in range(4 * 48))
+    return stamps
+
+@pytest.mark.parametrize('tz_name', ZONES)
+def test_batch_matches_scalar(tz_name):
+    values = _timestamps() + [None, '', 'not a time']
+    assert convert_timestamps(values, tz_name) == [convert_timestamp(value, tz_name) for value in values]
+
+def test_half_hour_transition():
+    assert convert_timestamps(['2026-04-04T16:45:00Z'], 'Australia/Adelaide') == ['2026-04-05 02:15:00 GMT+9:30']
+    assert convert_timestamps(['2026-03-08T05:45:00Z'], 'America/St_Johns') == ['2026-03-08 03:15:00 GMT-2:30']
+
+def test_missing_values():
+    assert convert_timestamp(None) == MISSING
+    assert convert_timestamps([]) == []
+    assert parse_utc('2026-01-02T03:04:05Z') == datetime(2026, 1, 2, 3, 4, 5)
+    assert parse_utc('garbage') is None
+
+def test_format_offset():
+    assert format_offset(timedelta(hours=8)) == 'GMT+8'
+    assert format_offset(timedelta(hours=5, minutes=30)) == 'GMT+5:30'
+    assert format_offset(timedelta(hours=-3, minutes=-30)) == 'GMT-3:30'
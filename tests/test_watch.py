@@ -0,0 +1,48 @@
+# Desc: Tests of the adaptive polling schedule
+# Author: Mohd NeoTech <mohdneotech@gmail.com>
+
+from include.watch import AdaptivePoller
+
+# Function to build a poller with small round numbers
+def _poller():
+    return AdaptivePoller(min_interval=10, max_interval=80, busy_threshold=20, busy_max_interval=20)
+
+def test_new_keys_are_due_right_away():
+    poller = _poller()
+    poller.sync(['a', 'b'], now=0)
+    assert sorted(poller.due(now=0)) == ['a', 'b']
+    assert poller.next_due() == 0
+
+def test_interval_doubles_while_unchanged_and_resets_on_change():
+    poller = _poller()
+    poller.sync(['a'], now=0)
+    assert [poller.record('a', 5, now=0) for _ in range(5)] == [10, 20, 40, 80, 80]
+    assert poller.record('a', 6, now=100) == 10
+    assert poller.next_poll['a'] == 110
+    assert poller.due(now=105) == [] and poller.due(now=110) == ['a']
+
+def test_busy_keys_back_off_less():
+    poller = _poller()
+    poller.sync(['a', 'b'], now=0)
+    assert [poller.record('a', 30, now=0) for _ in range(4)] == [10, 20, 20, 20]
+    # A value that is not a number is busy or idle by its load
+    assert [poller.record('b', (1, 2), now=0, load=25) for _ in range(3)] == [10, 20, 20]
+    assert [poller.record('b', (1, 2), now=0, load=2) for _ in range(2)] == [40, 80]
+
+def test_failed_poll_keeps_the_interval():
+    poller = _poller()
+    poller.sync(['a'], now=0)
+    poller.record('a', 1, now=0)
+    poller.record('a', 1, now=0)
+    poller.failed('a', now=50)
+    assert poller.next_poll['a'] == 70 and poller.intervals['a'] == 20
+
+def test_sync_forgets_removed_keys():
+    poller = _poller()
+    poller.sync(['a', 'b'], now=0)
+    poller.record('a', 1, now=0)
+    poller.sync(['b', 'c'], now=5)
+    assert sorted(poller.next_poll) == ['b', 'c'] and 'a' not in poller.values
+    assert poller.next_poll['c'] == 5
+    poller.sync([], now=6)
+    assert poller.next_due() is None